@@ -1,12 +1,159 @@
 import pandas as pd
 import numpy as np
 import warnings
+import errno
+import hashlib
+import json
 import os
+import shutil
+import tempfile
+
+from ann_index import ANN_BACKENDS, make_ann_index
+from catalog_filter import CatalogFilter
+from embeddings import ItemEmbeddings
+from genre_index import GenreIndex
+from metrics import REGISTRY
+from title_index import TitleIndex
 
 warnings.filterwarnings('ignore')
 
+
+def _top_k(scores, k):
+    """
+    Row-wise top-k of a 2D score block: argpartition, then sort only the k.
+    Returns (indices, scores), both (n_rows, k), best first.
+    """
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind='stable')
+    return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+def _masked_top_k(scores, k, candidates=None):
+    """
+    Top-k of a 1D score array restricted to candidates (bool mask), best
+    first. Returns fewer than k only when fewer candidates exist.
+    """
+    if candidates is not None:
+        scores = np.where(candidates, scores, -np.inf)
+        k = min(k, int(np.count_nonzero(candidates)))
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=scores.dtype)
+    top, top_scores = _top_k(scores[None, :], k)
+    return top[0], top_scores[0]
+
+def _grow_csr(matrix, shape):
+    """
+    View of a CSR matrix padded with empty rows/columns up to shape
+    (no copy of the stored entries).
+    """
+    from scipy.sparse import csr_matrix
+
+    indptr = matrix.indptr
+    if shape[0] > matrix.shape[0]:
+        indptr = np.concatenate([indptr, np.full(shape[0] - matrix.shape[0], indptr[-1], dtype=indptr.dtype)])
+    return csr_matrix((matrix.data, matrix.indices, indptr), shape=shape, copy=False)
+
+def _first_seen_codes(ids, table, seen):
+    """
+    Dense codes for ids, numbering unseen ids in first-appearance order.
+    table maps id -> code (-1 = unseen) and is updated in place; newly seen
+    ids are appended to seen (a list of arrays, in code order).
+    """
+    codes = table[ids]
+    new = codes < 0
+    if new.any():
+        fresh, first = np.unique(ids[new], return_index=True)
+        fresh = fresh[np.argsort(first, kind='stable')]
+        n_seen = sum(len(block) for block in seen)
+        table[fresh] = np.arange(n_seen, n_seen + len(fresh), dtype=table.dtype)
+        seen.append(fresh)
+        codes = table[ids]
+    return codes
+
+def _csr_from_codes(rows, cols, data, shape, chunk_rows):
+    """
+    CSR matrix from COO code arrays, as csr_matrix((data, (rows, cols)))
+    builds it (sorted indices, duplicates summed), but filled chunk by chunk
+    so the only full-size scratch is the output itself.
+    """
+    from scipy.sparse import csr_matrix
+
+    index_dtype = np.int32 if max(len(rows), *shape) < np.iinfo(np.int32).max else np.int64
+    indptr = np.zeros(shape[0] + 1, dtype=index_dtype)
+    np.cumsum(np.bincount(rows, minlength=shape[0]), out=indptr[1:])
+    indices = np.empty(len(rows), dtype=index_dtype)
+    values = np.empty(len(rows), dtype=data.dtype)
+
+    next_free = indptr[:-1].astype(np.int64)
+    for start in range(0, len(rows), chunk_rows):
+        block = rows[start:start + chunk_rows]
+        order = np.argsort(block, kind='stable')
+        sorted_rows = block[order]
+        # Slot of each entry: next free position of its row + rank within the chunk
+        rank = np.arange(len(block)) - np.searchsorted(sorted_rows, sorted_rows)
+        dest = next_free[sorted_rows] + rank
+        indices[dest] = cols[start:start + chunk_rows][order]
+        values[dest] = data[start:start + chunk_rows][order]
+        next_free += np.bincount(block, minlength=shape[0])
+
+    matrix = csr_matrix((values, indices, indptr), shape=shape, copy=False)
+    matrix.sum_duplicates() # in place
+    return matrix
+
+def _splice_rows(matrix, rows, replacement, shape):
+    """
+    CSR matrix of the given shape (>= matrix.shape) with the sorted `rows`
+    replaced by the rows of `replacement`; rows past matrix.shape[0] that
+    are not replaced stay empty. Untouched rows are copied as contiguous
+    runs in one concatenate, so beyond one memcpy of the stored entries the
+    cost is proportional to the replaced rows.
+    """
+    from scipy.sparse import csr_matrix
+
+    rows = np.asarray(rows, dtype=np.int64)
+    n_old = matrix.shape[0]
+    counts = np.zeros(shape[0], dtype=np.int64)
+    counts[:n_old] = np.diff(matrix.indptr)
+    counts[rows] = np.diff(replacement.indptr)
+    nnz = int(counts.sum())
+    index_dtype = np.int32 if max(nnz, *shape) < np.iinfo(np.int32).max else np.int64
+    indptr = np.zeros(shape[0] + 1, dtype=index_dtype)
+    np.cumsum(counts, out=indptr[1:])
+
+    # Alternate untouched runs of matrix with the replacement rows
+    run_starts = matrix.indptr[np.concatenate([[0], np.minimum(rows + 1, n_old)])].tolist()
+    run_ends = matrix.indptr[np.concatenate([np.minimum(rows, n_old), [n_old]])].tolist()
+    bounds = replacement.indptr.tolist()
+    indices, data = [], []
+    for i in range(len(rows)):
+        indices += [matrix.indices[run_starts[i]:run_ends[i]], replacement.indices[bounds[i]:bounds[i + 1]]]
+        data += [matrix.data[run_starts[i]:run_ends[i]], replacement.data[bounds[i]:bounds[i + 1]]]
+    indices.append(matrix.indices[run_starts[-1]:run_ends[-1]])
+    data.append(matrix.data[run_starts[-1]:run_ends[-1]])
+    return csr_matrix((np.concatenate(data).astype(matrix.data.dtype, copy=False),
+                       np.concatenate(indices).astype(index_dtype, copy=False), indptr),
+                      shape=shape, copy=False)
+
+# Bump when the on-disk layout written by save() changes
+ARTIFACT_VERSION = 4
+
+# Constructor options that shape the saved arrays; recorded in the manifest.
+# Everything else (engine choice, weights, metrics) is query-time.
+_BUILD_SETTINGS = ('neighbor_k', 'ann_backend', 'ann_params', 'embedding_rank')
+
+# Default blend for engine='hybrid' (see hybrid_scores)
+HYBRID_WEIGHTS = {'collaborative': 0.7, 'content': 0.25, 'popularity': 0.05}
+
+# Rough parse cost per rating row (pandas buffers + masks), used to size chunks
+_CSV_BYTES_PER_ROW = 64
+
 class AnimeRecommendationSystem:
-    def __init__(self):
+    def __init__(self, neighbor_k=None, neighbor_block_size=1024, ann_backend=None, ann_params=None,
+                 embedding_rank=None, collaborative_engine='knn', hybrid_weights=None, metrics=None):
+        # Timing spans / counters (see metrics.py)
+        self.metrics = metrics or REGISTRY
+        
         # Dataframes
         self.anime_df = None
         self.rating_df = None
@@ -16,14 +163,68 @@ class AnimeRecommendationSystem:
         self.knn_model = None
         self.anime_id_to_index = {}
         self.index_to_anime_id = {}
+        self.user_id_to_index = {}
+        self._normed_items = None    # cached (normalized, transposed) item matrix
+        self._streamed_ratings = None # (matrix, anime_ids, user_ids) from _load_ratings_streaming
+        
+        # Precomputed Top-K Neighbor Table (optional, see _build_neighbor_table)
+        self.neighbor_k = neighbor_k
+        self.neighbor_block_size = neighbor_block_size
+        self.neighbor_ids = None     # int32 (n_items, K) collaborative indices
+        self.neighbor_scores = None  # float32 (n_items, K) cosine similarity
+        
+        # Approximate Nearest Neighbors (optional, 'lsh' or 'ivf', see ann_index.py)
+        self.ann_backend = ann_backend
+        self.ann_params = ann_params
+        self.ann_index = None
+        
+        # Matrix-Factorization Engine (optional, see embeddings.py)
+        # collaborative_engine: 'knn' (item vectors over users) or 'mf' (embeddings)
+        self.embedding_rank = embedding_rank
+        self.collaborative_engine = collaborative_engine
+        self.item_embeddings = None
+        
+        # Catalog Positional Index (see _build_catalog_index)
+        self.row_of_anime_id = None  # int32, anime_id -> catalog row (-1 = missing)
+        self.item_rows = None        # int32, collaborative index -> catalog row
+        self.catalog_columns = {}    # column name -> numpy array, for batch packaging
+        self.title_index = None      # TitleIndex over catalog names
+        self.catalog_orders = {}     # 'rating' / 'members' -> int32 rows, best first
+        self.catalog_filter = None   # CatalogFilter, filter specs -> row masks
         
         # Content Metadata
-        self.tfidf_matrix = None
-        self.vectorizer = None # Lazy load
+        self.genre_index = None      # GenreIndex, packed genre bitsets
+        self.content_metric = 'cosine'
         
-    def load_data(self, anime_path, rating_path=None):
+        # Hybrid Scoring (engine='hybrid'): source -> weight, over HYBRID_WEIGHTS
+        self.hybrid_weights = hybrid_weights
+        self.popularity_prior = None # float32 per catalog row, log(members) in [0, 1]
+        
+        # True when the large arrays are memory-mapped from an artifact (load)
+        self.memory_mapped = False
+        self.artifact_dir = None     # directory last written by save() or read by load()
+        
+    @property
+    def rating_df(self):
+        """
+        Ratings the collaborative model is built from. Rows folded in by
+        add_ratings() are buffered and only concatenated when this is read.
+        """
+        if self._rating_deltas:
+            self._rating_df = pd.concat([self._rating_df, *self._rating_deltas], ignore_index=True)
+            self._rating_deltas = []
+        return self._rating_df
+
+    @rating_df.setter
+    def rating_df(self, ratings):
+        self._rating_df = ratings
+        self._rating_deltas = []
+
+    def load_data(self, anime_path, rating_path=None, streaming=False, memory_budget_mb=256):
         """
         Load datasets with memory optimization.
+        streaming=True reads the whole rating file in bounded chunks (see
+        _load_ratings_streaming) instead of the first 500k rows.
         """
         # Specify dtypes to save memory (Default is int64/float64, we use int32/float32)
         anime_dtypes = {
@@ -39,18 +240,27 @@ class AnimeRecommendationSystem:
             'rating': 'int8'      # Ratings are -1 to 10
         }
 
-        self.anime_df = pd.read_csv(anime_path, dtype=anime_dtypes)
+        with self.metrics.span('recommender_stage', stage='load_anime_csv'):
+            self.anime_df = pd.read_csv(anime_path, dtype=anime_dtypes)
         
-        if rating_path and os.path.exists(rating_path):
-            self.rating_df = pd.read_csv(rating_path, dtype=rating_dtypes, nrows=500000)
-            
-            # Filter noise immediately to save RAM
-            # Remove users who didn't rate content (rating = -1)
-            self.rating_df = self.rating_df[self.rating_df['rating'] >= 0]
-            
-            # Keep only users with > 50 ratings (Quality over Quantity)
-            counts = self.rating_df['user_id'].value_counts()
-            self.rating_df = self.rating_df[self.rating_df['user_id'].isin(counts[counts > 50].index)]
+        self._streamed_ratings = None
+        if rating_path and os.path.exists(rating_path) and streaming:
+            with self.metrics.span('recommender_stage', stage='load_ratings', mode='streaming'):
+                # Goes straight to the rating matrix; there is no rating_df
+                self.rating_df = None
+                self._streamed_ratings = self._load_ratings_streaming(
+                    rating_path, rating_dtypes, memory_budget_mb, self.anime_df['anime_id'].values)
+        elif rating_path and os.path.exists(rating_path):
+            with self.metrics.span('recommender_stage', stage='load_ratings', mode='prefix'):
+                self.rating_df = pd.read_csv(rating_path, dtype=rating_dtypes, nrows=500000)
+                
+                # Filter noise immediately to save RAM
+                # Remove users who didn't rate content (rating = -1)
+                self.rating_df = self.rating_df[self.rating_df['rating'] >= 0]
+                
+                # Keep only users with > 50 ratings (Quality over Quantity)
+                counts = self.rating_df['user_id'].value_counts()
+                self.rating_df = self.rating_df[self.rating_df['user_id'].isin(counts[counts > 50].index)]
         else:
             self.rating_df = None
         
@@ -59,16 +269,152 @@ class AnimeRecommendationSystem:
         self.anime_df['genre'] = self.anime_df['genre'].astype('string')
         self.anime_df['type'] = self.anime_df['type'].astype('category')
 
+    @staticmethod
+    def _load_ratings_streaming(rating_path, rating_dtypes, memory_budget_mb, catalog_ids, min_user_ratings=50):
+        """
+        Two-pass chunked reader for the full rating file, straight into the
+        item x user rating matrix.
+        Pass 1 counts valid ratings per user; pass 2 keeps rows of users with
+        > min_user_ratings whose anime is in catalog_ids, numbering users and
+        anime in first-appearance order as they stream by, and the matrix is
+        then filled chunk by chunk. The parse working set is bounded by
+        memory_budget_mb; what grows with the file is the kept rows as codes
+        (9 bytes each) and the matrix (5 bytes per entry).
+        Returns (matrix, anime_ids, user_ids), the same matrix and id order
+        _build_collaborative_model builds from the filtered rating_df.
+        """
+        chunk_rows = max(10000, int(memory_budget_mb * 1024 * 1024) // _CSV_BYTES_PER_ROW)
+
+        # Pass 1: per-user counts in a dense uint32 counter indexed by user_id
+        counts = np.zeros(0, dtype=np.uint32)
+        for chunk in pd.read_csv(rating_path, dtype=rating_dtypes, usecols=['user_id', 'rating'],
+                                 chunksize=chunk_rows):
+            users = chunk['user_id'].values[chunk['rating'].values >= 0]
+            if users.size == 0:
+                continue
+            chunk_counts = np.bincount(users)
+            if chunk_counts.size > counts.size:
+                counts = np.concatenate([counts, np.zeros(chunk_counts.size - counts.size, dtype=np.uint32)])
+            counts[:chunk_counts.size] += chunk_counts.astype(np.uint32)
+
+        keep_user = counts > min_user_ratings
+        total = int(counts[keep_user].sum(dtype=np.int64))
+        del counts
+
+        # Pass 2: id -> code tables (dense, -1 = unseen) and the kept rows as codes
+        catalog_ids = np.asarray(catalog_ids, dtype=np.int64)
+        in_catalog = np.zeros(int(catalog_ids.max()) + 1 if len(catalog_ids) else 0, dtype=bool)
+        in_catalog[catalog_ids] = True
+        user_code = np.full(len(keep_user), -1, dtype=np.int32)
+        anime_code = np.full(len(in_catalog), -1, dtype=np.int32)
+        seen_users, seen_animes = [], []
+        item_codes = np.empty(total, dtype=np.int32)
+        user_codes = np.empty(total, dtype=np.int32)
+        ratings = np.empty(total, dtype=np.int8)
+        pos = 0
+        for chunk in pd.read_csv(rating_path, dtype=rating_dtypes, chunksize=chunk_rows):
+            users = chunk['user_id'].values
+            animes = chunk['anime_id'].values
+            rating = chunk['rating'].values
+            mask = rating >= 0
+            mask[mask] = keep_user[users[mask]]
+            mask &= (animes >= 0) & (animes < len(in_catalog))
+            mask[mask] = in_catalog[animes[mask]]
+            n = int(mask.sum())
+            user_codes[pos:pos + n] = _first_seen_codes(users[mask], user_code, seen_users)
+            item_codes[pos:pos + n] = _first_seen_codes(animes[mask], anime_code, seen_animes)
+            ratings[pos:pos + n] = rating[mask]
+            pos += n
+        del user_code, anime_code
+
+        anime_ids = np.concatenate(seen_animes) if seen_animes else np.empty(0, dtype=np.int32)
+        user_ids = np.concatenate(seen_users) if seen_users else np.empty(0, dtype=np.int32)
+        matrix = _csr_from_codes(item_codes[:pos], user_codes[:pos], ratings[:pos],
+                                 (len(anime_ids), len(user_ids)), chunk_rows)
+        return matrix, anime_ids, user_ids
+
     def preprocess_data(self):
         """
         Basic preprocessing
         """
         if self.anime_df is not None:
-            # Helper for name search
-            self.anime_df['name_lower'] = self.anime_df['name'].str.lower()
-            
             # Fill NaN
             self.anime_df['genre'] = self.anime_df['genre'].fillna('')
+            
+            # Positions double as labels from here on
+            self.anime_df = self.anime_df.reset_index(drop=True)
+            with self.metrics.span('recommender_stage', stage='preprocess'):
+                self._build_catalog_index()
+
+    def _build_catalog_index(self):
+        """
+        Precompute anime_id -> row positions and plain numpy columns so
+        result packaging is an array gather instead of DataFrame scans.
+        """
+        anime_ids = self.anime_df['anime_id'].to_numpy(dtype=np.int64)
+        row_of_anime_id = np.full(int(anime_ids.max()) + 1 if len(anime_ids) else 0, -1, dtype=np.int32)
+        
+        # Assign in reverse so duplicated ids resolve to their first row
+        rows = np.arange(len(anime_ids), dtype=np.int32)
+        row_of_anime_id[anime_ids[::-1]] = rows[::-1]
+        self.row_of_anime_id = row_of_anime_id
+        
+        self.catalog_columns = {
+            'name': self.anime_df['name'].to_numpy(dtype=object),
+            'genre': self.anime_df['genre'].to_numpy(dtype=object),
+            # float32 storage -> 2 decimals as in the CSV, so results print cleanly
+            'rating': self.anime_df['rating'].to_numpy(dtype=np.float64).round(2),
+            'type': self.anime_df['type'].astype(object).to_numpy(),
+            'episodes': self.anime_df['episodes'].to_numpy(dtype=object),
+            'anime_id': self.anime_df['anime_id'].to_numpy(dtype=np.int32),
+        }
+        self._build_item_rows()
+        
+        # Global orders for top lists and category postings (NaN last)
+        members = self.anime_df['members'].to_numpy(dtype=np.float32) if 'members' in self.anime_df else None
+        self.catalog_orders = {'rating': np.argsort(-self.catalog_columns['rating'], kind='stable').astype(np.int32)}
+        if members is not None:
+            self.catalog_orders['members'] = np.argsort(-members, kind='stable').astype(np.int32)
+        
+        # Popularity prior for hybrid scoring; log-scaled so blockbusters don't swamp similarity
+        prior = np.log1p(np.nan_to_num(members if members is not None else np.zeros(len(anime_ids), np.float32)))
+        top = prior.max() if len(prior) else 0
+        self.popularity_prior = (prior / top if top > 0 else prior).astype(np.float32)
+        
+        # Filter pushdown (type / rating / episodes / members masks)
+        self.catalog_filter = CatalogFilter(self.catalog_columns['type'], self.catalog_columns['rating'],
+                                            self.catalog_columns['episodes'], members)
+        
+        # Title search (trigram index + prefix autocomplete)
+        self.title_index = TitleIndex(self.catalog_columns['name'], members)
+        
+        # Genre bitsets (content model) + per-genre postings (category pages)
+        self.genre_index = GenreIndex(self.catalog_columns['genre'], members)
+        self.genre_index.build_postings(self.catalog_orders)
+
+    def _build_item_rows(self):
+        """
+        Map collaborative matrix indices to catalog rows.
+        """
+        if not self.index_to_anime_id or self.row_of_anime_id is None:
+            self.item_rows = None
+            return
+        item_anime_ids = np.fromiter(
+            (self.index_to_anime_id[i] for i in range(len(self.index_to_anime_id))),
+            dtype=np.int64, count=len(self.index_to_anime_id))
+        self.item_rows = self.row_of_anime_id[item_anime_ids]
+
+    def get_row(self, anime_id):
+        """
+        Catalog row position of an anime_id, or None.
+        """
+        if self.row_of_anime_id is None or anime_id is None:
+            return None
+        anime_id = int(anime_id)
+        if 0 <= anime_id < len(self.row_of_anime_id):
+            row = int(self.row_of_anime_id[anime_id])
+            return row if row >= 0 else None
+        return None
 
     def build_models(self):
         """
@@ -79,169 +425,989 @@ class AnimeRecommendationSystem:
 
     def _build_content_model(self):
         """
-        Build Content-Based Model using TF-IDF.
-        Lazy import sklearn to prevent import-time crashes.
+        Content-Based Model = genre bitsets, built with the catalog index in
+        preprocess_data. Only builds here if preprocessing was skipped.
         """
-        from sklearn.feature_extraction.text import TfidfVectorizer
-        from sklearn.metrics.pairwise import linear_kernel
-        
-        # TF-IDF Matrix
-        self.vectorizer = TfidfVectorizer(stop_words='english')
-        self.tfidf_matrix = self.vectorizer.fit_transform(self.anime_df['genre'])
-        
-        # Remove duplicates for mapping 
-        self.anime_unique = self.anime_df.drop_duplicates(subset='name')
-        self.indices = pd.Series(self.anime_unique.index, index=self.anime_unique['name']).drop_duplicates()
+        if self.genre_index is None:
+            with self.metrics.span('recommender_stage', stage='content_model'):
+                self._build_catalog_index()
 
     def _build_collaborative_model(self):
         """
         Build Item-Based Composite Filtering Model using NearestNeighbors.
         Uses Scipy Sparse Matrix + Lazy Imports to avoid MemoryError.
         """
-        if self.rating_df is None or self.anime_df is None:
+        if (self.rating_df is None and self._streamed_ratings is None) or self.anime_df is None:
             return
 
-        # Lazy Import heavy libraries
-        from sklearn.neighbors import NearestNeighbors
-        from scipy.sparse import csr_matrix
+        with self.metrics.span('recommender_stage', stage='collaborative_model'):
+            # Lazy Import heavy libraries
+            from sklearn.neighbors import NearestNeighbors
+            from scipy.sparse import csr_matrix
 
-        # Prepare data for sparse matrix
-        # Optimize: Filter instead of Merge to save RAM
-        valid_anime_ids = set(self.anime_df['anime_id'])
-        self.rating_df = self.rating_df[self.rating_df['anime_id'].isin(valid_anime_ids)]
+            if self.rating_df is not None:
+                # Prepare data for sparse matrix
+                # Optimize: Filter instead of Merge to save RAM
+                valid_anime_ids = set(self.anime_df['anime_id'])
+                self.rating_df = self.rating_df[self.rating_df['anime_id'].isin(valid_anime_ids)]
+            
+                # Create Sparse Matrix directly
+                unique_users = self.rating_df['user_id'].unique()
+                unique_animes = self.rating_df['anime_id'].unique()
+            
+                user_to_idx = {user: i for i, user in enumerate(unique_users)}
+                anime_to_idx = {anime: i for i, anime in enumerate(unique_animes)}
+            
+                # Create arrays
+                user_indices = self.rating_df['user_id'].map(user_to_idx).values
+                anime_indices = self.rating_df['anime_id'].map(anime_to_idx).values
+                ratings = self.rating_df['rating'].values
+            
+                # Build Matrix
+                self.anime_matrix = csr_matrix((ratings, (anime_indices, user_indices)), shape=(len(unique_animes), len(unique_users)))
+            else:
+                # Streaming load already built the matrix (see _load_ratings_streaming)
+                self.anime_matrix, unique_animes, unique_users = self._streamed_ratings
+                user_to_idx = {user: i for i, user in enumerate(unique_users.tolist())}
+                anime_to_idx = {anime: i for i, anime in enumerate(unique_animes.tolist())}
+            self._streamed_ratings = None
         
-        # Create Sparse Matrix directly
-        unique_users = self.rating_df['user_id'].unique()
-        unique_animes = self.rating_df['anime_id'].unique()
+            # Update lookup maps
+            self.anime_id_to_index = anime_to_idx
+            self.index_to_anime_id = {i: anime for anime, i in anime_to_idx.items()}
+            self.user_id_to_index = user_to_idx
+            self._build_item_rows()
         
-        user_to_idx = {user: i for i, user in enumerate(unique_users)}
-        anime_to_idx = {anime: i for i, anime in enumerate(unique_animes)}
+            self._normed_items = None
         
-        # Update lookup maps
-        self.anime_id_to_index = anime_to_idx
-        self.index_to_anime_id = {i: anime for anime, i in anime_to_idx.items()}
+            # Fit Model
+            self.knn_model = NearestNeighbors(metric='cosine', algorithm='brute')
+            self.knn_model.fit(self.anime_matrix)
         
-        # Create arrays
-        user_indices = self.rating_df['user_id'].map(user_to_idx).values
-        anime_indices = self.rating_df['anime_id'].map(anime_to_idx).values
-        ratings = self.rating_df['rating'].values
+            if self.neighbor_k:
+                with self.metrics.span('recommender_stage', stage='neighbor_table'):
+                    self._build_neighbor_table(self.neighbor_k)
         
-        # Build Matrix
-        self.anime_matrix = csr_matrix((ratings, (anime_indices, user_indices)), shape=(len(unique_animes), len(unique_users)))
+            if self.ann_backend:
+                with self.metrics.span('recommender_stage', stage='ann_index'):
+                    self.ann_index = make_ann_index(self.ann_backend, **(self.ann_params or {}))
+                    self.ann_index.fit(self._normalized_items()[0])
         
-        # Fit Model
-        self.knn_model = NearestNeighbors(metric='cosine', algorithm='brute')
-        self.knn_model.fit(self.anime_matrix)
+            if self.embedding_rank:
+                with self.metrics.span('recommender_stage', stage='embeddings'):
+                    self.item_embeddings = ItemEmbeddings(rank=self.embedding_rank).fit(self.anime_matrix)
+
+    def _build_neighbor_table(self, k):
+        """
+        Precompute the top-K cosine neighbors of every anime.
+        Rows are processed in blocks so each step is one sparse matmul and the
+        dense scratch space is only (block_size x n_items) float32.
+        """
+        n_items = self.anime_matrix.shape[0]
+        k = min(k, n_items - 1)
+        if k <= 0:
+            return
+
+        self.neighbor_ids, self.neighbor_scores = self._neighbor_rows(np.arange(n_items), k)
+
+    def _neighbor_rows(self, items, k, on_block=None):
+        """
+        Exact top-k neighbors of the given item indices, block by block.
+        on_block(block_items, sims) sees each dense similarity block.
+        """
+        normed, normed_t = self._normalized_items()
+
+        neighbor_ids = np.empty((len(items), k), dtype=np.int32)
+        neighbor_scores = np.empty((len(items), k), dtype=np.float32)
+
+        for start in range(0, len(items), self.neighbor_block_size):
+            block = items[start:start + self.neighbor_block_size]
+            sims = (normed[block] @ normed_t).toarray()
+            
+            # Never return the anime itself
+            sims[np.arange(len(block)), block] = -np.inf
+            if on_block is not None:
+                on_block(block, sims)
+            neighbor_ids[start:start + len(block)], neighbor_scores[start:start + len(block)] = _top_k(sims, k)
+
+        return neighbor_ids, neighbor_scores
+
+    def _normalized_items(self):
+        """
+        L2-normalized float32 item matrix and its transpose, so cosine
+        similarity is a sparse matmul. Built on first use and cached.
+        """
+        if self._normed_items is None:
+            from sklearn.preprocessing import normalize
+            
+            normed = normalize(self.anime_matrix.astype(np.float32), norm='l2', axis=1).tocsr()
+            self._normed_items = (normed, normed.T.tocsr())
+        return self._normed_items
+
+    # --- Incremental Updates ---
+    def add_ratings(self, ratings):
+        """
+        Fold new (user_id, anime_id, rating) rows into the collaborative model
+        without a rebuild. Rows with rating < 0 or anime_ids missing from the
+        catalog are dropped, as in a full build. Unseen users and anime extend
+        the id maps in first-appearance order, so the result matches a full
+        rebuild on the concatenated ratings (duplicate pairs are summed in
+        both). Load-time filters such as the >50 ratings per user rule are
+        not re-applied.
+        Only the touched item rows of the matrix and its normalized copy, and
+        the rows of the transpose for users who rated a touched item, are
+        rebuilt and spliced in; the new rows are buffered for rating_df. So
+        beyond one memcpy of the stored entries the cost follows the delta.
+        Touched items get their neighbor rows recomputed exactly; every other
+        row merges the touched items into its existing top-K, and is only
+        recomputed when a stale entry may have hidden a better neighbor. ANN
+        codes and embeddings are refreshed for the touched items only
+        (embeddings by fold-in, not a refit).
+        Returns the number of rows applied.
+        """
+        from scipy.sparse import csr_matrix
+
+        if self.anime_matrix is None or self.anime_df is None:
+            raise ValueError("add_ratings needs a built collaborative model")
 
-    def get_recommendations(self, anime_title, top_n=10):
+        ratings = ratings[(ratings['rating'] >= 0) & ratings['anime_id'].isin(self.catalog_columns['anime_id'])]
+        if len(ratings) == 0:
+            return 0
+
+        with self.metrics.span('recommender_stage', stage='add_ratings'):
+            # 1. Extend the id maps (new ids take the next indices)
+            for user in pd.unique(ratings['user_id']).tolist():
+                if user not in self.user_id_to_index:
+                    self.user_id_to_index[user] = len(self.user_id_to_index)
+            for anime in pd.unique(ratings['anime_id']).tolist():
+                if anime not in self.anime_id_to_index:
+                    idx = len(self.anime_id_to_index)
+                    self.anime_id_to_index[anime] = idx
+                    self.index_to_anime_id[idx] = anime
+            n_old = self.anime_matrix.shape[0]
+            shape = (len(self.anime_id_to_index), len(self.user_id_to_index))
+            if shape[0] > n_old:
+                self._build_item_rows()
+
+            # 2. Matrix += delta, rebuilding only the touched rows
+            # (Series.map(dict) would convert the whole map on every call)
+            item_indices = np.fromiter((self.anime_id_to_index[a] for a in ratings['anime_id'].tolist()),
+                                       dtype=np.int64, count=len(ratings))
+            user_indices = np.fromiter((self.user_id_to_index[u] for u in ratings['user_id'].tolist()),
+                                       dtype=np.int64, count=len(ratings))
+            delta = csr_matrix((ratings['rating'].values, (item_indices, user_indices)), shape=shape)
+            touched = np.unique(item_indices)
+            old_rows = touched[touched < n_old]
+            merged = _grow_csr(self.anime_matrix, shape)[touched] + delta[touched]
+            self.anime_matrix = _splice_rows(self.anime_matrix, touched, merged, shape)
+            self.knn_model.fit(self.anime_matrix)
+            self.memory_mapped = False
+            if self._rating_df is not None:
+                # Concatenated when rating_df is next read
+                self._rating_deltas.append(ratings)
+
+            # 3. Renormalize the touched rows only
+            if self._normed_items is not None:
+                from sklearn.preprocessing import normalize
+
+                normed, normed_t = self._normed_items
+                fresh = normalize(merged.astype(np.float32), norm='l2', axis=1)
+                # Transpose: only the rows of users who rated a touched item change
+                users = np.unique(np.concatenate([normed[old_rows].indices, fresh.indices]))
+                user_rows = _grow_csr(normed_t, shape[::-1])[users]
+                is_touched = np.zeros(shape[0], dtype=bool)
+                is_touched[touched] = True
+                keep = ~is_touched[user_rows.indices]
+                user_rows = csr_matrix((
+                    np.concatenate([user_rows.data[keep], fresh.data]),
+                    (np.concatenate([np.repeat(np.arange(len(users)), np.diff(user_rows.indptr))[keep],
+                                     np.searchsorted(users, fresh.indices)]),
+                     np.concatenate([user_rows.indices[keep], np.repeat(touched, np.diff(fresh.indptr))]))),
+                    shape=(len(users), shape[0]))
+                self._normed_items = (_splice_rows(normed, touched, fresh, shape),
+                                      _splice_rows(normed_t, users, user_rows, shape[::-1]))
+
+            # 4. Neighbor table, ANN, embeddings
+            if self.neighbor_ids is not None:
+                self._update_neighbor_table(touched, n_old)
+            elif self.neighbor_k:
+                self._build_neighbor_table(self.neighbor_k)
+            if self.ann_index is not None:
+                self.ann_index.update(touched, normed=self._normalized_items()[0])
+            if self.item_embeddings is not None:
+                self.item_embeddings.update(self.anime_matrix, touched)
+
+        self.metrics.inc('recommender_ratings_added_total', len(ratings))
+        return len(ratings)
+
+    def _update_neighbor_table(self, touched, n_old):
+        """
+        Neighbor table after the rows in `touched` changed (see add_ratings).
+        """
+        n_items = self.anime_matrix.shape[0]
+        k = self.neighbor_ids.shape[1]
+        if min(self.neighbor_k, n_items - 1) != k:
+            self._build_neighbor_table(self.neighbor_k) # table width changes: start over
+            return
+
+        # Untouched rows: old lists with touched entries knocked out ...
+        is_touched = np.zeros(n_items, dtype=bool)
+        is_touched[touched] = True
+        running_ids = np.zeros((n_items, k), dtype=np.int32)
+        running_scores = np.full((n_items, k), -np.inf, dtype=np.float32)
+        running_ids[:n_old] = self.neighbor_ids
+        running_scores[:n_old] = np.where(is_touched[self.neighbor_ids], -np.inf, self.neighbor_scores)
+        bound = np.full(n_items, np.inf, dtype=np.float32)
+        bound[:n_old] = self.neighbor_scores[:, -1] # no unseen neighbor scored above this
+
+        # ... merged with fresh similarities to the touched items (symmetric)
+        def merge(block, sims):
+            ids = np.concatenate([running_ids, np.broadcast_to(block.astype(np.int32), (n_items, len(block)))], axis=1)
+            scores = np.concatenate([running_scores, sims.T], axis=1)
+            top, running_scores[:] = _top_k(scores, k)
+            running_ids[:] = np.take_along_axis(ids, top, axis=1)
+
+        touched_ids, touched_scores = self._neighbor_rows(touched, k, on_block=merge)
+        running_ids[touched], running_scores[touched] = touched_ids, touched_scores
+
+        # A knocked-out entry may have hidden a neighbor we never scored
+        stale = np.flatnonzero(~is_touched & (running_scores[:, -1] < bound))
+        if len(stale):
+            running_ids[stale], running_scores[stale] = self._neighbor_rows(stale, k)
+
+        self.neighbor_ids, self.neighbor_scores = running_ids, running_scores
+
+    def memory_usage(self):
+        """
+        Bytes held per model component (array storage; memory-mapped arrays
+        count their mapped size, which the OS may share or page out).
+        """
+        def _sparse(matrix):
+            return matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes if matrix is not None else 0
+
+        usage = {
+            'catalog': int(self.anime_df.memory_usage(deep=True).sum()) if self.anime_df is not None else 0,
+            'catalog_index': sum(a.nbytes for a in self.catalog_columns.values() if isinstance(a, np.ndarray))
+                             + sum(a.nbytes for a in self.catalog_orders.values())
+                             + (self.row_of_anime_id.nbytes if self.row_of_anime_id is not None else 0)
+                             + (self.item_rows.nbytes if self.item_rows is not None else 0),
+            'title_index': self.title_index.nbytes if self.title_index is not None else 0,
+            'genre_index': self.genre_index.nbytes if self.genre_index is not None else 0,
+            'catalog_filter': self.catalog_filter.nbytes if self.catalog_filter is not None else 0,
+            'ratings': sum(int(df.memory_usage(deep=True).sum())
+                           for df in [self._rating_df, *self._rating_deltas] if df is not None),
+            'matrix': _sparse(self.anime_matrix),
+            'normed_matrix': sum(_sparse(m) for m in self._normed_items) if self._normed_items else 0,
+            'neighbor_table': sum(a.nbytes for a in (self.neighbor_ids, self.neighbor_scores) if a is not None),
+            'ann_index': sum(np.asarray(a).nbytes for a in self.ann_index.to_arrays().values())
+                         if self.ann_index is not None else 0,
+            'embeddings': self.item_embeddings.nbytes if self.item_embeddings is not None else 0,
+        }
+        return usage
+
+    def metric_samples(self):
+        """
+        Collector for metrics.Metrics.register_collector: memory per component.
+        """
+        return [('recommender_component_bytes', {'component': name}, value)
+                for name, value in self.memory_usage().items()]
+
+    # --- Persistence ---
+    @staticmethod
+    def source_fingerprint(anime_path, rating_path=None, previous=None):
+        """
+        Checksum the input CSVs.
+        Files whose size and mtime match `previous` (an earlier fingerprint)
+        reuse the stored digest instead of re-hashing hundreds of MB.
+        """
+        previous = previous or {}
+        fingerprint = {}
+        for key, path in (('anime', anime_path), ('rating', rating_path)):
+            if not path or not os.path.exists(path):
+                fingerprint[key] = None
+                continue
+            stat = os.stat(path)
+            entry = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+            old = previous.get(key)
+            if old and old.get('size') == entry['size'] and old.get('mtime_ns') == entry['mtime_ns']:
+                entry['blake2b'] = old['blake2b']
+            else:
+                digest = hashlib.blake2b(digest_size=16)
+                with open(path, 'rb') as f:
+                    for block in iter(lambda: f.read(1 << 20), b''):
+                        digest.update(block)
+                entry['blake2b'] = digest.hexdigest()
+            fingerprint[key] = entry
+        return fingerprint
+
+    def _artifact_arrays(self):
+        """
+        Large arrays written as .npy so load() can memory-map them.
+        """
+        arrays = {}
+        if self.anime_matrix is not None:
+            arrays['matrix_data'] = self.anime_matrix.data
+            arrays['matrix_indices'] = self.anime_matrix.indices
+            arrays['matrix_indptr'] = self.anime_matrix.indptr
+            arrays['item_anime_ids'] = np.array(
+                [self.index_to_anime_id[i] for i in range(len(self.index_to_anime_id))], dtype=np.int32)
+            arrays['user_ids'] = np.fromiter(self.user_id_to_index.keys(), dtype=np.int32,
+                                             count=len(self.user_id_to_index))
+            
+            # Normalized copies share the sparsity pattern of anime_matrix
+            normed, normed_t = self._normalized_items()
+            arrays['normed_data'] = normed.data
+            arrays['normed_t_data'] = normed_t.data
+            arrays['normed_t_indices'] = normed_t.indices
+            arrays['normed_t_indptr'] = normed_t.indptr
+        if self.neighbor_ids is not None:
+            arrays['neighbor_ids'] = self.neighbor_ids
+            arrays['neighbor_scores'] = self.neighbor_scores
+        if self.ann_index is not None:
+            for name, array in self.ann_index.to_arrays().items():
+                arrays['ann_' + name] = array
+        if self.item_embeddings is not None:
+            for name, array in self.item_embeddings.to_arrays().items():
+                arrays['embedding_' + name] = array
+        return arrays
+
+    def save(self, artifact_dir, fingerprint=None, streaming=False):
+        """
+        Write the built models to a versioned artifact directory.
+        The directory is written next to the target under a unique temporary
+        name and renamed into place, so a crash never leaves a half-written
+        artifact behind and concurrent saves never write into each other's.
+        An existing non-empty directory without a manifest.json is not an
+        artifact (e.g. a versioned root) and is never replaced.
+        """
+        artifact_dir = os.path.abspath(artifact_dir)
+        if (os.path.isdir(artifact_dir) and os.listdir(artifact_dir)
+                and not os.path.exists(os.path.join(artifact_dir, 'manifest.json'))):
+            raise FileExistsError(f"{artifact_dir} exists and is not an artifact directory")
+        parent = os.path.dirname(artifact_dir)
+        os.makedirs(parent, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix=os.path.basename(artifact_dir) + '.tmp-', dir=parent)
+        try:
+            self._write_artifact(tmp_dir, fingerprint, streaming)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        old_dir = tmp_dir + '.old'
+        try:
+            os.rename(artifact_dir, old_dir)
+        except FileNotFoundError:
+            pass
+        try:
+            os.rename(tmp_dir, artifact_dir)
+        except OSError as e:
+            if e.errno not in (errno.EEXIST, errno.ENOTEMPTY):
+                raise
+            # A concurrent save of the same sources got there first: keep it
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        shutil.rmtree(old_dir, ignore_errors=True)
+        self.artifact_dir = artifact_dir
+
+    def _write_artifact(self, tmp_dir, fingerprint, streaming):
+        """
+        Arrays, catalog and manifest of save(), into tmp_dir.
+        """
+        shapes = {}
+        if self.anime_matrix is not None:
+            shapes['matrix'] = list(self.anime_matrix.shape)
+        for name, array in self._artifact_arrays().items():
+            np.save(os.path.join(tmp_dir, name + '.npy'), np.ascontiguousarray(array))
+
+        # Catalog is small; pickle keeps the string/category dtypes intact
+        self.anime_df.to_pickle(os.path.join(tmp_dir, 'catalog.pkl'))
+
+        manifest = {
+            'version': ARTIFACT_VERSION,
+            'fingerprint': fingerprint,
+            'shapes': shapes,
+            'neighbor_k': self.neighbor_k,
+            'ann_backend': self.ann_backend,
+            'ann_params': self.ann_params,
+            'ann_arrays': sorted(self.ann_index.to_arrays()) if self.ann_index is not None else [],
+            'embedding_rank': self.embedding_rank,
+            'streaming': streaming,
+        }
+        with open(os.path.join(tmp_dir, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+    @staticmethod
+    def read_manifest(artifact_dir):
+        """
+        Return the artifact manifest, or None if missing/unreadable/outdated.
+        """
+        try:
+            with open(os.path.join(artifact_dir, 'manifest.json')) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest.get('version') != ARTIFACT_VERSION:
+            return None
+        return manifest
+
+    @staticmethod
+    def artifact_versions(artifact_root):
+        """
+        (number, path) of the v<N> directories under artifact_root, oldest first.
+        """
+        try:
+            names = os.listdir(artifact_root)
+        except OSError:
+            return []
+        versions = [(int(name[1:]), os.path.join(os.path.abspath(artifact_root), name))
+                    for name in names if name[:1] == 'v' and name[1:].isdigit()]
+        return sorted(versions)
+
+    @classmethod
+    def prune_artifacts(cls, artifact_root, keep_from):
+        """
+        Delete the v<N> directories older than keep_from (a version path,
+        e.g. the previous model's artifact_dir). Newer versions and keep_from
+        itself stay, so nothing a resident model has mapped is removed.
+        """
+        keep_from = os.path.abspath(keep_from)
+        numbers = {path: number for number, path in cls.artifact_versions(artifact_root)}
+        if keep_from not in numbers:
+            return
+        for path, number in numbers.items():
+            if number < numbers[keep_from]:
+                shutil.rmtree(path, ignore_errors=True)
+
+    @classmethod
+    def load(cls, artifact_dir, mmap=True, **kwargs):
+        """
+        Load a system written by save().
+        With mmap=True the large arrays are memory-mapped read-only, so
+        startup cost is independent of matrix size and pages are shared
+        between processes through the OS page cache.
+        kwargs are query-time constructor options (collaborative_engine,
+        metrics, ...); the build-time ones come from the manifest.
+        """
+        from scipy.sparse import csr_matrix
+
+        manifest = cls.read_manifest(artifact_dir)
+        if manifest is None:
+            raise ValueError(f"No compatible artifact in {artifact_dir}")
+
+        mmap_mode = 'r' if mmap else None
+        def _array(name):
+            path = os.path.join(artifact_dir, name + '.npy')
+            return np.load(path, mmap_mode=mmap_mode) if os.path.exists(path) else None
+
+        system = cls(**{key: manifest.get(key) for key in _BUILD_SETTINGS}, **kwargs)
+        system.memory_mapped = mmap
+        system.artifact_dir = os.path.abspath(artifact_dir)
+        system.anime_df = pd.read_pickle(os.path.join(artifact_dir, 'catalog.pkl'))
+
+        shapes = manifest['shapes']
+        system._build_catalog_index()
+
+        if 'matrix' in shapes:
+            from sklearn.neighbors import NearestNeighbors
+
+            system.anime_matrix = csr_matrix(
+                (_array('matrix_data'), _array('matrix_indices'), _array('matrix_indptr')),
+                shape=tuple(shapes['matrix']), copy=False)
+            item_anime_ids = _array('item_anime_ids').tolist()
+            system.anime_id_to_index = {anime: i for i, anime in enumerate(item_anime_ids)}
+            system.index_to_anime_id = dict(enumerate(item_anime_ids))
+            system.user_id_to_index = {user: i for i, user in enumerate(_array('user_ids').tolist())}
+            system.neighbor_ids = _array('neighbor_ids')
+            system.neighbor_scores = _array('neighbor_scores')
+            system._build_item_rows()
+            
+            normed = csr_matrix(
+                (_array('normed_data'), system.anime_matrix.indices, system.anime_matrix.indptr),
+                shape=system.anime_matrix.shape, copy=False)
+            normed_t = csr_matrix(
+                (_array('normed_t_data'), _array('normed_t_indices'), _array('normed_t_indptr')),
+                shape=system.anime_matrix.shape[::-1], copy=False)
+            system._normed_items = (normed, normed_t)
+            
+            if system.ann_backend:
+                backend = ANN_BACKENDS[system.ann_backend]
+                ann_arrays = {name: np.asarray(_array('ann_' + name)) for name in manifest['ann_arrays']}
+                system.ann_index = backend.from_arrays(ann_arrays, normed, **(system.ann_params or {}))
+            
+            if system.embedding_rank:
+                system.item_embeddings = ItemEmbeddings.from_arrays(
+                    {'vectors': _array('embedding_vectors'), 'components': _array('embedding_components')},
+                    rank=system.embedding_rank)
+
+            # Brute-force "fit" only keeps a reference to the matrix
+            system.knn_model = NearestNeighbors(metric='cosine', algorithm='brute')
+            system.knn_model.fit(system.anime_matrix)
+
+        return system
+
+    @classmethod
+    def load_or_build(cls, anime_path, rating_path=None, artifact_dir=None, mmap=True,
+                      load_options=None, progress=None, versioned=False, **kwargs):
+        """
+        Load the artifact if it was built from the same CSVs, otherwise
+        rebuild from scratch and save a fresh artifact.
+        versioned=True treats artifact_dir as a root of v<N> directories: the
+        newest is reused when up to date, and a rebuild is saved as the next
+        version without touching the others (a serving model may have them
+        mapped; see prune_artifacts).
+        load_options are passed to load_data(); extra kwargs to the constructor.
+        progress(stage) is called as each stage starts: 'fingerprint', then
+        'artifact' on the fast path, or 'load', 'preprocess', 'content',
+        'collaborative', 'save' on a rebuild.
+        """
+        load_options = load_options or {}
+        progress = progress or (lambda stage: None)
+        progress('fingerprint')
+        save_dir = artifact_dir
+        if artifact_dir and versioned:
+            versions = cls.artifact_versions(artifact_dir)
+            number = versions[-1][0] if versions else 0
+            save_dir = os.path.join(artifact_dir, f'v{number + 1}')
+            artifact_dir = versions[-1][1] if versions else None
+        manifest = cls.read_manifest(artifact_dir) if artifact_dir else None
+        previous = (manifest.get('fingerprint') or {}) if manifest else {}
+        fingerprint = cls.source_fingerprint(anime_path, rating_path, previous)
+
+        def _digest(fp, key):
+            return fp[key]['blake2b'] if fp.get(key) else None
+
+        up_to_date = (
+            manifest is not None
+            and all(manifest.get(key) == kwargs.get(key) for key in _BUILD_SETTINGS)
+            and manifest.get('streaming', False) == load_options.get('streaming', False)
+            and all(_digest(previous, key) == _digest(fingerprint, key) for key in ('anime', 'rating'))
+        )
+        if up_to_date:
+            try:
+                progress('artifact')
+                # Build-time settings match the manifest; the rest apply as given
+                system = cls.load(artifact_dir, mmap=mmap,
+                                  **{key: value for key, value in kwargs.items() if key not in _BUILD_SETTINGS})
+                if previous != fingerprint:
+                    # Touched but unchanged: remember new mtimes to skip hashing next time
+                    manifest['fingerprint'] = fingerprint
+                    with open(os.path.join(artifact_dir, 'manifest.json'), 'w') as f:
+                        json.dump(manifest, f, indent=2)
+                return system
+            except (OSError, ValueError, KeyError):
+                pass # Corrupt artifact: rebuild below
+
+        system = cls(**kwargs)
+        progress('load')
+        system.load_data(anime_path, rating_path, **load_options)
+        progress('preprocess')
+        system.preprocess_data()
+        progress('content')
+        system._build_content_model()
+        progress('collaborative')
+        system._build_collaborative_model()
+        if save_dir:
+            progress('save')
+            system.save(save_dir, fingerprint=fingerprint,
+                        streaming=load_options.get('streaming', False))
+        return system
+
+    def get_recommendations(self, anime_title, top_n=10, engine=None, filters=None):
         """
         Get recommendations using Hybrid (Collab -> Content Fallback)
+        engine: 'knn' or 'mf' for the collaborative step (default:
+        self.collaborative_engine). 'mf' needs embedding_rank at build time.
+        'hybrid' blends both in one pass instead (get_hybrid_recommendations).
+        filters: catalog filter spec (see catalog_filter.py), applied inside
+        the top-K; when fewer than top_n collaborative neighbors pass, the
+        content step answers instead.
+        Each fallback is counted in recommender_fallback_total by reason.
         """
-        # 1. Find the anime
-        search = self.anime_df[self.anime_df['name'].str.contains(anime_title, case=False, na=False)]
-        if search.empty:
+        engine = engine or self.collaborative_engine
+        if engine == 'hybrid':
+            return self.get_hybrid_recommendations(anime_title, top_n, filters=filters)
+        metrics = self.metrics
+        allowed = self.catalog_filter.mask(filters)
+        
+        # 1. Find the anime (exact title, else best fuzzy match)
+        with metrics.span('recommender_stage', stage='title_lookup'):
+            target_row = self.title_index.lookup(anime_title)
+        if target_row is None:
+            metrics.inc('recommender_requests_total', path='error')
+            metrics.inc('recommender_fallback_total', reason='title_not_found')
             return [], "error"
         
-        target_anime = search.iloc[0]
-        target_id = target_anime['anime_id']
-        target_name = target_anime['name']
+        target_id = self.catalog_columns['anime_id'][target_row]
         
         # 2. Try Collaborative
-        try:
-            if self.knn_model and target_id in self.anime_id_to_index:
+        if self.knn_model is None:
+            metrics.inc('recommender_fallback_total', reason='no_collaborative_model')
+        elif target_id not in self.anime_id_to_index:
+            metrics.inc('recommender_fallback_total', reason='not_in_matrix')
+        else:
+            try:
                 idx = self.anime_id_to_index[target_id]
-                distances, indices = self.knn_model.kneighbors(
-                    self.anime_matrix[idx], n_neighbors=top_n+1)
                 
-                recommendations = []
-                for i in range(1, len(distances.flatten())): # Skip 0 (itself)
-                    neighbor_idx = indices.flatten()[i]
-                    anime_id = self.index_to_anime_id[neighbor_idx]
-                    
-                    row = self.anime_df[self.anime_df['anime_id'] == anime_id].iloc[0]
-                    recommendations.append(self._package_anime_data(row))
-                    
-                return recommendations, "collaborative"
-        except Exception:
-            pass
+                neighbor_indices = self._collaborative_neighbors(idx, top_n, engine, allowed)
+                if neighbor_indices is None:
+                    metrics.inc('recommender_fallback_total', reason='filter_short')
+                else:
+                    with metrics.span('recommender_stage', stage='package_rows'):
+                        results = self._package_rows(self.item_rows[neighbor_indices])
+                    metrics.inc('recommender_requests_total', path='collaborative')
+                    return results, "collaborative"
+            except Exception as e:
+                metrics.inc('recommender_fallback_total', reason='collaborative_error', error=type(e).__name__)
             
-        # 3. Fallback to Content-Based
-        try:
-            from sklearn.metrics.pairwise import linear_kernel
-            
-            # Find index in unique set
-            if target_name in self.indices:
-                idx = self.indices[target_name]
-                
-                # Compute Similarity just for this vector (save RAM)
-                cosine_sim = linear_kernel(self.tfidf_matrix[idx], self.tfidf_matrix).flatten()
-                
-                sim_scores = list(enumerate(cosine_sim))
-                sim_scores = sorted(sim_scores, key=lambda x: x[1], reverse=True)
-                sim_scores = sim_scores[1:top_n+1]
-                
-                recommendations = []
-                for i, score in sim_scores:
-                    row = self.anime_unique.iloc[i]
-                    recommendations.append(self._package_anime_data(row))
-                    
-                return recommendations, "content"
-        except Exception:
-            pass
+        # 3. Fallback to Content-Based (genre bitsets, argpartition top-K)
+        if self.genre_index is not None:
+            try:
+                with metrics.span('recommender_stage', stage='content_query'):
+                    if allowed is None:
+                        rows, _ = self.genre_index.similar(target_row, top_n, metric=self.content_metric)
+                    else:
+                        # float64 as in similar_batch: the ~1e-6 tie-break vanishes in float32 near 1.0
+                        scores = self.genre_index.scores(target_row, metric=self.content_metric).astype(np.float64)
+                        candidates = allowed.copy()
+                        candidates[target_row] = False
+                        rows, _ = _masked_top_k(scores + self.genre_index.tie_break, top_n, candidates)
+                with metrics.span('recommender_stage', stage='package_rows'):
+                    results = self._package_rows(rows)
+                metrics.inc('recommender_requests_total', path='content')
+                return results, "content"
+            except Exception as e:
+                metrics.inc('recommender_fallback_total', reason='content_error', error=type(e).__name__)
             
+        metrics.inc('recommender_requests_total', path='error')
         return [], "error"
 
-    def get_categories(self):
-        if self.anime_df is None: return []
+    def _collaborative_neighbors(self, idx, top_n, engine, allowed=None):
+        """
+        Collaborative neighbor indices of item idx, best first.
+        With allowed (catalog row mask) every item is scored exactly and only
+        allowed ones compete in the top-K; None if fewer than top_n pass.
+        """
+        metrics = self.metrics
+        if allowed is not None:
+            candidates = allowed[self.item_rows]
+            candidates[idx] = False
+            with metrics.span('recommender_stage', stage='collaborative_query', engine='filtered'):
+                if engine == 'mf' and self.item_embeddings is not None:
+                    scores = self.item_embeddings.vectors @ self.item_embeddings.vectors[idx]
+                else:
+                    normed, normed_t = self._normalized_items()
+                    scores = (normed[idx] @ normed_t).toarray()[0]
+                neighbor_indices, _ = _masked_top_k(scores, top_n, candidates)
+            return neighbor_indices if len(neighbor_indices) >= top_n else None
         
-        all_genres = []
-        for genres in self.anime_df['genre'].dropna():
-            if isinstance(genres, str):
-                all_genres.extend([g.strip() for g in genres.split(',')])
-                
-        return sorted(list(set(all_genres)))
+        neighbor_indices = self._indexed_neighbors(idx, top_n, engine)
+        if neighbor_indices is None:
+            with metrics.span('recommender_stage', stage='collaborative_query', engine='knn'):
+                distances, indices = self.knn_model.kneighbors(
+                    self.anime_matrix[idx], n_neighbors=top_n+1)
+            neighbor_indices = indices.flatten()[1:] # Skip 0 (itself)
+        return neighbor_indices
 
-    def get_category_recommendations(self, category, top_n=10):
-        if self.anime_df is None: return []
+    def _indexed_neighbors(self, idx, top_n, engine):
+        """
+        Neighbors of item idx from the embeddings, the neighbor table or the
+        ANN index, in that order of preference; None when the exact search
+        has to answer.
+        """
+        metrics = self.metrics
+        neighbor_indices = None
+        if engine == 'mf' and self.item_embeddings is not None:
+            # Dense rank-r dot products instead of n_users-wide vectors
+            with metrics.span('recommender_stage', stage='collaborative_query', engine='mf'):
+                neighbor_indices, _ = self.item_embeddings.similar(idx, top_n)
+        elif self.neighbor_ids is not None and top_n <= self.neighbor_ids.shape[1]:
+            # O(K) slice of the precomputed table
+            with metrics.span('recommender_stage', stage='collaborative_query', engine='neighbor_table'):
+                neighbor_indices = self.neighbor_ids[idx, :top_n]
+        elif self.ann_index is not None:
+            with metrics.span('recommender_stage', stage='collaborative_query', engine='ann'):
+                found, _ = self.ann_index.query(self._normalized_items()[0][idx], top_n, exclude=idx)
+            if len(found) >= top_n: # Too few candidates -> exact search below
+                neighbor_indices = found
+            else:
+                metrics.inc('recommender_ann_short_total')
+        return neighbor_indices
+
+    def hybrid_scores(self, target_row, weights=None):
+        """
+        Score every catalog row against one seed row from all sources at once:
+        collaborative cosine (pre-normalized float32 item matrix, scattered to
+        catalog rows; 0 where either side has no ratings), genre similarity and
+        the popularity prior. weights override self.hybrid_weights, which
+        override HYBRID_WEIGHTS.
+        Returns (total, parts): float32 arrays over catalog rows, where parts
+        maps each source to its weighted contribution and total is their sum.
+        """
+        weights = {**HYBRID_WEIGHTS, **(self.hybrid_weights or {}), **(weights or {})}
+        n_rows = len(self.catalog_columns['anime_id'])
         
-        mask = self.anime_df['genre'].str.contains(category, case=False, na=False)
-        cat_df = self.anime_df[mask]
+        collaborative = np.zeros(n_rows, dtype=np.float32)
+        target_id = self.catalog_columns['anime_id'][target_row]
+        if self.anime_matrix is not None and target_id in self.anime_id_to_index:
+            normed, normed_t = self._normalized_items()
+            idx = self.anime_id_to_index[target_id]
+            collaborative[self.item_rows] = (normed[idx] @ normed_t).toarray()[0]
+        
+        parts = {
+            'collaborative': weights['collaborative'] * collaborative,
+            'content': weights['content'] * self.genre_index.scores(target_row, metric=self.content_metric),
+            'popularity': np.float32(weights['popularity']) * self.popularity_prior,
+        }
+        total = parts['collaborative'] + parts['content']
+        total += parts['popularity']
+        return total, parts
+
+    def get_hybrid_recommendations(self, anime_title, top_n=10, weights=None, filters=None):
+        """
+        Top-N by blended hybrid score (see hybrid_scores), in one pass with no
+        fallback chain; filters (see catalog_filter.py) restrict the
+        candidates. Each result also carries 'score' and 'score_breakdown'
+        (source -> weighted contribution). Returns (results, "hybrid").
+        """
+        metrics = self.metrics
+        with metrics.span('recommender_stage', stage='title_lookup'):
+            target_row = self.title_index.lookup(anime_title)
+        if target_row is None:
+            metrics.inc('recommender_requests_total', path='error')
+            metrics.inc('recommender_fallback_total', reason='title_not_found')
+            return [], "error"
+        return self._hybrid_results(target_row, top_n, weights, self.catalog_filter.mask(filters))
+
+    def _hybrid_results(self, target_row, top_n, weights=None, allowed=None):
+        """
+        get_hybrid_recommendations for a catalog row.
+        """
+        metrics = self.metrics
+        with metrics.span('recommender_stage', stage='hybrid_scores'):
+            total, parts = self.hybrid_scores(target_row, weights)
+            candidates = np.ones(len(total), dtype=bool) if allowed is None else allowed.copy()
+            candidates[target_row] = False
+            top, top_scores = _masked_top_k(total, top_n, candidates)
+        with metrics.span('recommender_stage', stage='package_rows'):
+            results = self._package_rows(top)
+            for result, row, score in zip(results, top.tolist(), top_scores.tolist()):
+                result['score'] = score
+                result['score_breakdown'] = {source: float(part[row]) for source, part in parts.items()}
+        metrics.inc('recommender_requests_total', path='hybrid')
+        return results, "hybrid"
+
+    def recommend_for_user(self, user, top_n=10, filters=None):
+        """
+        Personalized recommendations from a watch history.
+        user: a user_id from the ratings, or a list of (anime_id, rating).
+        Every item is scored as sum(rating_i * cosine(i, item)) over the
+        history in one pass: the history rows are folded into a single user-
+        space vector, then one sparse mat-vec against the item matrix, so the
+        cost is O(nnz) whatever the history length. Watched anime are never
+        returned; rating < 0 (watched, not rated) only masks. filters (see
+        catalog_filter.py) restrict the candidates inside the top-K.
+        Falls back to genre similarity when no history item is in the
+        collaborative model, or fewer than top_n items have collaborative
+        evidence. Returns (results, model) like get_recommendations.
+        """
+        metrics = self.metrics
+        allowed = self.catalog_filter.mask(filters)
+        with metrics.span('recommender_stage', stage='user_history'):
+            anime_ids, ratings = self._user_history(user)
+        if len(anime_ids) == 0:
+            metrics.inc('recommender_requests_total', path='error')
+            metrics.inc('recommender_fallback_total', reason='empty_history')
+            return [], "error"
+
+        # Collaborative: items of the history that are in the rating matrix
+        if self.anime_matrix is not None:
+            items = np.fromiter((self.anime_id_to_index.get(a, -1) for a in anime_ids.tolist()),
+                                dtype=np.int64, count=len(anime_ids))
+            known = items >= 0
+            if (known & (ratings > 0)).any():
+                with metrics.span('recommender_stage', stage='user_scores', engine='collaborative'):
+                    normed, _ = self._normalized_items()
+                    profile = normed[items[known]].T @ np.maximum(ratings[known], 0).astype(np.float32)
+                    scores = np.asarray(normed @ profile, dtype=np.float32)
+                    # Unwatched, allowed, and co-rated with the history (score > 0)
+                    candidates = scores > 0
+                    candidates[items[known]] = False
+                    if allowed is not None:
+                        candidates &= allowed[self.item_rows]
+                    top, _ = _masked_top_k(scores, top_n, candidates)
+                if len(top) == top_n:
+                    with metrics.span('recommender_stage', stage='package_rows'):
+                        results = self._package_rows(self.item_rows[top])
+                    metrics.inc('recommender_requests_total', path='user_collaborative')
+                    return results, "collaborative"
+                metrics.inc('recommender_fallback_total', reason='user_collaborative_short')
+            else:
+                metrics.inc('recommender_fallback_total', reason='history_not_in_matrix')
+
+        # Content: the same weighted sum over genre similarities
+        rows = self.row_of_anime_id[anime_ids]
+        if self.genre_index is None or not (rows >= 0).any():
+            metrics.inc('recommender_requests_total', path='error')
+            return [], "error"
+        with metrics.span('recommender_stage', stage='user_scores', engine='content'):
+            weights = np.maximum(ratings[rows >= 0], 0).astype(np.float32)
+            rows = rows[rows >= 0]
+            scores = (weights @ self.genre_index.scores_batch(rows, metric=self.content_metric)).astype(np.float64)
+            scores += self.genre_index.tie_break
+            candidates = np.ones(len(scores), dtype=bool) if allowed is None else allowed.copy()
+            candidates[rows] = False
+            top, _ = _masked_top_k(scores, top_n, candidates)
+        with metrics.span('recommender_stage', stage='package_rows'):
+            results = self._package_rows(top)
+        metrics.inc('recommender_requests_total', path='user_content')
+        return results, "content"
+
+    def _user_history(self, user):
+        """
+        (anime_ids, ratings) arrays for a user_id or a list of pairs.
+        Unknown anime_ids are dropped; an unknown user_id gives empty arrays.
+        """
+        if isinstance(user, (int, np.integer)):
+            u = self.user_id_to_index.get(int(user))
+            if u is None or self.anime_matrix is None:
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+            # Row u of the transposed matrix lists the user's items
+            _, normed_t = self._normalized_items()
+            items = np.asarray(normed_t.indices[normed_t.indptr[u]:normed_t.indptr[u + 1]], dtype=np.int64)
+            ratings = np.asarray(self.anime_matrix[items, np.full(len(items), u)], dtype=np.float32).ravel()
+            anime_ids = self.catalog_columns['anime_id'][self.item_rows[items]].astype(np.int64)
+            return anime_ids, ratings
+
+        pairs = list(user)
+        anime_ids = np.array([anime_id for anime_id, _ in pairs], dtype=np.int64).reshape(-1)
+        ratings = np.array([rating for _, rating in pairs], dtype=np.float32).reshape(-1)
+        known = (anime_ids >= 0) & (anime_ids < len(self.row_of_anime_id))
+        known[known] = self.row_of_anime_id[anime_ids[known]] >= 0
+        return anime_ids[known], ratings[known]
+
+    def search_titles(self, query, limit=10):
+        """
+        Ranked fuzzy title matches as result dicts.
+        """
+        if self.title_index is None: return []
+        rows = [row for row, _ in self.title_index.search(query, limit=limit)]
+        return self._package_rows(rows)
+
+    def autocomplete_titles(self, prefix, limit=10):
+        """
+        Titles starting with prefix, most popular first.
+        """
+        if self.title_index is None: return []
+        return self._package_rows(self.title_index.autocomplete(prefix, limit=limit))
+
+    def get_recommendations_batch(self, anime_ids, top_n=10, block_size=256, engine=None):
+        """
+        Recommendations for many seed anime_ids at once.
+        Returns a list of (recommendations, model) aligned with anime_ids,
+        using the same engine choice and collaborative -> content rule as
+        get_recommendations. Collaborative seeds go to the embeddings, the
+        neighbor table or the ANN index first, as single queries do; the
+        rest are scored block_size at a time: one sparse matmul per block
+        for exact collaborative seeds, one bitset pass per block for content
+        seeds, so scratch memory is (block_size x n_items) float32.
+        """
+        engine = engine or self.collaborative_engine
+        results = [([], "error")] * len(anime_ids)
+        if engine == 'hybrid':
+            # One blended pass per seed, no fallback chain
+            for pos, anime_id in enumerate(anime_ids):
+                row = self.get_row(anime_id)
+                if row is not None:
+                    results[pos] = self._hybrid_results(row, top_n)
+            return results
+
+        collab_pos, collab_items, content_pos, content_rows = [], [], [], []
+        for pos, anime_id in enumerate(anime_ids):
+            row = self.get_row(anime_id)
+            if row is None:
+                continue
+            if self.anime_matrix is not None and anime_id in self.anime_id_to_index:
+                idx = self.anime_id_to_index[anime_id]
+                neighbors = self._indexed_neighbors(idx, top_n, engine)
+                if neighbors is not None:
+                    results[pos] = (self._package_rows(self.item_rows[neighbors]), "collaborative")
+                else:
+                    collab_pos.append(pos)
+                    collab_items.append(idx)
+            elif self.genre_index is not None:
+                content_pos.append(pos)
+                content_rows.append(row)
+        
+        # Exact collaborative seeds
+        if collab_items:
+            normed, normed_t = self._normalized_items()
+            k = min(top_n, normed.shape[0] - 1)
+            for start in range(0, len(collab_items), block_size):
+                items = np.asarray(collab_items[start:start + block_size])
+                sims = (normed[items] @ normed_t).toarray()
+                sims[np.arange(len(items)), items] = -np.inf
+                neighbors, _ = _top_k(sims, k)
+                for pos, item_neighbors in zip(collab_pos[start:start + block_size], neighbors):
+                    results[pos] = (self._package_rows(self.item_rows[item_neighbors]), "collaborative")
+        
+        # Content seeds
+        for start in range(0, len(content_rows), block_size):
+            rows = content_rows[start:start + block_size]
+            neighbors, _ = self.genre_index.similar_batch(rows, top_n, metric=self.content_metric)
+            for pos, row_neighbors in zip(content_pos[start:start + block_size], neighbors):
+                results[pos] = (self._package_rows(row_neighbors), "content")
         
-        if 'rating' in cat_df.columns:
-            cat_df = cat_df.sort_values('rating', ascending=False)
-            
-        results = []
-        for _, row in cat_df.head(top_n).iterrows():
-            results.append(self._package_anime_data(row))
         return results
 
-    def get_top_animes(self, top_n=12):
+    def get_categories(self):
+        if self.genre_index is None: return []
+        return list(self.genre_index.vocabulary)
+
+    def get_category_recommendations(self, category, top_n=10, sort_by='rating', match='all', filters=None):
+        """
+        Top anime in a genre (exact match, case-insensitive).
+        category may be a list: match='all' intersects, match='any' unions.
+        sort_by: 'rating' or 'members'. filters: see catalog_filter.py.
+        """
+        if self.genre_index is None: return []
+        rows = self.genre_index.query(category, sort=sort_by, top_n=top_n, match=match,
+                                      allowed=self.catalog_filter.mask(filters))
+        return self._package_rows(rows)
+
+    def get_top_animes(self, top_n=12, filters=None):
         """
         Get top animes by popularity (members) to use as default view
+        filters: see catalog_filter.py.
         """
         if self.anime_df is None: return []
         
-        # Sort by members (popularity) or rating
         # Using members typically gives 'Trending/Popular' which is good for default
-        # Ensure we have the column
-        if 'members' in self.anime_df.columns:
-             top_df = self.anime_df.sort_values('members', ascending=False).head(top_n)
-        elif 'rating' in self.anime_df.columns:
-             top_df = self.anime_df.sort_values('rating', ascending=False).head(top_n)
-        else:
-             top_df = self.anime_df.head(top_n)
-             
-        results = []
-        for _, row in top_df.iterrows():
-            results.append(self._package_anime_data(row))
-        return results
+        order = self.catalog_orders.get('members', self.catalog_orders.get('rating'))
+        allowed = self.catalog_filter.mask(filters)
+        if allowed is not None:
+            order = order[allowed[order]]
+        return self._package_rows(order[:top_n])
 
-    def _package_anime_data(self, row):
-        return {
-            "name": row['name'],
-            "genre": row.get('genre', 'Unknown'),
-            "rating": row.get('rating', 'N/A'),
-            "type": row.get('type', 'TV'),
-            "episodes": row.get('episodes', '?'),
-            "id": row.get('anime_id', None)
-        }
\ No newline at end of file
+    def _package_rows(self, rows):
+        """
+        Turn an array of catalog row positions into result dicts with one
+        columnar gather per field.
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        cols = self.catalog_columns
+        return [
+            {
+                "name": name,
+                "genre": genre,
+                "rating": rating,
+                "type": kind,
+                "episodes": episodes,
+                "id": anime_id
+            }
+            for name, genre, rating, kind, episodes, anime_id in zip(
+                cols['name'][rows].tolist(),
+                cols['genre'][rows].tolist(),
+                cols['rating'][rows].tolist(),
+                cols['type'][rows].tolist(),
+                cols['episodes'][rows].tolist(),
+                cols['anime_id'][rows].tolist())
+        ]
\ No newline at end of file
@@ -0,0 +1,208 @@
+"""
+Approximate nearest-neighbor indexes over the L2-normalized item matrix.
+Both backends only narrow down a candidate set; candidates are re-ranked
+with exact cosine similarity, so scores are exact and only recall is traded.
+
+- LSHIndex: random-hyperplane (SimHash) buckets across several tables.
+- IVFIndex: spherical k-means coarse quantizer with inverted lists.
+"""
+import numpy as np
+
+
+def _rerank(normed, candidates, query, k, exclude):
+    """
+    Exact cosine re-rank of candidate rows against a normalized query row.
+    """
+    if exclude is not None:
+        candidates = candidates[candidates != exclude]
+    if len(candidates) == 0:
+        return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+    scores = np.asarray((normed[candidates] @ query.T).todense()).ravel().astype(np.float32)
+    k = min(k, len(candidates))
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top], kind='stable')]
+    return candidates[top].astype(np.int32), scores[top]
+
+
+class LSHIndex:
+    """
+    Knobs: n_tables (more tables -> higher recall, more candidates),
+    n_bits (more bits -> smaller buckets, faster, lower recall) and
+    probe_radius (1 also probes buckets at Hamming distance 1).
+    """
+    def __init__(self, n_tables=16, n_bits=10, probe_radius=1, seed=0):
+        if not 1 <= n_bits <= 31:
+            raise ValueError("n_bits must be between 1 and 31")
+        self.n_tables = n_tables
+        self.n_bits = n_bits
+        self.probe_radius = probe_radius
+        self.seed = seed
+        self.normed = None
+        self.planes = None
+
+    def params(self):
+        return {'n_tables': self.n_tables, 'n_bits': self.n_bits,
+                'probe_radius': self.probe_radius, 'seed': self.seed}
+
+    def _hash(self, matrix):
+        projected = np.asarray(matrix @ self.planes)
+        bits = (projected > 0).reshape(-1, self.n_tables, self.n_bits)
+        weights = (1 << np.arange(self.n_bits)).astype(np.int64)
+        return (bits @ weights).astype(np.int32) # (n_rows, n_tables)
+
+    def fit(self, normed):
+        rng = np.random.default_rng(self.seed)
+        self.planes = rng.standard_normal(
+            (normed.shape[1], self.n_tables * self.n_bits)).astype(np.float32)
+        return self._index(normed, self._hash(normed))
+
+    def _index(self, normed, codes):
+        self.normed = normed
+        self.codes = codes
+        self.orders = np.argsort(codes, axis=0, kind='stable').T.astype(np.int32) # (n_tables, n)
+        self.sorted_codes = np.take_along_axis(codes.T, self.orders, axis=1)
+        return self
+
+    def update(self, rows, normed=None):
+        """
+        Re-hash only the given item rows (after their vectors changed).
+        normed: the updated matrix when items/users were appended; new items
+        must be in rows. New users get fresh hyperplane rows, which leaves
+        every existing code unchanged.
+        """
+        if normed is not None:
+            extra_users = normed.shape[1] - self.planes.shape[0]
+            if extra_users > 0:
+                rng = np.random.default_rng((self.seed, self.planes.shape[0]))
+                extra = rng.standard_normal((extra_users, self.planes.shape[1])).astype(np.float32)
+                self.planes = np.vstack([self.planes, extra])
+            self.normed = normed
+        codes = np.zeros((self.normed.shape[0], self.codes.shape[1]), dtype=np.int32)
+        codes[:len(self.codes)] = self.codes
+        codes[rows] = self._hash(self.normed[rows])
+        self._index(self.normed, codes)
+
+    def query(self, query, k, exclude=None):
+        """
+        query: 1 x n_users normalized sparse row. Returns (rows, scores).
+        """
+        codes = self._hash(query)[0]
+        flips = np.array([0] + ([1 << b for b in range(self.n_bits)] if self.probe_radius else []),
+                         dtype=np.int32)
+        found = []
+        for t, code in enumerate(codes):
+            probes = code ^ flips
+            los = np.searchsorted(self.sorted_codes[t], probes, side='left')
+            his = np.searchsorted(self.sorted_codes[t], probes, side='right')
+            found.extend(self.orders[t, lo:hi] for lo, hi in zip(los.tolist(), his.tolist()) if hi > lo)
+        if not found:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+        return _rerank(self.normed, np.unique(np.concatenate(found)), query, k, exclude)
+
+    def to_arrays(self):
+        return {'planes': self.planes, 'codes': self.codes}
+
+    @classmethod
+    def from_arrays(cls, arrays, normed, **params):
+        index = cls(**params)
+        index.planes = arrays['planes']
+        return index._index(normed, np.asarray(arrays['codes']))
+
+
+class IVFIndex:
+    """
+    Knobs: n_lists (more lists -> smaller lists, faster, lower recall per
+    probe), n_probe (lists scanned per query) and n_iter (k-means rounds).
+    """
+    def __init__(self, n_lists=64, n_probe=8, n_iter=10, seed=0):
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.n_iter = n_iter
+        self.seed = seed
+        self.normed = None
+        self.centroids = None
+
+    def params(self):
+        return {'n_lists': self.n_lists, 'n_probe': self.n_probe,
+                'n_iter': self.n_iter, 'seed': self.seed}
+
+    def fit(self, normed):
+        from scipy.sparse import csr_matrix
+
+        rng = np.random.default_rng(self.seed)
+        n_items = normed.shape[0]
+        n_lists = max(1, min(self.n_lists, n_items))
+        centroids = normed[rng.choice(n_items, n_lists, replace=False)].toarray()
+
+        for _ in range(self.n_iter):
+            assign = np.asarray(normed @ centroids.T).argmax(axis=1)
+            members = csr_matrix(
+                (np.ones(n_items, dtype=np.float32), (assign, np.arange(n_items))),
+                shape=(n_lists, n_items))
+            centroids = np.asarray((members @ normed).todense(), dtype=np.float32)
+
+            # Re-seed empty lists, then project back onto the unit sphere
+            empty = np.flatnonzero(np.asarray(members.sum(axis=1)).ravel() == 0)
+            if len(empty):
+                centroids[empty] = normed[rng.choice(n_items, len(empty), replace=False)].toarray()
+            norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+            centroids /= np.where(norms > 0, norms, 1)
+
+        assign = np.asarray(normed @ centroids.T).argmax(axis=1).astype(np.int32)
+        return self._index(normed, centroids, assign)
+
+    def _index(self, normed, centroids, assign):
+        self.normed = normed
+        self.centroids = centroids
+        self.assign = assign
+        self.order = np.argsort(assign, kind='stable').astype(np.int32)
+        self.offsets = np.searchsorted(assign[self.order], np.arange(len(centroids) + 1))
+        return self
+
+    def update(self, rows, normed=None):
+        """
+        Re-assign only the given item rows to their nearest list.
+        normed: the updated matrix when items/users were appended; new items
+        must be in rows. Centroids get zero weight on new users until refit.
+        """
+        if normed is not None:
+            extra_users = normed.shape[1] - self.centroids.shape[1]
+            if extra_users > 0:
+                padding = np.zeros((len(self.centroids), extra_users), dtype=np.float32)
+                self.centroids = np.hstack([self.centroids, padding])
+            self.normed = normed
+        assign = np.zeros(self.normed.shape[0], dtype=np.int32)
+        assign[:len(self.assign)] = self.assign
+        assign[rows] = np.asarray(self.normed[rows] @ self.centroids.T).argmax(axis=1)
+        self._index(self.normed, self.centroids, assign)
+
+    def query(self, query, k, exclude=None):
+        """
+        query: 1 x n_users normalized sparse row. Returns (rows, scores).
+        """
+        centroid_scores = np.asarray(query @ self.centroids.T).ravel()
+        n_probe = min(self.n_probe, len(centroid_scores))
+        lists = np.argpartition(-centroid_scores, n_probe - 1)[:n_probe]
+        candidates = np.concatenate(
+            [self.order[self.offsets[l]:self.offsets[l + 1]] for l in lists])
+        return _rerank(self.normed, candidates, query, k, exclude)
+
+    def to_arrays(self):
+        return {'centroids': self.centroids, 'assign': self.assign}
+
+    @classmethod
+    def from_arrays(cls, arrays, normed, **params):
+        index = cls(**params)
+        return index._index(normed, np.asarray(arrays['centroids']), np.asarray(arrays['assign']))
+
+
+ANN_BACKENDS = {
+    'lsh': LSHIndex,
+    'ivf': IVFIndex,
+}
+
+
+def make_ann_index(backend, **params):
+    if backend not in ANN_BACKENDS:
+        raise ValueError(f"Unknown ANN backend: {backend} (choose from {sorted(ANN_BACKENDS)})")
+    return ANN_BACKENDS[backend](**params)
@@ -1,11 +1,15 @@
 import streamlit as st
 import pandas as pd
+import logging
 import os
-import requests
-import time
-import base64
-import concurrent.futures
 from anime_upgrade import AnimeRecommendationSystem
+from poster_cache import PosterCache
+from poster_fetcher import PLACEHOLDER_IMAGE, PosterFetcher
+from metrics import REGISTRY
+from model_registry import ModelRegistry
+from model_warmup import STAGE_LABELS
+from static_assets import build_hero_variants, hero_css, inline_hero_css
+from thumbnail_store import ThumbnailStore
 
 # Page Configuration
 st.set_page_config(
@@ -15,24 +19,25 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-def get_base64_of_bin_file(bin_file):
-    with open(bin_file, 'rb') as f:
-        data = f.read()
-    return base64.b64encode(data).decode()
+@st.cache_resource(show_spinner=False)
+def get_hero_css(bg_path):
+    """
+    Hero background CSS, built once per process. Resized variants are served
+    from static/hero/ so reruns only re-send a few hundred bytes of CSS.
+    """
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    try:
+        variants = build_hero_variants(bg_path, os.path.join(current_dir, "static", "hero"))
+        return hero_css(variants)
+    except Exception as e:
+        # No Pillow / read-only checkout: the base64 CSS is built once but
+        # still re-sent on every rerun (~600 KB), so say so
+        logging.getLogger(__name__).warning(
+            "Hero variants unavailable (%s); falling back to inline base64 CSS", e)
+        return inline_hero_css(bg_path)
 
 def set_background(png_file):
-    bin_str = get_base64_of_bin_file(png_file)
-    page_bg_img = f'''
-    <style>
-    .hero-bg {{
-        background-image: url("data:image/jpg;base64,{bin_str}");
-        background-size: cover;
-        background-position: center; 
-        opacity: 1.0;
-    }}
-    </style>
-    '''
-    st.markdown(page_bg_img, unsafe_allow_html=True)
+    st.markdown(get_hero_css(png_file), unsafe_allow_html=True)
 
 # Apple TV Style CSS - Minimal, Dark, Interactive
 st.markdown("""
@@ -276,88 +281,55 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # --- Jikan API Integration ---
-# --- Jikan API Integration ---
-@st.cache_data(ttl=3600, show_spinner=False)
+@st.cache_resource(show_spinner=False)
+def get_poster_cache():
+    """
+    Process-wide persistent poster cache (survives restarts, shared by replicas on the host).
+    """
+    cache_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "artifacts")
+    os.makedirs(cache_dir, exist_ok=True)
+    return PosterCache(os.path.join(cache_dir, "posters.sqlite3"))
+
+@st.cache_resource(show_spinner=False)
+def get_poster_fetcher():
+    """
+    One fetch scheduler per process: every session shares its token bucket
+    (Jikan allows ~3 req/s) and its pooled HTTP session.
+    """
+    return PosterFetcher(rate=3.0, max_in_flight=4, cache=get_poster_cache())
+
+@st.cache_resource(show_spinner=False)
+def get_thumbnail_store():
+    """
+    Card-sized poster thumbnails on disk under static/ (served by Streamlit,
+    see .streamlit/config.toml), so browsers skip the full-size CDN covers.
+    """
+    static_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "thumbs")
+    return ThumbnailStore(static_dir)
+
 def fetch_anime_image(anime_data):
     """
     Fetch anime image. Prioritizes ID lookup, falls back to name.
     anime_data is a dict with 'id' and 'name'.
     """
-    anime_id = anime_data.get('id')
-    anime_name = anime_data.get('name')
-    
-    # Generate URL
-    if anime_id and str(anime_id) != 'nan':
-         url = f"https://api.jikan.moe/v4/anime/{anime_id}"
-    else:
-         url = f"https://api.jikan.moe/v4/anime?q={anime_name}&limit=1"
-        
-    def _make_request(retries=3):
-        try:
-            # Jitter to preventing thundering herd
-            time.sleep(random.uniform(0.1, 0.4)) 
-            response = requests.get(url, timeout=4)
-            
-            if response.status_code == 200:
-                data = response.json()
-                item = data['data'] if 'data' in data else None
-                if isinstance(item, list):
-                    item = item[0] if item else None
-                    
-                if item:
-                    return {
-                        "image": item['images']['jpg']['large_image_url'],
-                        "title": item['title'],
-                        "mal_id": item['mal_id']
-                    }
-            elif response.status_code == 429 and retries > 0:
-                # Hit rate limit? Exponential backoff
-                wait_time = 2.0 * (4 - retries) # 2s, 4s, 6s
-                time.sleep(wait_time)
-                return _make_request(retries=retries-1)
-                
-        except Exception:
-            pass
-        return None
-
-    # Try to fetch
-    result = _make_request()
-    if result:
-        return result
-
-    # Fallback
-    return {
-        "image": "https://upload.wikimedia.org/wikipedia/commons/thumb/6/65/No-Image-Placeholder.svg/330px-No-Image-Placeholder.svg.png", # More reliable placeholder
-        "title": anime_name,
-        "mal_id": None
-    }
+    return get_poster_fetcher().fetch(anime_data)
 
 def fetch_images_parallel(recommendations):
     """
-    Fetch all images in parallel.
-    Reduced to max_workers=2 to be safer with API limits.
+    Fetch all images concurrently through the shared scheduler.
+    Results come back in the same order as recommendations.
     """
-    results = [None] * len(recommendations)
-    
-    # We use 2 workers to stay under the 3 req/sec limit reliably
-    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
-        future_to_index = {
-            executor.submit(fetch_anime_image, anime): i 
-            for i, anime in enumerate(recommendations)
-        }
-        
-        for future in concurrent.futures.as_completed(future_to_index):
-            index = future_to_index[future]
-            try:
-                data = future.result()
-                results[index] = data
-            except Exception:
-                results[index] = {
-                    "image": "https://upload.wikimedia.org/wikipedia/commons/thumb/6/65/No-Image-Placeholder.svg/330px-No-Image-Placeholder.svg.png",
-                    "title": recommendations[index]['name']
-                }
-                
-    return results
+    metrics = get_metrics()
+    try:
+        with metrics.span('poster_fetch'):
+            posters = get_poster_fetcher().fetch_many(recommendations, timeout=60)
+    except Exception as e:
+        metrics.inc('poster_placeholder_total', len(recommendations), reason=type(e).__name__)
+        return [{"image": PLACEHOLDER_IMAGE, "title": anime['name'], "mal_id": None} for anime in recommendations]
+    missing = sum(1 for poster in posters if poster.get('mal_id') is None)
+    if missing:
+        metrics.inc('poster_placeholder_total', missing, reason='not_found')
+    return posters
 
 
 import random
@@ -375,52 +347,118 @@ ANIME_QUOTES = [
     "If you don't take risks, you can't create a future. - Luffy"
 ]
 
-# --- Recommender System ---
-@st.cache_resource(show_spinner=False)
-def _get_recommender_system_fresh():
-    # Check for files
+# Loader order; 'artifact' replaces the build stages when a saved model is reused
+BUILD_STAGES = ['fingerprint', 'artifact', 'load', 'preprocess', 'content', 'collaborative', 'save']
 
+# --- Recommender System ---
+def _data_paths():
+    """
+    (anime_path, rating_path); either is None when the file is missing.
+    """
     current_dir = os.path.dirname(os.path.abspath(__file__))
     anime_path = os.path.join(current_dir, "data", "anime.csv")
     rating_path = os.path.join(current_dir, "rating.csv") # Assuming rating.csv is still in root or change to data if moved
-    
+
     # If rating.csv might also be in data, check there too or just standardise
     # For now, per instructions, we moved anime.csv to data/. rating.csv is large and user likely excluded it or it is in root.
     # Let's check root first as per original, but if not found, check data/ just in case.
-    
+
     if not os.path.exists(anime_path):
         # Fallback to root just in case locally it wasn't moved yet or similar
         anime_path_root = os.path.join(current_dir, "anime.csv")
-        if os.path.exists(anime_path_root):
-             anime_path = anime_path_root
-        else:
-             return None
+        anime_path = anime_path_root if os.path.exists(anime_path_root) else None
 
     # Flexible rating path
-    final_rating_path = None
-    if os.path.exists(rating_path):
-        final_rating_path = rating_path
-    
-    sys = AnimeRecommendationSystem()
-    sys.load_data(anime_path, final_rating_path)
-    sys.preprocess_data()
-    sys.build_models()
-    return sys
+    return anime_path, rating_path if os.path.exists(rating_path) else None
+
+def _data_signature():
+    # Cheap per-rerun staleness check; load_or_build hashes only when this changes
+    signature = []
+    for path in _data_paths():
+        stat = os.stat(path) if path else None
+        signature.append((path, stat.st_mtime_ns, stat.st_size) if stat else None)
+    return tuple(signature)
+
+def _get_recommender_system_fresh(progress=None):
+    anime_path, final_rating_path = _data_paths()
+    if anime_path is None:
+        return None
+
+    # Reuse the newest on-disk artifact unless the CSVs changed since it was built.
+    # Rebuilds go to a new artifacts/recommender/v<N>: the serving model has the
+    # current one memory-mapped, so it can't be replaced in place (Windows)
+    # Stream the full rating file in bounded chunks rather than a 500k-row prefix
+    return AnimeRecommendationSystem.load_or_build(
+        anime_path, final_rating_path, artifact_dir=_artifact_root(), versioned=True,
+        load_options={"streaming": True, "memory_budget_mb": 256}, progress=progress)
+
+def _artifact_root():
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "artifacts", "recommender")
+
+def _prune_artifacts(current, previous):
+    # Versions older than the rollback one are no longer mapped by any resident model
+    keep_from = (previous or current).system.artifact_dir
+    if keep_from:
+        AnimeRecommendationSystem.prune_artifacts(_artifact_root(), keep_from)
+
+@st.cache_resource(show_spinner=False)
+def get_model_registry():
+    """
+    Process-wide model registry (see model_registry.py). The first version
+    starts building in a background thread on the first script run; later
+    versions are built when the data files change and swapped in without
+    blocking sessions.
+    """
+    registry = ModelRegistry(_get_recommender_system_fresh, signature_fn=_data_signature,
+                             on_swap=_prune_artifacts)
+    registry.build_next()
+    return registry
+
+# Kick off the build before any UI is rendered
+get_model_registry()
+
+@st.cache_resource(show_spinner=False)
+def get_metrics():
+    """
+    Process-wide metrics registry (see metrics.py) with collectors for the
+    poster caches, startup stages and the serving model.
+    """
+    def collect():
+        samples = []
+        for prefix, stats in (("poster_cache", get_poster_cache().stats()),
+                              ("poster_fetcher", get_poster_fetcher().stats()),
+                              ("thumbnails", get_thumbnail_store().stats())):
+            samples += [(f"{prefix}_{name}", {}, value) for name, value in stats.items()]
+        registry = get_model_registry()
+        timings = registry.first_build.timings()
+        samples += [("startup_stage_seconds", {"stage": stage}, seconds)
+                    for stage, seconds in timings["stages"].items() if seconds is not None]
+        if timings["time_to_interactive"] is not None:
+            samples.append(("startup_time_to_interactive_seconds", {}, timings["time_to_interactive"]))
+        return samples + registry.metric_samples()
+
+    REGISTRY.register_collector(collect)
+    return REGISTRY
 
 def get_recommender_v3():
+    registry = get_model_registry()
+    # New data on disk: build the next version while this one keeps serving
+    registry.refresh_if_stale()
+    build = registry.building
+
     # Only show intro on first load
     if 'intro_shown' not in st.session_state:
         st.session_state.intro_shown = False
         
     quote = random.choice(ANIME_QUOTES)
     
-    if not st.session_state.intro_shown:
+    if not st.session_state.intro_shown and registry.current() is None and build is not None:
         # --- Custom Loading Screen ---
         loader_placeholder = st.empty()
         with loader_placeholder.container():
             # Centered Quote Display
             st.markdown(f"""
-                <div style="height: 70vh; display: flex; flex-direction: column; justify-content: center; align-items: center; text-align: center; animation: fade 2s infinite;">
+                <div style="height: 60vh; display: flex; flex-direction: column; justify-content: center; align-items: center; text-align: center; animation: fade 2s infinite;">
                     <h2 style="font-size: 2.5rem; font-weight: 800; color: #fff; margin-bottom: 20px; font-style: italic;">
                         "{quote.split(' - ')[0]}"
                     </h2>
@@ -435,15 +473,25 @@ def get_recommender_v3():
                 </style>
             """, unsafe_allow_html=True)
             
-            # Artificial delay to let the quote breathe
-            time.sleep(2.5)
+            # Real build progress instead of a fixed delay
+            progress_bar = st.progress(0.0)
+            while not build.done:
+                stage = build.stage
+                if stage in BUILD_STAGES:
+                    fraction = (BUILD_STAGES.index(stage) + 1) / (len(BUILD_STAGES) + 1)
+                    progress_bar.progress(fraction, text=STAGE_LABELS[stage] + "...")
+                # Not build.wait(): a failed build must reach the st.error below, not raise here
+                registry.wait(0.1)
             
         # Clear Loader and mark as shown
         loader_placeholder.empty()
-        st.session_state.intro_shown = True
+    st.session_state.intro_shown = True
 
-    # Actual Loading (Always fetch fresh/cached)
-    recommender = _get_recommender_system_fresh()
+    # One read per script run, so a swap never mixes versions within a page
+    recommender = registry.current() or registry.wait()
+    if recommender is None and registry.last_error is not None:
+        st.error(f"Failed to build recommender: {registry.last_error}")
+        return None
     
     if recommender is None:
          st.error("Data files not found.")
@@ -477,7 +525,7 @@ def render_movie_grid(recommendations, model_type=None):
     Render grid of anime cards.
     Args:
         recommendations: List of dicts (from anime_upgrade.py)
-        model_type: str "collaborative" or "content" (optional)
+        model_type: str "collaborative", "content" or "hybrid" (optional)
     """
     if not recommendations:
         st.error("No recommendations found.")
@@ -489,6 +537,8 @@ def render_movie_grid(recommendations, model_type=None):
         badge_html = '<div style="text-align:center;margin-bottom:20px;"><span style="background:rgba(40, 167, 69, 0.2);color:#28a745;padding:6px 12px;border-radius:20px;font-size:0.9rem;border:1px solid #28a745;font-weight:600;">✨ Collaborative Intelligence</span></div>'
     elif model_type == "content":
         badge_html = '<div style="text-align:center;margin-bottom:20px;"><span style="background:rgba(108, 117, 125, 0.2);color:#adb5bd;padding:6px 12px;border-radius:20px;font-size:0.9rem;border:1px solid #6c757d;font-weight:600;">📚 Content-Based Match</span></div>'
+    elif model_type == "hybrid":
+        badge_html = '<div style="text-align:center;margin-bottom:20px;"><span style="background:rgba(111, 66, 193, 0.2);color:#b794f4;padding:6px 12px;border-radius:20px;font-size:0.9rem;border:1px solid #6f42c1;font-weight:600;">🧬 Hybrid Match</span></div>'
 
     if model_type:
         st.markdown(badge_html, unsafe_allow_html=True)
@@ -507,6 +557,9 @@ def render_movie_grid(recommendations, model_type=None):
         # Retrieve pre-fetched image data
         img_info = image_data_list[idx]
         img_url = img_info['image']
+        if img_info.get('mal_id') is not None:
+            # Local thumbnail once downloaded; remote cover until then
+            img_url = get_thumbnail_store().url_for(anime.get('id'), img_url)
         title = img_info['title'] # Use API title if available, or fallback
         
         rating = anime.get('rating', 'N/A')
@@ -519,9 +572,13 @@ def render_movie_grid(recommendations, model_type=None):
         eps = anime.get('episodes', '?')
         kind = anime.get('type', 'TV')
         
+        # Hybrid results explain themselves on hover
+        breakdown = anime.get('score_breakdown')
+        tooltip = " · ".join(f"{source} {value:.2f}" for source, value in breakdown.items()) if breakdown else ""
+        
         with cols[col_idx]:
             card_html = f"""
-            <div class="movie-card">
+            <div class="movie-card" title="{tooltip}">
                 <img src="{img_url}" class="movie-img" loading="lazy">
                 <div class="movie-info">
                     <div class="movie-title">{title}</div>
@@ -532,6 +589,55 @@ def render_movie_grid(recommendations, model_type=None):
             """
             st.markdown(card_html, unsafe_allow_html=True)
 
+def render_filters(recommender):
+    """
+    Filter controls shared by both modes; returns a filter spec for the
+    recommender (see catalog_filter.py), or None when nothing is set.
+    """
+    with st.expander("🎛 Filters"):
+        type_col, rating_col, episodes_col = st.columns(3)
+        types = type_col.multiselect("Type", recommender.catalog_filter.types)
+        min_rating = rating_col.slider("Minimum rating", 0.0, 10.0, 0.0, 0.5)
+        max_episodes = episodes_col.number_input("Max episodes (0 = any)", min_value=0, value=0, step=1)
+    filters = {
+        'type': types or None,
+        'min_rating': min_rating or None,
+        'max_episodes': max_episodes or None,
+    }
+    return {key: value for key, value in filters.items() if value is not None} or None
+
+def render_debug_panel():
+    """
+    Metrics panel, shown with ?debug=1 in the URL.
+    """
+    snapshot = get_metrics().snapshot()
+    with st.expander("🛠 Debug metrics", expanded=True):
+        spans = [{"span": name, "labels": labels, **values}
+                 for name, series in snapshot["spans"].items() for labels, values in series.items()]
+        if spans:
+            st.markdown("**Spans**")
+            st.dataframe(pd.DataFrame(spans).sort_values(["span", "labels"]), hide_index=True, width="stretch")
+        for kind in ("counters", "gauges"):
+            rows = [{"metric": name, "labels": labels, "value": value}
+                    for name, series in snapshot[kind].items() for labels, value in series.items()]
+            if rows:
+                st.markdown(f"**{kind.title()}**")
+                st.dataframe(pd.DataFrame(rows).sort_values(["metric", "labels"]), hide_index=True, width="stretch")
+        registry = get_model_registry()
+        st.markdown("**Model versions**")
+        st.dataframe(pd.DataFrame(registry.versions()), hide_index=True, width="stretch")
+        if registry.last_error is not None:
+            st.warning(f"Last rebuild failed: {registry.last_error}")
+        rebuild_col, rollback_col = st.columns(2)
+        if rebuild_col.button("Rebuild model", disabled=registry.building is not None):
+            registry.build_next()
+            st.rerun()
+        if rollback_col.button("Roll back", disabled=registry.previous_version is None):
+            registry.rollback()
+            st.rerun()
+        exposition = get_metrics().to_prometheus()
+        st.download_button("Download Prometheus metrics", exposition, file_name="metrics.prom", mime="text/plain")
+
 def main():
     recommender = get_recommender_v3()
     if not recommender:
@@ -542,6 +648,7 @@ def main():
 
     # Navigation
     mode = st.radio("Navigation", ["Browse Categories", "Search Title"], horizontal=True, label_visibility="collapsed")
+    filters = render_filters(recommender)
 
     if mode == "Browse Categories":
         st.markdown("## 📂 Browse by Category")
@@ -555,11 +662,11 @@ def main():
             
             if selected_category == "🔥 Top Watched":
                  st.markdown("### 🔥 Most Popular on Aniora")
-                 results = recommender.get_top_animes(top_n=15)
+                 results = recommender.get_top_animes(top_n=15, filters=filters)
                  render_movie_grid(results, model_type="content")
             
             elif selected_category:
-                results = recommender.get_category_recommendations(selected_category, top_n=15)
+                results = recommender.get_category_recommendations(selected_category, top_n=15, filters=filters)
                 render_movie_grid(results, model_type="content") 
     
     elif mode == "Search Title":
@@ -567,12 +674,26 @@ def main():
         
         # Search Box
         anime_list = recommender.anime_df['name'].tolist() if recommender.anime_df is not None else []
-        selected_anime = st.selectbox("Enter Anime Title", [""] + anime_list)
+        several = st.toggle("Blend several favorites")
+        
+        if several:
+            favorites = st.multiselect("Your favorite titles", anime_list, max_selections=50)
+            if favorites:
+                # Favorites count as 10/10 ratings in the user's history
+                rows = [recommender.title_index.lookup(name) for name in favorites]
+                history = [(int(recommender.catalog_columns['anime_id'][row]), 10) for row in rows if row is not None]
+                with st.spinner(f"Finding matches for {len(history)} favorites..."):
+                    results, model_used = recommender.recommend_for_user(history, top_n=15, filters=filters)
+                    render_movie_grid(results, model_type=model_used)
+            selected_anime = None
+        else:
+            selected_anime = st.selectbox("Enter Anime Title", [""] + anime_list)
         
         if selected_anime:
             with st.spinner(f"Finding matches for {selected_anime}..."):
-                # Get recommendations + model type return
-                results, model_used = recommender.get_recommendations(selected_anime, top_n=15)
+                # Collaborative + genre + popularity blended in one pass
+                results, model_used = recommender.get_recommendations(
+                    selected_anime, top_n=15, engine='hybrid', filters=filters)
                 render_movie_grid(results, model_type=model_used)
 
     # DEFAULT VIEW (Bottom of main)
@@ -581,5 +702,12 @@ def main():
          # Logic: If selectbox hasn't been used or is default
          pass 
 
+    # Time-to-first-interactive: process start -> first fully rendered page,
+    # exported as startup_time_to_interactive_seconds (see get_metrics)
+    get_model_registry().first_build.mark_interactive()
+
+    if st.query_params.get("debug") == "1":
+        render_debug_panel()
+
 if __name__ == "__main__":
     main()
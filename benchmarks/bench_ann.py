@@ -0,0 +1,77 @@
+"""
+Recall@K and latency of the ANN backends (ann_index.py) against exact
+brute-force cosine search, over a grid of recall/speed knobs.
+
+Usage:
+    python benchmarks/bench_ann.py --ratings rating.csv -k 15
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from anime_upgrade import AnimeRecommendationSystem, _top_k
+from ann_index import make_ann_index
+
+GRID = [
+    ('lsh', {'n_tables': 4, 'n_bits': 14, 'probe_radius': 0}),
+    ('lsh', {'n_tables': 8, 'n_bits': 12, 'probe_radius': 1}),
+    ('lsh', {'n_tables': 16, 'n_bits': 10, 'probe_radius': 1}),
+    ('ivf', {'n_lists': 64, 'n_probe': 2}),
+    ('ivf', {'n_lists': 64, 'n_probe': 8}),
+    ('ivf', {'n_lists': 128, 'n_probe': 16}),
+]
+
+
+def main():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--anime", default=os.path.join(root, "data", "anime.csv"))
+    parser.add_argument("--ratings", default=os.path.join(root, "rating.csv"))
+    parser.add_argument("-k", type=int, default=15)
+    parser.add_argument("--queries", type=int, default=300)
+    args = parser.parse_args()
+
+    rec = AnimeRecommendationSystem()
+    rec.load_data(args.anime, args.ratings, streaming=True)
+    rec.preprocess_data()
+    rec.build_models()
+    normed, normed_t = rec._normalized_items()
+
+    rng = np.random.default_rng(0)
+    queries = rng.choice(normed.shape[0], size=min(args.queries, normed.shape[0]), replace=False)
+
+    # Exact ground truth, timed per query like the kneighbors path
+    truth, brute_times = {}, []
+    for idx in queries:
+        start = time.perf_counter()
+        sims = (normed[idx] @ normed_t).toarray()
+        sims[0, idx] = -np.inf
+        truth[idx] = set(_top_k(sims, args.k)[0][0].tolist())
+        brute_times.append(time.perf_counter() - start)
+
+    print("items=%d users=%d nnz=%d k=%d queries=%d" % (normed.shape[0], normed.shape[1], normed.nnz, args.k, len(queries)))
+    print("%-4s %-46s %8s %10s %10s %9s" % ("", "params", "build s", "p50 ms", "p95 ms", "recall@k"))
+    print("%-4s %-46s %8s %10.3f %10.3f %9.3f" % ("exact", "", "-", np.percentile(brute_times, 50) * 1000,
+                                                 np.percentile(brute_times, 95) * 1000, 1.0))
+
+    for backend, params in GRID:
+        start = time.perf_counter()
+        index = make_ann_index(backend, **params).fit(normed)
+        build = time.perf_counter() - start
+
+        times, recalls = [], []
+        for idx in queries:
+            start = time.perf_counter()
+            found, _ = index.query(normed[idx], args.k, exclude=idx)
+            times.append(time.perf_counter() - start)
+            recalls.append(len(truth[idx] & set(found.tolist())) / float(args.k))
+        print("%-4s %-46s %8.2f %10.3f %10.3f %9.3f" % (
+            backend, params, build, np.percentile(times, 50) * 1000, np.percentile(times, 95) * 1000, np.mean(recalls)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Throughput of get_recommendations_batch vs a loop of single
+get_recommendations calls, plus agreement between the two.
+
+Usage:
+    python benchmarks/bench_batch.py --ratings rating.csv --seeds 2000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from anime_upgrade import AnimeRecommendationSystem
+
+
+def main():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--anime", default=os.path.join(root, "data", "anime.csv"))
+    parser.add_argument("--ratings", default=os.path.join(root, "rating.csv"))
+    parser.add_argument("--seeds", type=int, default=2000)
+    parser.add_argument("--top-n", type=int, default=15)
+    parser.add_argument("--block-size", type=int, default=256)
+    parser.add_argument("--single-sample", type=int, default=300,
+                        help="single-query calls to time (extrapolated to all seeds)")
+    args = parser.parse_args()
+
+    rec = AnimeRecommendationSystem()
+    rec.load_data(args.anime, args.ratings)
+    rec.preprocess_data()
+    rec.build_models()
+
+    rng = np.random.default_rng(0)
+    all_ids = rec.catalog_columns['anime_id']
+    seeds = rng.choice(all_ids, size=min(args.seeds, len(all_ids)), replace=False).tolist()
+    names = [rec.catalog_columns['name'][rec.get_row(a)] for a in seeds]
+
+    start = time.perf_counter()
+    batch = rec.get_recommendations_batch(seeds, top_n=args.top_n, block_size=args.block_size)
+    batch_time = time.perf_counter() - start
+
+    sample = min(args.single_sample, len(seeds))
+    start = time.perf_counter()
+    single = [rec.get_recommendations(name, top_n=args.top_n) for name in names[:sample]]
+    single_time = (time.perf_counter() - start) / sample * len(seeds)
+
+    same_model = sum(b[1] == s[1] for b, s in zip(batch, single))
+    same_ids = sum(
+        {r['id'] for r in b[0]} == {r['id'] for r in s[0]} for b, s in zip(batch, single))
+    models = {m: sum(1 for _, x in batch if x == m) for m in ("collaborative", "content", "error")}
+
+    print("seeds=%d top_n=%d block=%d models=%s" % (len(seeds), args.top_n, args.block_size, models))
+    print("single loop: %.1f seeds/s (%.2fs, extrapolated from %d calls)" % (len(seeds) / single_time, single_time, sample))
+    print("batch:       %.1f seeds/s (%.2fs)" % (len(seeds) / batch_time, batch_time))
+    print("agreement on %d sampled seeds: model %d, result set %d (ties may reorder equal scores)"
+          % (sample, same_model, same_ids))
+
+
+if __name__ == "__main__":
+    main()
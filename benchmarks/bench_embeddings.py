@@ -0,0 +1,73 @@
+"""
+Matrix-factorization engine (truncated SVD item embeddings) vs the KNN
+path: training time, memory, per-query latency and top-N overlap.
+
+Usage:
+    python benchmarks/bench_embeddings.py --ratings rating.csv --ranks 32 64 128
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from anime_upgrade import AnimeRecommendationSystem
+from embeddings import ItemEmbeddings
+
+
+def _percentiles(samples):
+    ms = np.asarray(samples) * 1000
+    return "p50=%.3fms p95=%.3fms" % tuple(np.percentile(ms, [50, 95]))
+
+
+def main():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--anime", default=os.path.join(root, "data", "anime.csv"))
+    parser.add_argument("--ratings", default=os.path.join(root, "rating.csv"))
+    parser.add_argument("--ranks", type=int, nargs="+", default=[32, 64, 128])
+    parser.add_argument("--top-n", type=int, default=15)
+    parser.add_argument("--queries", type=int, default=300)
+    args = parser.parse_args()
+
+    rec = AnimeRecommendationSystem()
+    rec.load_data(args.anime, args.ratings, streaming=True)
+    rec.preprocess_data()
+    start = time.perf_counter()
+    rec.build_models()
+    knn_build = time.perf_counter() - start
+
+    matrix = rec.anime_matrix
+    rng = np.random.default_rng(0)
+    queries = rng.choice(matrix.shape[0], size=min(args.queries, matrix.shape[0]), replace=False)
+
+    knn_times, truth = [], {}
+    for idx in queries:
+        start = time.perf_counter()
+        _, indices = rec.knn_model.kneighbors(matrix[idx], n_neighbors=args.top_n + 1)
+        knn_times.append(time.perf_counter() - start)
+        truth[idx] = set(indices.flatten()[1:].tolist())
+
+    csr_bytes = matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+    print("items=%d users=%d nnz=%d" % (matrix.shape[0], matrix.shape[1], matrix.nnz))
+    print("knn   build=%.2fs (all models) memory=%.1fMB query %s" % (knn_build, csr_bytes / 1e6, _percentiles(knn_times)))
+
+    for rank in args.ranks:
+        start = time.perf_counter()
+        embeddings = ItemEmbeddings(rank=rank).fit(matrix)
+        train = time.perf_counter() - start
+
+        times, overlap = [], []
+        for idx in queries:
+            start = time.perf_counter()
+            top, _ = embeddings.similar(idx, args.top_n)
+            times.append(time.perf_counter() - start)
+            overlap.append(len(truth[idx] & set(top.tolist())) / float(args.top_n))
+        print("mf%-3d train=%.2fs memory=%.1fMB query %s overlap-with-knn=%.3f" % (
+            rank, train, embeddings.nbytes / 1e6, _percentiles(times), np.mean(overlap)))
+
+
+if __name__ == "__main__":
+    main()
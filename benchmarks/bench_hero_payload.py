@@ -0,0 +1,49 @@
+"""
+Hero background payload per Streamlit rerun: inline base64 CSS (old) vs.
+static variant CSS (new), plus the one-off variant sizes a browser fetches
+(and then caches) for each viewport width.
+
+Usage:
+    python benchmarks/bench_hero_payload.py --reruns 50
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from static_assets import build_hero_variants, hero_css, inline_hero_css
+
+
+def main():
+    here = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--image", default=os.path.join(here, "hero_bg.jpg"))
+    parser.add_argument("--reruns", type=int, default=50)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    for _ in range(args.reruns):
+        inline = inline_hero_css(args.image)
+    inline_ms = (time.perf_counter() - start) / args.reruns * 1000
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        start = time.perf_counter()
+        variants = build_hero_variants(args.image, out_dir)
+        build_ms = (time.perf_counter() - start) * 1000
+        css = hero_css(variants)
+        sizes = [(width, os.path.getsize(os.path.join(out_dir, name))) for width, name in variants]
+
+    inline_bytes = len(inline.encode())
+    css_bytes = len(css.encode())
+    print(f"source image          {os.path.getsize(args.image):>10,d} B")
+    print(f"before: per rerun     {inline_bytes:>10,d} B  ({inline_ms:.2f} ms read+encode)")
+    print(f"after:  per rerun     {css_bytes:>10,d} B  (built once in {build_ms:.0f} ms)")
+    print(f"{args.reruns} reruns:           {inline_bytes * args.reruns:>10,d} B -> {css_bytes * args.reruns:,d} B")
+    for width, size in sizes:
+        print(f"  variant {width:>4d}px    {size:>10,d} B  (fetched once, browser-cached)")
+
+
+if __name__ == "__main__":
+    main()
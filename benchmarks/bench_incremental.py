@@ -0,0 +1,70 @@
+"""
+add_ratings() vs a full rebuild: wall time and how many neighbor-table
+rows had to be recomputed, for deltas of increasing size drawn at random
+from the rating file.
+
+Usage:
+    python benchmarks/bench_incremental.py --ratings rating.csv --deltas 100 1000 10000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from anime_upgrade import AnimeRecommendationSystem
+
+
+def _build(anime_path, ratings, neighbor_k):
+    system = AnimeRecommendationSystem(neighbor_k=neighbor_k)
+    system.load_data(anime_path)
+    system.preprocess_data()
+    system.rating_df = ratings
+    start = time.perf_counter()
+    system.build_models()
+    return system, time.perf_counter() - start
+
+
+def main():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--anime", default=os.path.join(root, "data", "anime.csv"))
+    parser.add_argument("--ratings", default=os.path.join(root, "rating.csv"))
+    parser.add_argument("--deltas", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--neighbor-k", type=int, default=50)
+    args = parser.parse_args()
+
+    ratings = pd.read_csv(args.ratings, dtype={'user_id': 'int32', 'anime_id': 'int32', 'rating': 'int8'})
+    ratings = ratings[ratings['rating'] >= 0].reset_index(drop=True)
+    full, full_seconds = _build(args.anime, ratings, args.neighbor_k)
+    print(f"full build_models: {full_seconds:.2f}s ({len(ratings):,} ratings, {full.anime_matrix.shape[0]} items)")
+
+    rng = np.random.default_rng(0)
+    for n in args.deltas:
+        in_delta = np.zeros(len(ratings), dtype=bool)
+        in_delta[rng.choice(len(ratings), n, replace=False)] = True
+        system, _ = _build(args.anime, ratings[~in_delta], args.neighbor_k)
+
+        recomputed = []
+        neighbor_rows = system._neighbor_rows
+        def counting(items, k, on_block=None):
+            recomputed.append(len(items))
+            return neighbor_rows(items, k, on_block)
+        system._neighbor_rows = counting
+
+        start = time.perf_counter()
+        system.add_ratings(ratings[in_delta])
+        seconds = time.perf_counter() - start
+        # Index order can differ from the full build (first appearance), so align by anime_id
+        aligned = [full.anime_id_to_index[system.index_to_anime_id[i]] for i in range(len(system.index_to_anime_id))]
+        max_err = float(np.abs(system.neighbor_scores - full.neighbor_scores[aligned]).max())
+        print(f"delta {n:>7,d}: add_ratings {seconds:.2f}s ({full_seconds / seconds:.1f}x faster), "
+              f"touched rows {recomputed[0]}, stale rows recomputed {sum(recomputed[1:])}, "
+              f"max score diff vs rebuild {max_err:.1e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Compare the precomputed top-K neighbor table against the brute-force
+NearestNeighbors.kneighbors path: build time, memory and per-query latency.
+
+Usage:
+    python benchmarks/bench_neighbors.py --ratings rating.csv -k 50
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from anime_upgrade import AnimeRecommendationSystem
+
+
+def _percentiles(samples):
+    ms = np.asarray(samples) * 1000
+    return "p50=%.3fms p95=%.3fms p99=%.3fms" % tuple(np.percentile(ms, [50, 95, 99]))
+
+
+def main():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--anime", default=os.path.join(root, "data", "anime.csv"))
+    parser.add_argument("--ratings", default=os.path.join(root, "rating.csv"))
+    parser.add_argument("-k", type=int, default=50, help="neighbors stored per anime")
+    parser.add_argument("--top-n", type=int, default=15)
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    rec = AnimeRecommendationSystem()
+    rec.load_data(args.anime, args.ratings)
+    rec.preprocess_data()
+    if rec.rating_df is None:
+        sys.exit("rating file not found: %s" % args.ratings)
+
+    start = time.perf_counter()
+    rec._build_collaborative_model()
+    knn_build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    rec._build_neighbor_table(args.k)
+    table_build = time.perf_counter() - start
+
+    n_items = rec.anime_matrix.shape[0]
+    matrix = rec.anime_matrix
+    matrix_bytes = matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+    table_bytes = rec.neighbor_ids.nbytes + rec.neighbor_scores.nbytes
+
+    rng = np.random.default_rng(0)
+    query_rows = rng.integers(0, n_items, size=args.queries)
+
+    knn_times = []
+    for idx in query_rows:
+        start = time.perf_counter()
+        rec.knn_model.kneighbors(matrix[idx], n_neighbors=args.top_n + 1)
+        knn_times.append(time.perf_counter() - start)
+
+    table_times = []
+    for idx in query_rows:
+        start = time.perf_counter()
+        rec.neighbor_ids[idx, :args.top_n].tolist()
+        table_times.append(time.perf_counter() - start)
+
+    # How often the two paths agree (ties may reorder equal scores)
+    overlap = []
+    for idx in query_rows[:100]:
+        _, indices = rec.knn_model.kneighbors(matrix[idx], n_neighbors=args.top_n + 1)
+        brute = set(indices.flatten()[1:])
+        table = set(rec.neighbor_ids[idx, :args.top_n])
+        overlap.append(len(brute & table) / float(args.top_n))
+
+    print("items=%d users=%d nnz=%d k=%d" % (n_items, matrix.shape[1], matrix.nnz, rec.neighbor_ids.shape[1]))
+    print("build     kneighbors: %.2fs (CSR + fit)    table: %.2fs" % (knn_build, table_build))
+    print("memory    kneighbors: %.1f MB (CSR)      table: %.1f MB" % (matrix_bytes / 1e6, table_bytes / 1e6))
+    print("query     kneighbors: %s" % _percentiles(knn_times))
+    print("query     table:      %s" % _percentiles(table_times))
+    print("agreement top-%d overlap: %.3f" % (args.top_n, np.mean(overlap)))
+
+
+if __name__ == "__main__":
+    main()
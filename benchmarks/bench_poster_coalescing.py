@@ -0,0 +1,64 @@
+"""
+Simulated multi-session load on the poster fetcher: N sessions open the
+same "Top Watched" grid at once against a local stub Jikan server.
+Reports how many upstream calls single-flight coalescing saved.
+
+Usage:
+    python benchmarks/bench_poster_coalescing.py --sessions 20 --titles 15
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from jikan_stub import StubJikan
+from poster_fetcher import PosterFetcher
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--titles", type=int, default=15)
+    parser.add_argument("--rate", type=float, default=30.0, help="upstream budget, req/s")
+    parser.add_argument("--latency", type=float, default=0.15, help="stub response delay, s")
+    parser.add_argument("--stagger", type=float, default=0.02, help="delay between session starts, s")
+    args = parser.parse_args()
+
+    server = StubJikan(delay=args.latency)
+    fetcher = PosterFetcher(base_url=server.base_url, rate=args.rate, max_in_flight=8)
+    grid = [{'id': i, 'name': f'Anime {i}'} for i in range(1, args.titles + 1)]
+    render_times = [0.0] * args.sessions
+
+    def session(slot):
+        start = time.perf_counter()
+        fetcher.fetch_many(grid)
+        render_times[slot] = time.perf_counter() - start
+
+    threads = [threading.Thread(target=session, args=(slot,)) for slot in range(args.sessions)]
+    try:
+        for t in threads:
+            t.start()
+            time.sleep(args.stagger)
+        for t in threads:
+            t.join()
+    finally:
+        fetcher.close()
+        server.close()
+
+    stats = fetcher.stats()
+    naive = args.sessions * args.titles
+    print("sessions=%d titles=%d rate=%.0f/s upstream latency=%.0fms" % (
+        args.sessions, args.titles, args.rate, args.latency * 1000))
+    print("lookups:            %d" % stats['lookups'])
+    print("upstream requests:  %d (server saw %d)" % (stats['requests'], len(server.paths)))
+    print("coalesced:          %d" % stats['coalesced'])
+    print("upstream calls saved: %d of %d (%.1f%%)" % (
+        naive - stats['requests'], naive, 100.0 * (naive - stats['requests']) / naive))
+    print("grid render time:   max %.2fs, without coalescing at least %.2fs" % (
+        max(render_times), naive / args.rate))
+
+
+if __name__ == "__main__":
+    main()
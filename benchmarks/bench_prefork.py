@@ -0,0 +1,78 @@
+"""
+Pre-fork serving: memory per worker process and throughput as the process
+count grows. Memory comes from /proc/<pid>/smaps_rollup: RSS counts shared
+pages in every process, PSS splits them between sharers, and Private is
+what each extra worker really costs. Linux only.
+
+Usage:
+    python benchmarks/bench_prefork.py --ratings rating.csv --processes 1 2 4 --neighbor-k 50
+"""
+import argparse
+import os
+import subprocess
+import sys
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from load_test_service import ROOT, _requests, run_level
+
+
+def smaps(pid):
+    """
+    {'Rss', 'Pss', 'Private'} in MB for one process.
+    """
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    return {"Rss": fields.get('Rss', 0.0), "Pss": fields.get('Pss', 0.0),
+            "Private": fields.get('Private_Clean', 0.0) + fields.get('Private_Dirty', 0.0)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--anime", default=os.path.join(ROOT, "data", "anime.csv"))
+    parser.add_argument("--ratings", default=os.path.join(ROOT, "rating.csv"))
+    parser.add_argument("--artifacts", default=os.path.join(ROOT, "artifacts", "service"))
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--workers", type=int, default=4, help="threads per process")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--neighbor-k", type=int)
+    args = parser.parse_args()
+
+    source = _requests(args.anime, 0)
+    print(f"{'procs':>5s} {'req/s':>8s} {'p95':>9s}  {'worker RSS':>10s} {'worker PSS':>10s} "
+          f"{'worker private':>14s} {'total PSS':>9s}")
+    for processes in args.processes:
+        command = [sys.executable, os.path.join(ROOT, "recommender_service.py"), "--port", "0",
+                   "--processes", str(processes), "--workers", str(args.workers), "--anime", args.anime,
+                   "--ratings", args.ratings, "--artifacts", args.artifacts]
+        if args.neighbor_k:
+            command += ["--neighbor-k", str(args.neighbor_k)]
+        proc = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+        try:
+            line = proc.stdout.readline()
+            if not line.startswith("Serving on "):
+                sys.exit(f"service failed to start: {line!r}")
+            url = urlsplit(line.split()[2])
+            pids = [int(p) for p in line.split("(pids ")[1].rstrip(")\n").split()] if "(pids " in line else [proc.pid]
+
+            run_level(url.hostname, url.port, args.clients, 1.0, source) # touch the working set
+            result = run_level(url.hostname, url.port, args.clients, args.duration, source)
+
+            workers = [smaps(pid) for pid in pids]
+            parent = smaps(proc.pid) if processes > 1 else {"Pss": 0.0}
+            mean = {key: sum(w[key] for w in workers) / len(workers) for key in ("Rss", "Pss", "Private")}
+            total_pss = sum(w["Pss"] for w in workers) + parent["Pss"]
+            print(f"{processes:>5d} {result['rps']:>8.1f} {result['p95_ms']:>7.2f}ms  {mean['Rss']:>8.1f}MB "
+                  f"{mean['Pss']:>8.1f}MB {mean['Private']:>12.1f}MB {total_pss:>7.1f}MB")
+        finally:
+            proc.terminate()
+            proc.wait(timeout=15)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Latency of title resolution: trigram TitleIndex vs the old
+str.contains scan over every catalog name.
+
+Usage:
+    python benchmarks/bench_title_search.py
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from anime_upgrade import AnimeRecommendationSystem
+
+
+def _timed(fn, queries):
+    samples = []
+    for q in queries:
+        start = time.perf_counter()
+        fn(q)
+        samples.append(time.perf_counter() - start)
+    ms = np.asarray(samples) * 1000
+    return "p50=%.3fms p95=%.3fms p99=%.3fms" % tuple(np.percentile(ms, [50, 95, 99]))
+
+
+def main():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--anime", default=os.path.join(root, "data", "anime.csv"))
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    rec = AnimeRecommendationSystem()
+    rec.load_data(args.anime)
+    start = time.perf_counter()
+    rec.preprocess_data()
+    print("catalog=%d  preprocess (incl. index build): %.2fs" % (len(rec.anime_df), time.perf_counter() - start))
+
+    rng = np.random.default_rng(0)
+    names = rec.anime_df['name'].dropna().tolist()
+    exact = [names[i] for i in rng.integers(0, len(names), args.queries)]
+    # Drop one character from the middle to simulate typos
+    typos = [n[:len(n) // 2] + n[len(n) // 2 + 1:] for n in exact]
+    prefixes = [n[:3] for n in exact]
+
+    scan = lambda q: rec.anime_df[rec.anime_df['name'].str.contains(q, case=False, na=False, regex=False)]
+    print("str.contains (exact):  %s" % _timed(scan, exact))
+    print("lookup       (exact):  %s" % _timed(rec.title_index.lookup, exact))
+    print("search       (typo):   %s" % _timed(rec.title_index.search, typos))
+    print("autocomplete (3 char): %s" % _timed(rec.title_index.autocomplete, prefixes))
+
+    hits = sum(rec.title_index.lookup(t) == rec.title_index.lookup(e) for t, e in zip(typos, exact))
+    print("typo resolves to same title: %.1f%%" % (100.0 * hits / len(exact)))
+
+
+if __name__ == "__main__":
+    main()
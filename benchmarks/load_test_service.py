@@ -0,0 +1,158 @@
+"""
+Load test for recommender_service.py: throughput and tail latency at
+increasing client concurrency, with a mixed similar/category/top/batch
+workload. Starts the service in a subprocess (so client threads don't share
+its GIL) unless --url points at a running instance.
+
+Usage:
+    python benchmarks/load_test_service.py --ratings rating.csv --levels 1 4 16 64
+    python benchmarks/load_test_service.py --url http://127.0.0.1:8600
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import quote, urlsplit
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (endpoint, share of requests)
+MIX = [('similar', 0.6), ('category', 0.2), ('top', 0.1), ('batch', 0.1)]
+
+
+def _start_service(args):
+    command = [sys.executable, os.path.join(ROOT, "recommender_service.py"), "--port", "0",
+               "--workers", str(args.workers), "--anime", args.anime, "--ratings", args.ratings,
+               "--artifacts", args.artifacts]
+    if args.neighbor_k:
+        command += ["--neighbor-k", str(args.neighbor_k)]
+    proc = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    line = proc.stdout.readline()
+    if not line.startswith("Serving on "):
+        proc.kill()
+        sys.exit(f"service failed to start: {line!r}")
+    return proc, line.split()[2]
+
+
+def _requests(anime_path, seed):
+    """
+    Infinite generator of (endpoint, method, path, body) from the catalog.
+    """
+    catalog = pd.read_csv(anime_path, usecols=['anime_id', 'name', 'genre', 'members'])
+    catalog = catalog.sort_values('members', ascending=False).head(2000)
+    names = catalog['name'].tolist()
+    ids = catalog['anime_id'].tolist()
+    genres = sorted({g.strip() for text in catalog['genre'].dropna() for g in text.split(',')})
+    rng = random.Random(seed)
+    endpoints, weights = zip(*MIX)
+    while True:
+        endpoint = rng.choices(endpoints, weights)[0]
+        if endpoint == 'similar':
+            yield endpoint, 'GET', f"/similar?title={quote(rng.choice(names))}&top_n=10", None
+        elif endpoint == 'category':
+            yield endpoint, 'GET', f"/category?genre={quote(rng.choice(genres))}&top_n=15", None
+        elif endpoint == 'top':
+            yield endpoint, 'GET', "/top?top_n=15", None
+        else:
+            yield endpoint, 'POST', "/batch", json.dumps({"anime_ids": rng.sample(ids, 16), "top_n": 10})
+
+
+def run_level(host, port, concurrency, duration, request_source):
+    lock = threading.Lock()
+    latencies = {}
+    errors = [0]
+    deadline = time.perf_counter() + duration
+
+    def client():
+        while time.perf_counter() < deadline:
+            with lock:
+                endpoint, method, path, body = next(request_source)
+            start = time.perf_counter()
+            try:
+                conn = http.client.HTTPConnection(host, port, timeout=30)
+                conn.request(method, path, body=body, headers={'Content-Type': 'application/json'})
+                response = conn.getresponse()
+                response.read()
+                conn.close()
+                ok = response.status == 200
+            except (OSError, http.client.HTTPException):
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                if ok:
+                    latencies.setdefault(endpoint, []).append(elapsed)
+                else:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+
+    every = np.concatenate([np.asarray(v) for v in latencies.values()]) * 1000 if latencies else np.zeros(1)
+    p50, p95, p99 = np.percentile(every, [50, 95, 99])
+    return {
+        "concurrency": concurrency,
+        "requests": int(every.size) if latencies else 0,
+        "errors": errors[0],
+        "rps": (every.size if latencies else 0) / wall,
+        "p50_ms": p50, "p95_ms": p95, "p99_ms": p99,
+        "per_endpoint_p95_ms": {name: float(np.percentile(np.asarray(v) * 1000, 95))
+                                for name, v in sorted(latencies.items())},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="running service; default starts one")
+    parser.add_argument("--anime", default=os.path.join(ROOT, "data", "anime.csv"))
+    parser.add_argument("--ratings", default=os.path.join(ROOT, "rating.csv"))
+    parser.add_argument("--artifacts", default=os.path.join(ROOT, "artifacts", "service"))
+    parser.add_argument("--workers", type=int, default=8, help="service worker threads")
+    parser.add_argument("--neighbor-k", type=int, help="passed to the service it starts")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per level")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write results as JSON")
+    args = parser.parse_args()
+
+    proc = None
+    url = args.url
+    if url is None:
+        proc, url = _start_service(args)
+    parts = urlsplit(url)
+    source = _requests(args.anime, args.seed)
+
+    results = []
+    try:
+        run_level(parts.hostname, parts.port, 2, 1.0, source) # warm-up
+        print(f"{'clients':>7s} {'req/s':>9s} {'p50':>9s} {'p95':>9s} {'p99':>9s} {'errors':>7s}  per-endpoint p95")
+        for level in args.levels:
+            r = run_level(parts.hostname, parts.port, level, args.duration, source)
+            results.append(r)
+            endpoints = " ".join(f"{k}={v:.1f}" for k, v in r["per_endpoint_p95_ms"].items())
+            print(f"{level:>7d} {r['rps']:>9.1f} {r['p50_ms']:>7.2f}ms {r['p95_ms']:>7.2f}ms "
+                  f"{r['p99_ms']:>7.2f}ms {r['errors']:>7d}  {endpoints}")
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=10)
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump({"url": url, "workers": args.workers, "results": results}, f, indent=2, default=float)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+Headless benchmark suite for the recommender.
+For each scale: generate (or reuse) a synthetic dataset, then measure wall
+time and peak RSS for load_data, preprocess_data, the content model and the
+collaborative model, and p50/p95/p99 latency of the collaborative, content
+and category query paths. Every scale runs in a fresh interpreter so RSS
+numbers don't leak between scales. Results are written as JSON; pass
+--compare with an earlier results file to fail on regressions.
+
+Usage:
+    python benchmarks/run_suite.py --scales 10k 100k 1m --out results.json
+    python benchmarks/run_suite.py --scales 1m --compare results.json --tolerance 0.25
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def current_rss():
+    """
+    Resident set size in bytes (Linux /proc), else the lifetime peak, else
+    0 where neither is available (Windows).
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource # Unix only
+    except ImportError:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class PeakRSS:
+    """
+    Samples RSS in a background thread while the block runs.
+    """
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, current_rss())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.before = current_rss()
+        self.peak = self.before
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.after = current_rss()
+        self.peak = max(self.peak, self.after)
+
+
+def _stage(stages, name, fn):
+    with PeakRSS() as rss:
+        start = time.perf_counter()
+        fn()
+        seconds = time.perf_counter() - start
+    stages[name] = {
+        "seconds": round(seconds, 4),
+        "peak_rss_mb": round(rss.peak / 2**20, 1),
+        "rss_delta_mb": round((rss.after - rss.before) / 2**20, 1),
+    }
+
+
+def _latencies(fn, args_list):
+    samples = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - start)
+    ms = np.asarray(samples) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {"n": len(samples), "mean_ms": round(float(ms.mean()), 4),
+            "p50_ms": round(float(p50), 4), "p95_ms": round(float(p95), 4), "p99_ms": round(float(p99), 4)}
+
+
+def run_scale(scale, data_dir, queries, top_n, seed):
+    """
+    Benchmark one scale in this process; returns a result dict.
+    """
+    from anime_upgrade import AnimeRecommendationSystem
+    from synthetic_data import write_dataset
+
+    start = time.perf_counter()
+    anime_path, rating_path = write_dataset(os.path.join(data_dir, scale), scale, seed=seed)
+    generate_seconds = time.perf_counter() - start
+
+    system = AnimeRecommendationSystem()
+    stages = {}
+    _stage(stages, 'load_data', lambda: system.load_data(anime_path, rating_path, streaming=True))
+    _stage(stages, 'preprocess_data', system.preprocess_data)
+    _stage(stages, 'content_model', system._build_content_model)
+    _stage(stages, 'collaborative_model', system._build_collaborative_model)
+
+    rng = np.random.default_rng(seed)
+    names = system.catalog_columns['name']
+    ids = system.catalog_columns['anime_id']
+    rated = np.array([anime_id in system.anime_id_to_index for anime_id in ids], dtype=bool)
+    collab_rows = np.flatnonzero(rated)
+    content_rows = np.flatnonzero(~rated)
+
+    paths = {}
+    if collab_rows.size:
+        picks = rng.choice(collab_rows, size=queries)
+        paths['collaborative'] = _latencies(system.get_recommendations, [(names[r], top_n) for r in picks])
+    if content_rows.size:
+        # Titles without enough ratings take the content fallback
+        picks = rng.choice(content_rows, size=queries)
+        paths['content'] = _latencies(system.get_recommendations, [(names[r], top_n) for r in picks])
+    else:
+        # Every title is covered: time the fallback's own work directly
+        def content(row):
+            rows, _ = system.genre_index.similar(row, top_n, metric=system.content_metric)
+            return system._package_rows(rows)
+        paths['content'] = _latencies(content, [(r,) for r in rng.choice(len(names), size=queries)])
+    categories = system.get_categories()
+    if categories:
+        picks = rng.choice(len(categories), size=queries)
+        paths['category'] = _latencies(system.get_category_recommendations,
+                                       [(categories[i], top_n) for i in picks])
+    paths['top'] = _latencies(system.get_top_animes, [(top_n,)] * queries)
+
+    n_items, n_users = system.anime_matrix.shape if system.anime_matrix is not None else (0, 0)
+    return {
+        "scale": scale,
+        "rating_rows": sum(1 for _ in open(rating_path)) - 1,
+        "catalog_rows": len(names),
+        "kept_ratings": int(system.anime_matrix.nnz) if system.anime_matrix is not None else 0,
+        "matrix_items": int(n_items),
+        "matrix_users": int(n_users),
+        "generate_seconds": round(generate_seconds, 3),
+        "stages": stages,
+        "queries": paths,
+        "peak_rss_mb": round(max(s["peak_rss_mb"] for s in stages.values()), 1),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Regressions (stage seconds, query p95) slower than baseline by more than
+    `tolerance` (fraction). Returns human-readable lines.
+    """
+    previous = {r["scale"]: r for r in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        old = previous.get(result["scale"])
+        if old is None:
+            continue
+        # (label, new, old, absolute noise floor in the metric's unit)
+        metrics = [(f"stage {name} s", stage["seconds"], old["stages"].get(name, {}).get("seconds"), 0.05)
+                   for name, stage in result["stages"].items()]
+        metrics += [(f"{name} p95 ms", path["p95_ms"], old["queries"].get(name, {}).get("p95_ms"), 0.05)
+                    for name, path in result["queries"].items()]
+        for label, new_value, old_value, floor in metrics:
+            if old_value and new_value > old_value * (1 + tolerance) and new_value - old_value > floor:
+                regressions.append(f"{result['scale']}: {label} {old_value} -> {new_value}")
+    return regressions
+
+
+def _metadata():
+    import pandas as pd
+    import scipy
+    import sklearn
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root,
+                                capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "scipy": scipy.__version__,
+        "sklearn": sklearn.__version__,
+    }
+
+
+def main():
+    from synthetic_data import SCALES
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", nargs="+", choices=list(SCALES), default=['10k', '100k', '1m'])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-n", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "anime_bench_data"),
+                        help="generated datasets are cached here")
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--compare", help="earlier results file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        result = run_scale(args.worker, args.data_dir, args.queries, args.top_n, args.seed)
+        print(json.dumps(result))
+        return
+
+    results = []
+    for scale in args.scales:
+        # Fresh interpreter per scale keeps RSS measurements independent
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker", scale, "--data-dir", args.data_dir,
+             "--queries", str(args.queries), "--top-n", str(args.top_n), "--seed", str(args.seed)],
+            capture_output=True, text=True)
+        if proc.returncode != 0:
+            sys.stderr.write(proc.stderr)
+            sys.exit(f"scale {scale} failed")
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        results.append(result)
+
+        stages = "  ".join(f"{name}={s['seconds']:.2f}s/{s['peak_rss_mb']:.0f}MB"
+                           for name, s in result["stages"].items())
+        print(f"[{scale}] {result['rating_rows']:,} ratings, matrix {result['matrix_items']}x{result['matrix_users']}")
+        print(f"  {stages}")
+        for name, q in result["queries"].items():
+            print(f"  {name:<14s} p50={q['p50_ms']:.3f}ms p95={q['p95_ms']:.3f}ms p99={q['p99_ms']:.3f}ms")
+
+    with open(args.out, 'w') as f:
+        json.dump({"meta": _metadata(), "results": results}, f, indent=2)
+    print(f"Wrote {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Synthetic anime.csv / rating.csv generator for benchmarks.
+Same columns and value conventions as the Kaggle files (rating -1 means
+watched but not rated). User activity and item popularity are power-law
+(Pareto / Zipf), and each user leans towards one genre cluster, so the
+collaborative model has real neighbourhoods to find. Ratings are written in
+blocks of users, so memory stays flat up to the 20M-rating scale.
+
+Usage:
+    python benchmarks/synthetic_data.py --scale 1m --out /tmp/synthetic
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+# name -> (ratings, catalog size)
+SCALES = {
+    '10k': (10_000, 1_000),
+    '100k': (100_000, 3_000),
+    '1m': (1_000_000, 8_000),
+    '5m': (5_000_000, 12_000),
+    '20m': (20_000_000, 12_000),
+}
+
+GENRES = [
+    "Action", "Adventure", "Cars", "Comedy", "Dementia", "Demons", "Drama", "Ecchi", "Fantasy",
+    "Game", "Harem", "Hentai", "Historical", "Horror", "Josei", "Kids", "Magic", "Martial Arts",
+    "Mecha", "Military", "Music", "Mystery", "Parody", "Police", "Psychological", "Romance",
+    "Samurai", "School", "Sci-Fi", "Seinen", "Shoujo", "Shoujo Ai", "Shounen", "Shounen Ai",
+    "Slice of Life", "Space", "Sports", "Super Power", "Supernatural", "Thriller", "Vampire",
+    "Yaoi", "Yuri",
+]
+TYPES = ["TV", "Movie", "OVA", "Special", "ONA", "Music"]
+TYPE_WEIGHTS = [0.31, 0.19, 0.27, 0.14, 0.05, 0.04]
+WORDS = [
+    "Sword", "Star", "Spirit", "Academy", "Chronicle", "Dragon", "Shadow", "Heart", "Sky", "Blade",
+    "Dream", "Legend", "Ghost", "Island", "Knight", "Moon", "Ocean", "Phantom", "Quest", "Rebellion",
+    "Saga", "Storm", "Tale", "Twilight", "Voyage", "Wings", "Zero", "Alchemist", "Hunter", "Garden",
+]
+
+
+def _zipf_weights(n, exponent):
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    return weights / weights.sum()
+
+
+def generate_catalog(n_items, n_clusters=20, seed=0):
+    """
+    Catalog DataFrame in popularity order, plus each item's genre cluster.
+    """
+    rng = np.random.default_rng(seed)
+    popularity = _zipf_weights(n_items, 0.9)
+    cluster = rng.integers(0, n_clusters, n_items)
+
+    # Each cluster has 2-4 core genres; items take some of them plus noise
+    cores = [rng.choice(len(GENRES), size=rng.integers(2, 5), replace=False) for _ in range(n_clusters)]
+    genres = []
+    for c in cluster:
+        picked = set(rng.choice(cores[c], size=rng.integers(1, len(cores[c]) + 1), replace=False).tolist())
+        picked.update(rng.choice(len(GENRES), size=rng.integers(0, 3)).tolist())
+        genres.append(", ".join(GENRES[g] for g in sorted(picked)))
+
+    words = np.asarray(WORDS)
+    names = [f"{' '.join(rng.choice(words, size=rng.integers(1, 4)))} {i}" for i in range(n_items)]
+
+    types = rng.choice(TYPES, size=n_items, p=TYPE_WEIGHTS)
+    episodes = np.where(types == "TV", rng.integers(10, 60, n_items), rng.integers(1, 7, n_items)).astype(object)
+    episodes[rng.random(n_items) < 0.03] = "Unknown"
+
+    members = np.maximum(popularity * 25_000_000, 5).astype(np.int64)
+    rating = np.round(np.clip(6.3 + np.log10(members) * 0.2 + rng.normal(0, 0.8, n_items), 1.0, 10.0), 2)
+
+    catalog = pd.DataFrame({
+        'anime_id': np.arange(1, n_items + 1) * 3 + rng.integers(0, 3, n_items), # sparse, unique ids
+        'name': names,
+        'genre': genres,
+        'type': types,
+        'episodes': episodes,
+        'rating': rating,
+        'members': members,
+    })
+    catalog.loc[rng.random(n_items) < 0.005, 'genre'] = np.nan
+    catalog.loc[rng.random(n_items) < 0.02, 'rating'] = np.nan
+    return catalog, cluster
+
+
+def iter_rating_blocks(catalog, cluster, n_ratings, affinity=0.7, unrated=0.18, block_users=20_000, seed=0):
+    """
+    Yield rating DataFrames (user_id, anime_id, rating) until ~n_ratings rows.
+    """
+    rng = np.random.default_rng(seed + 1)
+    n_items = len(catalog)
+    anime_ids = catalog['anime_id'].to_numpy()
+    quality = np.nan_to_num(catalog['rating'].to_numpy(dtype=np.float64), nan=6.5)
+    n_clusters = int(cluster.max()) + 1
+
+    # Inverse-CDF samplers: global and per cluster
+    weights = _zipf_weights(n_items, 0.9)
+    global_cdf = np.cumsum(weights)
+    members_of = [np.flatnonzero(cluster == c) for c in range(n_clusters)]
+    cluster_cdf = [np.cumsum(weights[m]) / weights[m].sum() for m in members_of]
+
+    produced = 0
+    next_user = 1
+    while produced < n_ratings:
+        # Pareto activity: most users rate a handful, a few rate hundreds
+        activity = np.minimum((rng.pareto(1.2, block_users) + 1) * 12, n_items).astype(np.int64)
+        activity = activity[np.cumsum(activity) <= n_ratings - produced + activity.max()]
+        users = np.repeat(np.arange(len(activity)), activity)
+        favourite = rng.integers(0, n_clusters, len(activity))
+
+        picks = np.searchsorted(global_cdf, rng.random(len(users)) * global_cdf[-1])
+        from_cluster = rng.random(len(users)) < affinity
+        fav = favourite[users]
+        for c in range(n_clusters):
+            slots = np.flatnonzero(from_cluster & (fav == c))
+            if slots.size and members_of[c].size:
+                local = np.searchsorted(cluster_cdf[c], rng.random(slots.size) * cluster_cdf[c][-1])
+                picks[slots] = members_of[c][np.minimum(local, members_of[c].size - 1)]
+        picks = np.minimum(picks, n_items - 1)
+
+        # One rating per (user, item)
+        keys = np.unique(users * n_items + picks)
+        users, picks = keys // n_items, keys % n_items
+        keys = None
+
+        bias = rng.normal(0, 1.0, len(activity))[users]
+        in_favourite = cluster[picks] == favourite[users]
+        score = quality[picks] + bias + in_favourite * 1.0 + rng.normal(0, 1.2, len(users))
+        ratings = np.clip(np.rint(score), 1, 10).astype(np.int8)
+        ratings[rng.random(len(users)) < unrated] = -1
+
+        take = min(len(users), n_ratings - produced)
+        block = pd.DataFrame({
+            'user_id': (users[:take] + next_user).astype(np.int32),
+            'anime_id': anime_ids[picks[:take]].astype(np.int32),
+            'rating': ratings[:take],
+        })
+        produced += take
+        next_user += len(activity)
+        yield block
+
+
+def write_dataset(out_dir, scale='100k', n_ratings=None, n_items=None, seed=0):
+    """
+    Write anime.csv and rating.csv under out_dir; returns their paths.
+    Existing files generated with the same parameters are reused.
+    """
+    default_ratings, default_items = SCALES[scale]
+    n_ratings = n_ratings or default_ratings
+    n_items = n_items or default_items
+    os.makedirs(out_dir, exist_ok=True)
+    anime_path = os.path.join(out_dir, 'anime.csv')
+    rating_path = os.path.join(out_dir, 'rating.csv')
+    stamp_path = os.path.join(out_dir, 'params.txt')
+    stamp = f"{n_ratings} {n_items} {seed}"
+
+    if os.path.exists(stamp_path) and os.path.exists(rating_path):
+        with open(stamp_path) as f:
+            if f.read().strip() == stamp:
+                return anime_path, rating_path
+
+    catalog, cluster = generate_catalog(n_items, seed=seed)
+    catalog.to_csv(anime_path, index=False)
+    with open(rating_path, 'w', newline='') as f:
+        f.write("user_id,anime_id,rating\n")
+        for block in iter_rating_blocks(catalog, cluster, n_ratings, seed=seed):
+            block.to_csv(f, header=False, index=False)
+    with open(stamp_path, 'w') as f:
+        f.write(stamp)
+    return anime_path, rating_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", choices=sorted(SCALES, key=lambda s: SCALES[s][0]), default='100k')
+    parser.add_argument("--ratings", type=int, help="override the scale's rating count")
+    parser.add_argument("--items", type=int, help="override the scale's catalog size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+
+    anime_path, rating_path = write_dataset(args.out, args.scale, args.ratings, args.items, args.seed)
+    for path in (anime_path, rating_path):
+        print(f"{path}: {os.path.getsize(path) / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
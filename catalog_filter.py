@@ -0,0 +1,100 @@
+"""
+Catalog filters for recommendation, category and top queries.
+Filter specs ({'type': 'Movie', 'min_rating': 7.5, ...}) compile to one
+boolean mask over catalog rows, from per-type masks and numeric columns
+prepared once with the catalog. Queries apply the mask inside top-K
+selection, so a filter never shrinks the result below top_n when enough
+rows match.
+"""
+import numpy as np
+import pandas as pd
+
+# Numeric bounds: spec key -> (column, comparison)
+_BOUNDS = {
+    'min_rating': ('rating', np.greater_equal),
+    'max_rating': ('rating', np.less_equal),
+    'min_episodes': ('episodes', np.greater_equal),
+    'max_episodes': ('episodes', np.less_equal),
+    'min_members': ('members', np.greater_equal),
+    'max_members': ('members', np.less_equal),
+}
+FILTER_KEYS = ('type',) + tuple(_BOUNDS)
+
+
+class CatalogFilter:
+    def __init__(self, types, rating, episodes, members=None, cache_size=256):
+        """
+        Per-row catalog columns. Non-numeric episodes ("Unknown") and NaN
+        ratings/members never satisfy a bound on that column.
+        """
+        types = np.asarray(types, dtype=object)
+        n_rows = len(types)
+        self.type_masks = {t: types == t for t in sorted({t for t in types if isinstance(t, str)})}
+        self.type_lookup = {t.lower(): t for t in self.type_masks}
+        self.columns = {
+            'rating': np.asarray(rating, dtype=np.float32),
+            'episodes': pd.to_numeric(pd.Series(episodes), errors='coerce').to_numpy(dtype=np.float32),
+            'members': (np.asarray(members, dtype=np.float32) if members is not None
+                        else np.full(n_rows, np.nan, dtype=np.float32)),
+        }
+        self.n_rows = n_rows
+        self.cache_size = cache_size
+        self._cache = {}
+
+    @property
+    def nbytes(self):
+        return (sum(m.nbytes for m in self.type_masks.values()) + sum(c.nbytes for c in self.columns.values())
+                + sum(m.nbytes for m in self._cache.values()))
+
+    @property
+    def types(self):
+        return list(self.type_masks)
+
+    def _key(self, filters):
+        # Canonical, hashable form: equivalent specs share one cached mask
+        key = []
+        for name, value in sorted(filters.items()):
+            if value is None:
+                continue
+            if name not in FILTER_KEYS:
+                raise ValueError(f"Unknown filter: {name} (expected one of {', '.join(FILTER_KEYS)})")
+            if name == 'type':
+                value = [value] if isinstance(value, str) else value
+                value = tuple(sorted({self.type_lookup.get(str(t).strip().lower(), str(t)) for t in value}))
+            else:
+                value = float(value)
+            key.append((name, value))
+        return tuple(key)
+
+    def mask(self, filters):
+        """
+        Read-only bool array over catalog rows for a filter spec, or None
+        when the spec filters nothing. type may be one type or a list (any
+        of, case-insensitive); bounds are inclusive. Recent masks are cached.
+        """
+        if not filters:
+            return None
+        key = self._key(filters)
+        if not key:
+            return None
+        mask = self._cache.get(key)
+        if mask is not None:
+            return mask
+
+        mask = np.ones(self.n_rows, dtype=bool)
+        for name, value in key:
+            if name == 'type':
+                allowed = np.zeros(self.n_rows, dtype=bool)
+                for t in value:
+                    if t in self.type_masks:
+                        allowed |= self.type_masks[t]
+                mask &= allowed
+            else:
+                column, compare = _BOUNDS[name]
+                mask &= compare(self.columns[column], value) # NaN compares False
+        mask.flags.writeable = False
+
+        if len(self._cache) >= self.cache_size:
+            self._cache.clear()
+        self._cache[key] = mask
+        return mask
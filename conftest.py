@@ -0,0 +1,93 @@
+"""
+Shared fixtures: small catalogs cut from data/anime.csv, with synthetic
+ratings for the collaborative model.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from anime_upgrade import AnimeRecommendationSystem
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Hand-written catalog for exact expectations: a duplicated anime_id (3), a
+# duplicated name (Alpha), a multi-word genre, "Unknown" episodes, NaN rating
+TINY_CATALOG = """anime_id,name,genre,type,episodes,rating,members
+10,Alpha,"Action, Sci-Fi",TV,12,8.5,1000
+3,Beta,Action,Movie,1,7.0,5000
+7,Gamma &#039;Slice&#039;,"Slice of Life, Comedy",TV,Unknown,,200
+3,Beta Again,Drama,OVA,2,6.0,10
+25,Alpha,"Comedy, Sci-Fi, Action",TV,24,9.1,50
+"""
+
+
+def synthetic_ratings(anime_ids, n_users, per_user, seed=0):
+    """
+    Uniformly random 1-10 ratings, one per (user, anime) pair.
+    """
+    rng = np.random.default_rng(seed)
+    users = np.repeat(np.arange(1, n_users + 1), per_user)
+    anime_ids = np.asarray(anime_ids)
+    return pd.DataFrame({
+        'user_id': users.astype(np.int32),
+        'anime_id': anime_ids[rng.integers(0, len(anime_ids), len(users))].astype(np.int32),
+        'rating': rng.integers(1, 11, len(users)).astype(np.int8),
+    }).drop_duplicates(['user_id', 'anime_id'])
+
+
+@pytest.fixture
+def tiny_system(tmp_path):
+    """
+    Content-only system over TINY_CATALOG (rows in file order).
+    """
+    path = tmp_path / 'anime.csv'
+    path.write_text(TINY_CATALOG)
+    system = AnimeRecommendationSystem()
+    system.load_data(str(path))
+    system.preprocess_data()
+    system.build_models()
+    return system
+
+
+@pytest.fixture(scope='session')
+def make_catalog(tmp_path_factory):
+    """
+    make_catalog(n_titles) -> path of an anime.csv with the first n_titles rows.
+    """
+    paths = {}
+
+    def make(n_titles):
+        if n_titles not in paths:
+            path = tmp_path_factory.mktemp('catalog') / 'anime.csv'
+            pd.read_csv(os.path.join(HERE, 'data', 'anime.csv')).head(n_titles).to_csv(path, index=False)
+            paths[n_titles] = str(path)
+        return paths[n_titles]
+
+    return make
+
+
+@pytest.fixture(scope='session')
+def build_system(make_catalog):
+    """
+    build_system(n_titles, neighbor_k=None, **kwargs) -> a built system,
+    shared by every test asking for the same parameters (don't mutate it).
+    All but the last 50 titles are rated by n_titles // 2 users with
+    n_titles // 10 ratings each; the last 50 are content-only.
+    """
+    systems = {}
+
+    def build(n_titles, neighbor_k=None, **kwargs):
+        key = repr((n_titles, neighbor_k, sorted(kwargs.items())))
+        if key not in systems:
+            system = AnimeRecommendationSystem(neighbor_k=neighbor_k, **kwargs)
+            system.load_data(make_catalog(n_titles))
+            system.preprocess_data()
+            rated = system.catalog_columns['anime_id'][:n_titles - 50]
+            system.rating_df = synthetic_ratings(rated, n_users=n_titles // 2, per_user=n_titles // 10)
+            system.build_models()
+            systems[key] = system
+        return systems[key]
+
+    return build
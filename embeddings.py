@@ -0,0 +1,78 @@
+"""
+Matrix-factorization item embeddings for the collaborative model.
+Truncated SVD of the (items x users) rating matrix gives dense float32
+item vectors of a fixed rank, so similarity no longer scales with the
+number of users.
+"""
+import numpy as np
+
+
+class ItemEmbeddings:
+    def __init__(self, rank=64, n_iter=5, seed=0):
+        self.rank = rank
+        self.n_iter = n_iter
+        self.seed = seed
+        self.vectors = None     # float32 (n_items, rank), L2-normalized
+        self.components = None  # float32 (rank, n_users), for folding in new rows
+
+    @property
+    def nbytes(self):
+        return self.vectors.nbytes + self.components.nbytes
+
+    def fit(self, matrix):
+        """
+        matrix: (n_items, n_users) sparse ratings.
+        """
+        from sklearn.decomposition import TruncatedSVD
+
+        rank = max(1, min(self.rank, min(matrix.shape) - 1))
+        svd = TruncatedSVD(n_components=rank, n_iter=self.n_iter, random_state=self.seed)
+        svd.fit(matrix.astype(np.float32))
+        self.components = svd.components_.astype(np.float32)
+        self.vectors = self.transform(matrix)
+        return self
+
+    def transform(self, rows):
+        """
+        Project sparse rating rows into the embedding space (normalized).
+        Works for items that were not part of fit(), e.g. new ratings.
+        """
+        vectors = np.asarray(rows @ self.components.T, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms > 0, norms, 1)
+
+    def update(self, matrix, rows):
+        """
+        Fold in changed/appended item rows of matrix without refitting.
+        New users get zero weight in the components until the next fit().
+        """
+        extra_users = matrix.shape[1] - self.components.shape[1]
+        if extra_users > 0:
+            self.components = np.hstack(
+                [self.components, np.zeros((self.components.shape[0], extra_users), dtype=np.float32)])
+        vectors = np.zeros((matrix.shape[0], self.vectors.shape[1]), dtype=np.float32)
+        vectors[:len(self.vectors)] = self.vectors
+        vectors[rows] = self.transform(matrix[rows])
+        self.vectors = vectors
+        return self
+
+    def similar(self, idx, top_n=10):
+        """
+        Top-N items by cosine similarity to item idx (excluding itself).
+        """
+        scores = self.vectors @ self.vectors[idx]
+        scores[idx] = -np.inf
+        top_n = min(top_n, len(scores) - 1)
+        top = np.argpartition(-scores, top_n - 1)[:top_n]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return top, scores[top]
+
+    def to_arrays(self):
+        return {'vectors': self.vectors, 'components': self.components}
+
+    @classmethod
+    def from_arrays(cls, arrays, **params):
+        embeddings = cls(**params)
+        embeddings.vectors = arrays['vectors']
+        embeddings.components = arrays['components']
+        return embeddings
@@ -0,0 +1,177 @@
+"""
+Genre engine for content-based similarity and category browsing.
+Each anime's genre set is packed into uint64 words (one bit per genre), so
+similarity against the whole catalog is an AND + popcount per row.
+Per-genre posting lists (int32 rows, pre-sorted per sort key) make
+category pages a slice and multi-genre queries a sorted-array merge.
+"""
+import numpy as np
+
+
+def split_genres(genres):
+    """
+    "Action, Sci-Fi, Slice of Life" -> ['Action', 'Sci-Fi', 'Slice of Life']
+    Multi-word genres stay whole, unlike a word tokenizer.
+    """
+    if not isinstance(genres, str):
+        return []
+    return [g.strip() for g in genres.split(',') if g.strip()]
+
+
+if hasattr(np, 'bitwise_count'):
+    def popcount(words):
+        return np.bitwise_count(words)
+else:
+    _BYTE_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+    def popcount(words):
+        # numpy < 2.0: per-byte lookup table
+        counts = _BYTE_POPCOUNT[words.view(np.uint8)]
+        return counts.reshape(words.shape + (8,)).sum(axis=-1, dtype=np.uint8)
+
+
+class GenreIndex:
+    def __init__(self, genres, popularity=None):
+        """
+        genres: comma-separated genre strings in catalog row order.
+        popularity: optional per-row weight used to order equal scores.
+        """
+        row_genres = [split_genres(g) for g in genres]
+        self.vocabulary = sorted({g for gs in row_genres for g in gs})
+        self.genre_to_bit = {g: i for i, g in enumerate(self.vocabulary)}
+        self.genre_lookup = {g.lower(): g for g in self.vocabulary}
+
+        n_rows = len(row_genres)
+        n_words = max(1, (len(self.vocabulary) + 63) // 64)
+        self.bits = np.zeros((n_rows, n_words), dtype=np.uint64)
+        for row, gs in enumerate(row_genres):
+            for g in gs:
+                bit = self.genre_to_bit[g]
+                self.bits[row, bit >> 6] |= np.uint64(1) << np.uint64(bit & 63)
+        self.counts = popcount(self.bits).sum(axis=1, dtype=np.int32)
+
+        if popularity is None:
+            popularity = np.zeros(n_rows, dtype=np.float32)
+        popularity = np.nan_to_num(np.asarray(popularity, dtype=np.float32))
+        top = popularity.max() if n_rows else 0
+        # Far below the smallest score gap (1 / n_genres^2), only reorders ties
+        self.tie_break = (popularity / top * 1e-6).astype(np.float32) if top > 0 else popularity * 0
+
+        # Posting lists, filled by build_postings()
+        self.rows = {}      # genre -> int32 rows in ascending row order
+        self.postings = {}  # sort key -> genre -> int32 rows, best first
+        self.rank = {}      # sort key -> int32 position of each row in the global order
+
+    def build_postings(self, orders):
+        """
+        orders: sort key -> int32 catalog rows, best first (e.g. by rating).
+        """
+        for g, bit in self.genre_to_bit.items():
+            has_genre = (self.bits[:, bit >> 6] >> np.uint64(bit & 63)) & np.uint64(1)
+            self.rows[g] = np.flatnonzero(has_genre).astype(np.int32)
+
+        for key, order in orders.items():
+            order = np.asarray(order, dtype=np.int32)
+            rank = np.empty(len(order), dtype=np.int32)
+            rank[order] = np.arange(len(order), dtype=np.int32)
+            self.rank[key] = rank
+
+            self.postings[key] = {}
+            for g, bit in self.genre_to_bit.items():
+                has_genre = ((self.bits[order, bit >> 6] >> np.uint64(bit & 63)) & np.uint64(1)).astype(bool)
+                self.postings[key][g] = order[has_genre]
+
+    def resolve(self, genre):
+        """
+        Exact vocabulary entry for a genre name (case-insensitive), or None.
+        """
+        return self.genre_lookup.get(str(genre).strip().lower())
+
+    def query(self, genres, sort='rating', top_n=None, match='all', allowed=None):
+        """
+        Rows having all (match='all') or any (match='any') of the genres,
+        ordered by the sort key. A single genre is a slice of its posting.
+        allowed: optional bool mask over rows, applied before the top_n cut.
+        """
+        if isinstance(genres, str):
+            genres = [genres]
+        resolved = [self.resolve(g) for g in genres]
+        if match == 'all' and (not resolved or None in resolved):
+            return np.empty(0, dtype=np.int32)
+        resolved = [g for g in resolved if g is not None]
+        if not resolved:
+            return np.empty(0, dtype=np.int32)
+
+        if len(resolved) == 1:
+            posting = self.postings[sort][resolved[0]]
+            if allowed is not None:
+                posting = posting[allowed[posting]]
+            return posting if top_n is None else posting[:top_n]
+
+        # Merge the row-ordered postings, smallest first for intersections
+        lists = sorted((self.rows[g] for g in resolved), key=len)
+        rows = lists[0]
+        for other in lists[1:]:
+            if match == 'all':
+                rows = np.intersect1d(rows, other, assume_unique=True)
+            else:
+                rows = np.union1d(rows, other)
+        if allowed is not None:
+            rows = rows[allowed[rows]]
+
+        ranks = self.rank[sort][rows]
+        if top_n is not None and len(rows) > top_n:
+            keep = np.argpartition(ranks, top_n - 1)[:top_n]
+            rows, ranks = rows[keep], ranks[keep]
+        return rows[np.argsort(ranks, kind='stable')]
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes + self.counts.nbytes + self.tie_break.nbytes
+
+    def scores(self, row, metric='cosine'):
+        """
+        Similarity of one catalog row against every row, as float32.
+        metric: 'cosine' (|A&B| / sqrt(|A||B|)) or 'jaccard' (|A&B| / |A|B|).
+        """
+        return self.scores_batch([row], metric)[0]
+
+    def scores_batch(self, rows, metric='cosine'):
+        """
+        (len(rows), n_rows) float32 similarities for a block of seed rows.
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        inter = popcount(self.bits[rows, None, :] & self.bits[None, :, :]).sum(axis=2, dtype=np.int32)
+        inter = inter.astype(np.float32)
+        seed_counts = self.counts[rows, None]
+        if metric == 'jaccard':
+            denom = (self.counts[None, :] + seed_counts).astype(np.float32) - inter
+        elif metric == 'cosine':
+            denom = np.sqrt(self.counts[None, :].astype(np.float32) * seed_counts)
+        else:
+            raise ValueError(f"Unknown metric: {metric}")
+        return np.divide(inter, denom, out=np.zeros_like(inter), where=denom > 0)
+
+    def similar(self, row, top_n=10, metric='cosine'):
+        """
+        Top-N most similar rows (excluding row itself) and their scores.
+        """
+        top, scores = self.similar_batch([row], top_n, metric)
+        return top[0], scores[0]
+
+    def similar_batch(self, rows, top_n=10, metric='cosine'):
+        """
+        Row-wise top-N for a block of seed rows, as (len(rows), top_n) arrays.
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        scores = self.scores_batch(rows, metric)
+        ranked = scores.astype(np.float64) + self.tie_break
+        ranked[np.arange(len(rows)), rows] = -np.inf
+
+        top_n = min(top_n, ranked.shape[1] - 1)
+        if top_n <= 0:
+            return np.empty((len(rows), 0), dtype=np.int64), np.empty((len(rows), 0), dtype=np.float32)
+        top = np.argpartition(-ranked, top_n - 1, axis=1)[:, :top_n]
+        order = np.argsort(-np.take_along_axis(ranked, top, axis=1), axis=1, kind='stable')
+        top = np.take_along_axis(top, order, axis=1)
+        return top, np.take_along_axis(scores, top, axis=1)
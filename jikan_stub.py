@@ -0,0 +1,81 @@
+"""
+Local stand-in for the Jikan API, used by the poster fetcher tests and the
+coalescing load test. Serves /v4/anime/<id> on an ephemeral port.
+"""
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubJikan:
+    """
+    /anime/<id> -> 200 with poster JSON, except ids in `missing` (404) and
+    ids in `throttle` which answer 429 for their first N requests.
+    """
+    def __init__(self, missing=(), throttle=None, delay=0.0):
+        self.missing = set(missing)
+        self.throttle = dict(throttle or {})
+        self.delay = delay
+        self.arrivals = []
+        self.paths = []
+        self.lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with stub.lock:
+                    stub.arrivals.append(time.monotonic())
+                    stub.paths.append(self.path)
+                if stub.delay:
+                    time.sleep(stub.delay)
+                match = re.match(r'^/v4/anime/(\d+)$', self.path)
+                if not match:
+                    return self._reply(404, {})
+                anime_id = int(match.group(1))
+                with stub.lock:
+                    throttled = stub.throttle.get(anime_id, 0) > 0
+                    if throttled:
+                        stub.throttle[anime_id] -= 1
+                if throttled:
+                    return self._reply(429, {}, {'Retry-After': '0.2'})
+                if anime_id in stub.missing:
+                    return self._reply(404, {})
+                return self._reply(200, {"data": {
+                    "mal_id": anime_id,
+                    "title": f"Anime {anime_id}",
+                    "images": {"jpg": {"large_image_url": f"http://img/{anime_id}.jpg"}},
+                }})
+
+            def _reply(self, status, body, headers=None):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}/v4"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def max_in_window(self, window=1.0):
+        times = sorted(self.arrivals)
+        best, lo = 0, 0
+        for hi, t in enumerate(times):
+            while t - times[lo] >= window:
+                lo += 1
+            best = max(best, hi - lo + 1)
+        return best
@@ -0,0 +1,216 @@
+"""
+In-process metrics: timing spans, counters and gauges.
+Spans feed Prometheus-style histograms (plus a small window of recent
+samples for percentiles in the debug panel). Gauges that are expensive or
+owned elsewhere (cache hit rates, memory per component) are pulled from
+registered collectors at export time. Export with to_prometheus(), or
+write_textfile() for the node_exporter textfile collector.
+
+    with REGISTRY.span('recommender_stage', stage='title_lookup'):
+        ...
+    REGISTRY.inc('recommender_fallback_total', reason='not_in_matrix')
+"""
+import collections
+import contextlib
+import os
+import threading
+import time
+
+import numpy as np
+
+# Latency buckets in seconds (100µs .. 30s)
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if isinstance(value, (int, np.integer)) and not isinstance(value, bool):
+        return str(int(value))
+    return repr(float(value))
+
+
+def _label_text(key):
+    return ','.join(f'{k}={v}' for k, v in key)
+
+
+class _Histogram:
+    def __init__(self, buckets, window):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = collections.deque(maxlen=window)
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+
+class Metrics:
+    def __init__(self, buckets=DEFAULT_BUCKETS, window=1024):
+        self.buckets = tuple(buckets)
+        self.window = window
+        self._lock = threading.Lock()
+        self._counters = {}   # name -> {label key: value}
+        self._gauges = {}     # name -> {label key: value}
+        self._histograms = {} # name -> {label key: _Histogram}
+        self._help = {}
+        self._collectors = []
+
+    def describe(self, name, text):
+        self._help[name] = text
+
+    # --- Recording ---
+    def inc(self, name, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def set_gauge(self, name, value, **labels):
+        with self._lock:
+            self._gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    def observe(self, name, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(self.buckets, self.window)
+            histogram.observe(value)
+
+    @contextlib.contextmanager
+    def span(self, name, **labels):
+        """
+        Time the block into the `<name>_seconds` histogram. Exceptions are
+        recorded too (with error="<Type>") and re-raised.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.observe(name + '_seconds', time.perf_counter() - start, error=type(e).__name__, **labels)
+            raise
+        self.observe(name + '_seconds', time.perf_counter() - start, **labels)
+
+    def register_collector(self, collector):
+        """
+        collector() -> iterable of (name, labels dict, value), read as gauges
+        on every export. A failing collector is skipped, not fatal.
+        """
+        with self._lock:
+            self._collectors.append(collector)
+
+    # --- Reading ---
+    def _collected(self):
+        with self._lock:
+            collectors = list(self._collectors)
+        gauges = {}
+        for collector in collectors:
+            try:
+                for name, labels, value in collector():
+                    gauges.setdefault(name, {})[_label_key(labels)] = value
+            except Exception:
+                self.inc('metrics_collector_errors_total')
+        return gauges
+
+    def snapshot(self):
+        """
+        Plain dict view: counters, gauges and per-span count/mean/p50/p95/p99
+        (percentiles over the recent window, in ms). Series are keyed by
+        "label=value,..." strings.
+        """
+        collected = self._collected()
+        with self._lock:
+            counters = {name: {_label_text(key): value for key, value in series.items()}
+                        for name, series in self._counters.items()}
+            gauges = {name: {_label_text(key): value for key, value in series.items()}
+                      for name, series in self._gauges.items()}
+            spans = {}
+            for name, series in self._histograms.items():
+                for key, histogram in series.items():
+                    recent = np.asarray(histogram.recent) * 1000
+                    p50, p95, p99 = np.percentile(recent, [50, 95, 99]) if recent.size else (0.0, 0.0, 0.0)
+                    spans.setdefault(name, {})[_label_text(key)] = {
+                        "count": histogram.count,
+                        "mean_ms": histogram.sum / histogram.count * 1000 if histogram.count else 0.0,
+                        "p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99),
+                    }
+        for name, series in collected.items():
+            gauges.setdefault(name, {}).update((_label_text(key), value) for key, value in series.items())
+        return {"counters": counters, "gauges": gauges, "spans": spans}
+
+    def to_prometheus(self):
+        """
+        Prometheus text exposition format (version 0.0.4).
+        """
+        collected = self._collected()
+        lines = []
+        with self._lock:
+            gauges = {name: dict(series) for name, series in self._gauges.items()}
+            for name, series in collected.items():
+                gauges.setdefault(name, {}).update(series)
+
+            for kind, families in (('counter', self._counters), ('gauge', gauges)):
+                for name in sorted(families):
+                    if name in self._help:
+                        lines.append(f"# HELP {name} {self._help[name]}")
+                    lines.append(f"# TYPE {name} {kind}")
+                    for key, value in sorted(families[name].items()):
+                        lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+
+            for name in sorted(self._histograms):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, histogram in sorted(self._histograms[name].items()):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(key, [('le', f'{bound:g}')])} {cumulative}")
+                    lines.append(f"{name}_bucket{_format_labels(key, [('le', '+Inf')])} {histogram.count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {histogram.sum:.6f}")
+                    lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        """
+        Atomically write the exposition to path (textfile collector format).
+        """
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+
+# Process-wide default registry
+REGISTRY = Metrics()
+REGISTRY.describe('recommender_stage_seconds', "Time spent per recommender stage.")
+REGISTRY.describe('recommender_requests_total', "Recommendation requests by serving path.")
+REGISTRY.describe('recommender_fallback_total', "Collaborative -> content fallbacks by reason.")
+REGISTRY.describe('recommender_component_bytes', "Memory held per model component.")
+REGISTRY.describe('poster_fetch_seconds', "Time to resolve a batch of posters.")
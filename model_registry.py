@@ -0,0 +1,196 @@
+"""
+Versioned model registry with zero-downtime hot-swap.
+The next AnimeRecommendationSystem is built in a background thread (see
+model_warmup.BackgroundBuild) while sessions keep reading the current one;
+when the build finishes the reference is swapped in a single assignment, so
+readers see either the old model or the new one, never a partial build. The
+replaced version is kept for rollback.
+
+At most two versions are resident: starting a build releases the rollback
+version first, so the only states are current + building and current +
+previous. A request that already holds a model finishes on it.
+"""
+import threading
+import time
+
+from metrics import REGISTRY
+from model_warmup import BackgroundBuild
+
+
+class ModelVersion:
+    def __init__(self, number, system, build, signature=None):
+        self.number = number
+        self.system = system
+        self.build = build
+        self.signature = signature # data signature it was built from
+        self.ready_at = time.time()
+
+    def info(self):
+        timings = self.build.timings()
+        return {"version": self.number, "ready_at": self.ready_at, "build_seconds": timings["build"]}
+
+
+class ModelRegistry:
+    def __init__(self, build_fn, signature_fn=None, metrics=None, on_swap=None):
+        """
+        build_fn(progress) returns a new AnimeRecommendationSystem, or None
+        when there is no data. signature_fn() returns something comparable
+        (e.g. data file mtimes) that changes when a rebuild is due.
+        on_swap(current, previous) is called after each swap with the new
+        ModelVersion and the one it replaced (None on the first build), e.g.
+        to delete on-disk artifacts no resident version uses any more.
+        """
+        self.build_fn = build_fn
+        self.signature_fn = signature_fn
+        self.on_swap = on_swap
+        self.metrics = metrics or REGISTRY
+        self._lock = threading.Lock()
+        self._current = None
+        self._previous = None
+        self._building = None
+        self._next_number = 1
+        self.first_build = None # startup build, for time-to-interactive
+        self.pinned = False     # set by rollback(): no automatic rebuilds
+        self.last_error = None
+        self._attempted_signature = None # of the last build started
+
+    def current(self):
+        """
+        The serving model, or None before the first build completes.
+        Lock-free: sessions read one attribute.
+        """
+        version = self._current
+        return version.system if version is not None else None
+
+    @property
+    def current_version(self):
+        return self._current
+
+    @property
+    def previous_version(self):
+        return self._previous
+
+    @property
+    def building(self):
+        """
+        The in-flight BackgroundBuild, or None.
+        """
+        build = self._building
+        return build if build is not None and not build.done else None
+
+    def build_next(self):
+        """
+        Start building the next version in the background and return its
+        BackgroundBuild (the running one if a build is already in flight).
+        The build's result is the new version number, not the model, so
+        finished builds never keep a model alive.
+        """
+        with self._lock:
+            if self.building is not None:
+                return self._building
+            self.pinned = False
+            # Release the rollback version before allocating a new one
+            self._previous = None
+            number = self._next_number
+            self._next_number += 1
+            signature = self.signature_fn() if self.signature_fn else None
+            self._attempted_signature = signature
+            self._building = BackgroundBuild(lambda progress: self._build(number, signature, progress),
+                                             name=f'model-v{number}')
+            if self.first_build is None:
+                self.first_build = self._building
+            return self._building
+
+    def _build(self, number, signature, progress):
+        try:
+            system = self.build_fn(progress)
+        except Exception as e:
+            self.last_error = e
+            self.metrics.inc('model_registry_builds_total', outcome='error')
+            raise
+        if system is None:
+            self.metrics.inc('model_registry_builds_total', outcome='no_data')
+            return None
+        with self._lock:
+            self._previous = self._current
+            self._current = ModelVersion(number, system, self._building, signature)
+            current, previous = self._current, self._previous
+        self.last_error = None
+        self.metrics.inc('model_registry_builds_total', outcome='swapped')
+        if self.on_swap is not None:
+            self.on_swap(current, previous)
+        return number
+
+    def refresh_if_stale(self):
+        """
+        Start a build when the data signature differs from the current
+        version's and nothing is building. Returns the build or None.
+        With no version yet, retries a failed first build, or one that found
+        no data once the data changes, so fixing the files recovers.
+        Does nothing after a rollback until build_next() is called.
+        """
+        if self.pinned or self.building is not None:
+            return None
+        version = self._current
+        if version is None:
+            if self._building is None: # build_next() never called
+                return None
+            if self.last_error is None and (self.signature_fn is None
+                                            or self._attempted_signature == self.signature_fn()):
+                return None
+            return self.build_next()
+        if self.signature_fn is None or version.signature == self.signature_fn():
+            return None
+        return self.build_next()
+
+    def wait(self, timeout=None):
+        """
+        Wait for the in-flight build, if any, and return current(). A failed
+        rebuild leaves the current version serving (see last_error).
+        """
+        build = self._building
+        if build is not None:
+            try:
+                build.wait(timeout)
+            except Exception:
+                pass
+        return self.current()
+
+    def rollback(self):
+        """
+        Swap current and previous, so a second rollback rolls forward again.
+        Returns False when there is no previous version to go back to.
+        Pins the registry so refresh_if_stale() doesn't rebuild straight away.
+        """
+        with self._lock:
+            if self._previous is None:
+                return False
+            self._current, self._previous = self._previous, self._current
+            self.pinned = True
+        self.metrics.inc('model_registry_rollbacks_total')
+        return True
+
+    def versions(self):
+        """
+        One row per resident or building version, for the debug panel.
+        """
+        with self._lock:
+            resident = [(role, version) for role, version in (('current', self._current),
+                                                              ('previous', self._previous)) if version is not None]
+            building = self.building
+            number = self._next_number - 1
+        rows = [dict(version.info(), role=role) for role, version in resident]
+        if building is not None:
+            rows.append({"version": number, "role": "building", "stage": building.stage})
+        return rows
+
+    def metric_samples(self):
+        """
+        Collector for metrics.Metrics.register_collector.
+        """
+        current, previous = self._current, self._previous
+        samples = [("model_registry_resident_versions", {}, sum(v is not None for v in (current, previous)))]
+        if current is not None:
+            samples.append(("model_registry_current_version", {}, current.number))
+            samples += current.system.metric_samples()
+        return samples
@@ -0,0 +1,94 @@
+"""
+Background model warm-up.
+Runs the recommender build in a daemon thread as soon as the process starts,
+recording when each stage begins so the intro screen can show real progress
+and end the moment the model is ready instead of after a fixed delay.
+"""
+import threading
+import time
+
+STAGE_LABELS = {
+    'fingerprint': "Checking data files",
+    'artifact': "Loading saved model",
+    'load': "Loading ratings",
+    'preprocess': "Indexing catalog",
+    'content': "Building content model",
+    'collaborative': "Building collaborative model",
+    'save': "Saving model",
+}
+
+
+class BackgroundBuild:
+    def __init__(self, target, name='model-warmup'):
+        """
+        target(progress) builds and returns the model; progress(stage) marks
+        the start of each stage.
+        """
+        self.target = target
+        self.started = time.perf_counter()
+        self.finished = None
+        self.first_interactive = None
+        self.result = None
+        self.error = None
+        self.stages = [] # (stage, seconds since start)
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            self.result = self.target(self._progress)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.finished = time.perf_counter()
+            self._done.set()
+
+    def _progress(self, stage):
+        with self._lock:
+            self.stages.append((stage, time.perf_counter() - self.started))
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    @property
+    def stage(self):
+        with self._lock:
+            return self.stages[-1][0] if self.stages else None
+
+    def wait(self, timeout=None):
+        """
+        Block until the build finishes; returns the model (None on timeout).
+        Re-raises a build failure.
+        """
+        self._done.wait(timeout)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+    def mark_interactive(self):
+        """
+        Record time-to-first-interactive (first completed render) once.
+        """
+        with self._lock:
+            if self.first_interactive is None:
+                self.first_interactive = time.perf_counter()
+
+    def timings(self):
+        """
+        Per-stage durations and the headline numbers, in seconds.
+        """
+        with self._lock:
+            stages = list(self.stages)
+            end = self.finished
+            interactive = self.first_interactive
+        bounds = [t for _, t in stages[1:]] + [(end - self.started) if end else None]
+        durations = {stage: (stop - start if stop is not None else None)
+                     for (stage, start), stop in zip(stages, bounds)}
+        return {
+            "stages": durations,
+            "build": end - self.started if end else None,
+            "time_to_interactive": interactive - self.started if interactive else None,
+        }
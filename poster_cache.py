@@ -0,0 +1,161 @@
+"""
+Persistent poster metadata cache (SQLite).
+Keyed by anime id, survives restarts and is shared by every process on
+the host. Successful lookups live for `ttl` seconds; not-found answers are
+stored as negative entries for the shorter `negative_ttl` so dead ids are
+not retried on every render (transient failures are not cached). Size is capped with LRU eviction; access times
+for it are buffered and written in batches, so a hit is a single SELECT.
+"""
+import sqlite3
+import threading
+import time
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS posters (
+    key TEXT PRIMARY KEY,
+    image TEXT,
+    title TEXT,
+    mal_id INTEGER,
+    negative INTEGER NOT NULL DEFAULT 0,
+    expires_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS posters_last_access ON posters (last_access);
+"""
+
+
+class PosterCache:
+    def __init__(self, path, ttl=7 * 24 * 3600, negative_ttl=3600, max_entries=20000,
+                 touch_interval=30.0, max_touches=256):
+        """
+        Hit times are written every touch_interval seconds or max_touches
+        hits, whichever comes first, and before any eviction.
+        """
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.touch_interval = touch_interval
+        self.max_touches = max_touches
+        self._touched = {} # key -> last access not yet written
+        self._touched_since = time.monotonic()
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key_for(anime_id=None, name=None):
+        if anime_id is not None and str(anime_id) != 'nan':
+            return f"id:{int(anime_id)}"
+        return f"name:{name}"
+
+    def get(self, key):
+        """
+        Returns (found, data). found=False is a miss; found=True with
+        data=None is a cached failure (negative entry).
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT image, title, mal_id, negative, expires_at FROM posters WHERE key = ?",
+                (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return False, None
+
+            image, title, mal_id, negative, expires_at = row
+            if expires_at <= now:
+                self._conn.execute("DELETE FROM posters WHERE key = ?", (key,))
+                self._conn.commit()
+                self._touched.pop(key, None)
+                self.expired += 1
+                self.misses += 1
+                return False, None
+
+            self._touched[key] = now
+            if (len(self._touched) >= self.max_touches
+                    or time.monotonic() - self._touched_since >= self.touch_interval):
+                self._write_touches()
+                self._conn.commit()
+            if negative:
+                self.negative_hits += 1
+                return True, None
+            self.hits += 1
+            return True, {"image": image, "title": title, "mal_id": mal_id}
+
+    def put(self, key, data):
+        self._store(key, data.get("image"), data.get("title"), data.get("mal_id"), 0, self.ttl)
+
+    def put_negative(self, key):
+        self._store(key, None, None, None, 1, self.negative_ttl)
+
+    def _store(self, key, image, title, mal_id, negative, ttl):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO posters (key, image, title, mal_id, negative, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, image, title, mal_id, negative, now + ttl, now))
+            self._touched.pop(key, None)
+            self._evict()
+            self._conn.commit()
+
+    def _write_touches(self):
+        # Caller holds the lock and commits
+        if self._touched:
+            self._conn.executemany("UPDATE posters SET last_access = ? WHERE key = ?",
+                                   [(at, key) for key, at in self._touched.items()])
+            self._touched = {}
+        self._touched_since = time.monotonic()
+
+    def flush(self):
+        """
+        Write buffered access times now.
+        """
+        with self._lock:
+            self._write_touches()
+            self._conn.commit()
+
+    def _evict(self):
+        # Trim to 90% so eviction runs once per batch of inserts, not per insert
+        size = self._conn.execute("SELECT COUNT(*) FROM posters").fetchone()[0]
+        if size <= self.max_entries:
+            return
+        self._write_touches() # LRU order must see recent hits
+        excess = size - int(self.max_entries * 0.9)
+        self._conn.execute(
+            "DELETE FROM posters WHERE key IN "
+            "(SELECT key FROM posters ORDER BY last_access ASC LIMIT ?)", (excess,))
+        self.evictions += excess
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM posters").fetchone()[0]
+
+    def stats(self):
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            "entries": len(self),
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits + self.negative_hits) / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._write_touches()
+            self._conn.commit()
+            self._conn.close()
@@ -0,0 +1,229 @@
+"""
+Process-wide poster fetch scheduler for the Jikan API.
+One asyncio event loop (in a daemon thread) owns a shared token bucket, so
+every Streamlit session in the process draws from the same request budget.
+HTTP goes through one pooled requests.Session; blocking calls run in a small
+executor while the loop does the scheduling, retries and 429 back-off;
+cache reads and writes (SQLite) go through their own single worker so
+they never block the loop either.
+Identical lookups that overlap in time are coalesced (single-flight): the
+first caller performs the request, everyone else awaits the same task.
+"""
+import asyncio
+import concurrent.futures
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from poster_cache import PosterCache
+
+JIKAN_BASE_URL = "https://api.jikan.moe/v4"
+PLACEHOLDER_IMAGE = "https://upload.wikimedia.org/wikipedia/commons/thumb/6/65/No-Image-Placeholder.svg/330px-No-Image-Placeholder.svg.png"
+_NOT_FOUND = object() # _request: upstream says there is no such anime
+
+
+class TokenBucket:
+    """
+    Async token bucket: `rate` tokens per second, at most `capacity` banked.
+    capacity=1 spaces requests evenly at 1/rate, so no window ever exceeds
+    the budget. Must be used from a single event loop.
+    """
+    def __init__(self, rate, capacity=1, clock=time.monotonic):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.clock = clock
+        self.tokens = float(capacity)
+        self.updated = clock()
+        self.paused_until = 0.0
+        self._lock = None
+
+    def _refill(self, now):
+        start = max(self.updated, self.paused_until)
+        if now > start:
+            self.tokens = min(self.capacity, self.tokens + (now - start) * self.rate)
+        self.updated = max(now, self.updated)
+
+    async def acquire(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock: # FIFO: waiters are served in arrival order
+            while True:
+                now = self.clock()
+                self._refill(now)
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+                await asyncio.sleep(wait)
+
+    def pause(self, seconds):
+        """
+        Stop issuing tokens for `seconds` (upstream said 429) and drop any
+        banked burst so the restart is paced.
+        """
+        self.paused_until = max(self.paused_until, self.clock() + seconds)
+        self.tokens = 0.0
+
+
+class PosterFetcher:
+    def __init__(self, base_url=JIKAN_BASE_URL, rate=3.0, burst=1, max_in_flight=4,
+                 timeout=4, max_retries=3, backoff=2.0, cache=None):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.cache = cache
+        self.bucket = TokenBucket(rate, capacity=burst)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_in_flight)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_in_flight, thread_name_prefix='poster-http')
+        self._cache_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='poster-cache')
+        self._in_flight = {} # lookup key -> asyncio.Task, loop thread only
+
+        self.lookups = 0
+        self.coalesced = 0
+        self.requests = 0
+        self.rate_limited = 0
+        self.failures = 0
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='poster-fetcher', daemon=True)
+        self._thread.start()
+
+    # --- Public (thread-safe, blocking) ---
+    def fetch(self, anime, timeout=None):
+        return self.fetch_many([anime], timeout=timeout)[0]
+
+    def fetch_many(self, animes, timeout=None):
+        """
+        Poster data for a list of anime dicts ('id' and 'name'), in order.
+        Safe to call from any thread; all callers share one rate budget.
+        """
+        future = asyncio.run_coroutine_threadsafe(self._fetch_all(animes), self._loop)
+        return future.result(timeout)
+
+    def stats(self):
+        return {
+            "lookups": self.lookups,
+            "coalesced": self.coalesced,
+            "requests": self.requests,
+            "rate_limited": self.rate_limited,
+            "failures": self.failures,
+        }
+
+    def close(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._executor.shutdown(wait=False)
+        self._cache_executor.shutdown(wait=True)
+        self.session.close()
+
+    # --- Event loop side ---
+    async def _fetch_all(self, animes):
+        return await asyncio.gather(*(self._fetch_one(anime) for anime in animes))
+
+    async def _fetch_one(self, anime):
+        anime_id = anime.get('id')
+        name = anime.get('name')
+        placeholder = {"image": PLACEHOLDER_IMAGE, "title": name, "mal_id": None}
+        key = PosterCache.key_for(anime_id, name)
+        self.lookups += 1
+
+        if self.cache is not None:
+            found, cached = await self._in_cache_thread(self.cache.get, key)
+            if found:
+                return cached if cached else placeholder
+
+        # Single-flight: join an identical lookup that is already running
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._lookup(key, anime_id, name))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # shield: one caller being cancelled must not cancel the shared lookup
+        result = await asyncio.shield(task)
+        return result or placeholder
+
+    async def _lookup(self, key, anime_id, name):
+        result = await self._request(anime_id, name)
+        if result is _NOT_FOUND:
+            if self.cache is not None:
+                await self._in_cache_thread(self.cache.put_negative, key)
+            return None
+        # None is a transient failure (429/5xx/network): retry on a later render
+        if result and self.cache is not None:
+            await self._in_cache_thread(self.cache.put, key, result)
+        return result
+
+    def _in_cache_thread(self, fn, *args):
+        return asyncio.get_running_loop().run_in_executor(self._cache_executor, fn, *args)
+
+    def _url(self, anime_id, name):
+        if anime_id is not None and str(anime_id) != 'nan':
+            return f"{self.base_url}/anime/{int(anime_id)}", None
+        return f"{self.base_url}/anime", {"q": name, "limit": 1}
+
+    def _get(self, url, params):
+        response = self.session.get(url, params=params, timeout=self.timeout)
+        body = response.json() if response.status_code == 200 else None
+        return response.status_code, response.headers.get('Retry-After'), body
+
+    async def _request(self, anime_id, name):
+        url, params = self._url(anime_id, name)
+        loop = asyncio.get_running_loop()
+
+        for attempt in range(self.max_retries + 1):
+            await self.bucket.acquire()
+            self.requests += 1
+            try:
+                status, retry_after, body = await loop.run_in_executor(self._executor, self._get, url, params)
+            except (requests.RequestException, ValueError):
+                await asyncio.sleep(self.backoff * (attempt + 1))
+                continue
+
+            if status == 200:
+                return _parse(body) or _NOT_FOUND
+            if status == 429:
+                # Everyone waits: the budget is shared, so pause the bucket
+                self.rate_limited += 1
+                try:
+                    wait = float(retry_after)
+                except (TypeError, ValueError):
+                    wait = self.backoff * (attempt + 1)
+                self.bucket.pause(wait)
+                continue
+            if status >= 500:
+                await asyncio.sleep(self.backoff * (attempt + 1))
+                continue
+            if status == 404:
+                self.failures += 1
+                return _NOT_FOUND
+            break # other client errors are final for this lookup, but not cached
+
+        self.failures += 1
+        return None
+
+
+def _parse(body):
+    item = body.get('data') if isinstance(body, dict) else None
+    if isinstance(item, list):
+        item = item[0] if item else None
+    if not item:
+        return None
+    try:
+        return {
+            "image": item['images']['jpg']['large_image_url'],
+            "title": item['title'],
+            "mal_id": item['mal_id']
+        }
+    except (KeyError, TypeError):
+        return None
@@ -0,0 +1,355 @@
+"""
+Standalone HTTP JSON API around AnimeRecommendationSystem.
+One read-only model (memory-mapped artifact) is shared by a fixed pool of
+worker threads, so other services can query it without going through the
+Streamlit UI.
+
+    python recommender_service.py --port 8600 --workers 8
+    python recommender_service.py --port 8600 --processes 4   # pre-fork, shared model
+
+Endpoints (GET unless noted; top_n defaults to 10, max 100):
+    /similar?title=Naruto[&engine=knn|mf|hybrid]  similar titles + model used
+                                            (hybrid adds score + score_breakdown)
+    /category?genre=Action[&genre=..][&sort=rating|members][&match=all|any]
+    /top                                    most popular titles
+    /search?q=naru                          fuzzy title search
+    POST /batch {"anime_ids": [...], "top_n": 10, "engine": "knn|mf|hybrid"}
+    /healthz, /metrics (Prometheus text)
+/similar, /category and /top also take filters, applied inside the top-K:
+    type=Movie[&type=TV], min_rating/max_rating, min_episodes/max_episodes,
+    min_members/max_members
+"""
+import concurrent.futures
+import json
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from anime_upgrade import AnimeRecommendationSystem
+from catalog_filter import FILTER_KEYS
+from metrics import REGISTRY
+
+MAX_TOP_N = 100
+MAX_BATCH = 1000
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def _clean(results):
+    # NaN ratings -> null so responses stay strict JSON
+    return [{key: (None if isinstance(value, float) and math.isnan(value) else value)
+             for key, value in item.items()} for item in results]
+
+
+def _top_n(params):
+    try:
+        top_n = int(params.get('top_n', ['10'])[0])
+    except ValueError:
+        raise BadRequest("top_n must be an integer")
+    if not 1 <= top_n <= MAX_TOP_N:
+        raise BadRequest(f"top_n must be between 1 and {MAX_TOP_N}")
+    return top_n
+
+
+def _filters(params):
+    filters = {}
+    for key in FILTER_KEYS:
+        values = params.get(key)
+        if not values:
+            continue
+        if key == 'type':
+            filters[key] = values
+            continue
+        try:
+            filters[key] = float(values[0])
+        except ValueError:
+            raise BadRequest(f"{key} must be a number")
+    return filters or None
+
+
+class PooledHTTPServer(HTTPServer):
+    """
+    HTTPServer that hands each connection to a fixed-size thread pool
+    instead of spawning a thread per request (ThreadingMixIn).
+    """
+    def __init__(self, address, handler, workers=8, bind_and_activate=True):
+        super().__init__(address, handler, bind_and_activate)
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix='service')
+
+    def process_request(self, request, client_address):
+        self._pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._pool.shutdown(wait=True)
+
+
+class RecommenderService:
+    def __init__(self, system, host='127.0.0.1', port=0, workers=8, metrics=None, sock=None):
+        """
+        sock: an already listening socket to accept on (pre-fork workers
+        share the parent's); otherwise binds host:port.
+        """
+        self.system = system
+        self.metrics = metrics or REGISTRY
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            timeout = 30 # seconds a client may hold a worker idle
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                self._dispatch('GET')
+
+            def do_POST(self):
+                self._dispatch('POST')
+
+            def _dispatch(self, method):
+                url = urlsplit(self.path)
+                route = service.routes.get((method, url.path))
+                endpoint = url.path.strip('/') if route else 'unknown'
+                start = time.perf_counter()
+                try:
+                    if route is None:
+                        status, body = 404, {"error": f"no route for {method} {url.path}"}
+                    else:
+                        status, body = 200, route(parse_qs(url.query), self._json_body() if method == 'POST' else None)
+                except BadRequest as e:
+                    status, body = 400, {"error": str(e)}
+                except Exception as e:
+                    status, body = 500, {"error": type(e).__name__}
+                service.metrics.observe('service_request_seconds', time.perf_counter() - start, endpoint=endpoint)
+                service.metrics.inc('service_requests_total', endpoint=endpoint, status=status)
+                self._reply(status, body)
+
+            def _json_body(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                try:
+                    return json.loads(self.rfile.read(length) or b'{}')
+                except ValueError:
+                    raise BadRequest("body must be JSON")
+
+            def _reply(self, status, body):
+                if isinstance(body, str):
+                    payload, content_type = body.encode(), 'text/plain; version=0.0.4'
+                else:
+                    payload, content_type = json.dumps(body).encode(), 'application/json'
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        self.routes = {
+            ('GET', '/similar'): self.similar,
+            ('GET', '/category'): self.category,
+            ('GET', '/top'): self.top,
+            ('GET', '/search'): self.search,
+            ('POST', '/batch'): self.batch,
+            ('GET', '/healthz'): self.health,
+            ('GET', '/metrics'): self.prometheus,
+        }
+        if sock is None:
+            self.server = PooledHTTPServer((host, port), Handler, workers=workers)
+        else:
+            self.server = PooledHTTPServer(sock.getsockname(), Handler, workers=workers, bind_and_activate=False)
+            self.server.socket.close()
+            self.server.socket = sock
+        host, port = self.server.server_address[:2]
+        self.base_url = f"http://{host}:{port}"
+        self.thread = None
+
+    # --- Endpoints: (query params, JSON body) -> response body ---
+    def similar(self, params, body):
+        title = params.get('title', [''])[0]
+        if not title:
+            raise BadRequest("title is required")
+        engine = params.get('engine', [None])[0]
+        if engine not in (None, 'knn', 'mf', 'hybrid'):
+            raise BadRequest("engine must be knn, mf or hybrid")
+        results, model = self.system.get_recommendations(title, top_n=_top_n(params), engine=engine,
+                                                         filters=_filters(params))
+        return {"model": model, "results": _clean(results)}
+
+    def category(self, params, body):
+        genres = params.get('genre', [])
+        if not genres:
+            raise BadRequest("genre is required")
+        sort = params.get('sort', ['rating'])[0]
+        match = params.get('match', ['all'])[0]
+        if sort not in ('rating', 'members') or match not in ('all', 'any'):
+            raise BadRequest("sort must be rating|members, match all|any")
+        results = self.system.get_category_recommendations(
+            genres if len(genres) > 1 else genres[0], top_n=_top_n(params), sort_by=sort, match=match,
+            filters=_filters(params))
+        return {"results": _clean(results)}
+
+    def top(self, params, body):
+        return {"results": _clean(self.system.get_top_animes(top_n=_top_n(params), filters=_filters(params)))}
+
+    def search(self, params, body):
+        query = params.get('q', [''])[0]
+        return {"results": _clean(self.system.search_titles(query, limit=_top_n(params)))}
+
+    def batch(self, params, body):
+        anime_ids = body.get('anime_ids') if isinstance(body, dict) else None
+        if not isinstance(anime_ids, list) or not all(isinstance(i, int) for i in anime_ids):
+            raise BadRequest("anime_ids must be a list of integers")
+        if len(anime_ids) > MAX_BATCH:
+            raise BadRequest(f"at most {MAX_BATCH} anime_ids per batch")
+        top_n = _top_n({'top_n': [str(body.get('top_n', 10))]})
+        engine = body.get('engine')
+        if engine not in (None, 'knn', 'mf', 'hybrid'):
+            raise BadRequest("engine must be knn, mf or hybrid")
+        results = self.system.get_recommendations_batch(anime_ids, top_n=top_n, engine=engine)
+        return {"results": [{"anime_id": anime_id, "model": model, "results": _clean(recs)}
+                            for anime_id, (recs, model) in zip(anime_ids, results)]}
+
+    def health(self, params, body):
+        return {"status": "ok", "titles": len(self.system.catalog_columns.get('name', ()))}
+
+    def prometheus(self, params, body):
+        return self.metrics.to_prometheus()
+
+    # --- Lifecycle ---
+    def start(self):
+        """
+        Serve in a background thread; returns self.
+        """
+        self.thread = threading.Thread(target=self.server.serve_forever, name='service-accept', daemon=True)
+        self.thread.start()
+        return self
+
+    def serve_forever(self):
+        self.server.serve_forever()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def serve_prefork(system, host='127.0.0.1', port=0, processes=4, workers=8, ready=None):
+    """
+    Pre-fork serving: the parent binds one listening socket, then forks
+    `processes` workers that all accept on it, so requests spread across
+    cores instead of one GIL. Call with a memory-mapped system (load() with
+    mmap=True): the big arrays are file-backed pages shared through the page
+    cache, and the rest of the parent's heap is shared copy-on-write.
+    Crashed workers are replaced. Blocks until SIGINT/SIGTERM.
+    ready(base_url, pids) is called once all workers are forked.
+    """
+    import gc
+    import signal
+    import socket
+
+    sock = socket.create_server((host, port), backlog=1024)
+    host, port = sock.getsockname()[:2]
+
+    # Keep the collector from touching (and un-sharing) every inherited object
+    gc.collect()
+    gc.freeze()
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            code = 0
+            try:
+                RecommenderService(system, workers=workers, sock=sock).serve_forever()
+            except BaseException:
+                code = 1
+            os._exit(code)
+        return pid
+
+    children = {spawn() for _ in range(processes)}
+    stopping = []
+
+    def stop(signum, frame):
+        stopping.append(signum)
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    previous = {sig: signal.signal(sig, stop) for sig in (signal.SIGINT, signal.SIGTERM)}
+    if ready is not None:
+        ready(f"http://{host}:{port}", sorted(children))
+    try:
+        while children:
+            try:
+                pid, _ = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            children.discard(pid)
+            if not stopping:
+                time.sleep(0.5) # don't spin if workers die at start-up
+                children.add(spawn())
+    finally:
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+        sock.close()
+
+
+def main():
+    import argparse
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Serve recommendations over HTTP/JSON.")
+    parser.add_argument("--anime", default=os.path.join(here, "data", "anime.csv"))
+    parser.add_argument("--ratings", default=os.path.join(here, "rating.csv"))
+    # Not artifacts/recommender: the app keeps versioned v<N> builds there
+    parser.add_argument("--artifacts", default=os.path.join(here, "artifacts", "service"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--workers", type=int, default=8, help="threads per process")
+    parser.add_argument("--processes", type=int, default=1, help="pre-forked worker processes sharing the model")
+    parser.add_argument("--neighbor-k", type=int, help="precompute a top-K neighbor table (O(K) similar queries)")
+    args = parser.parse_args()
+
+    system = AnimeRecommendationSystem.load_or_build(
+        args.anime, args.ratings if os.path.exists(args.ratings) else None, artifact_dir=args.artifacts,
+        load_options={"streaming": True, "memory_budget_mb": 256}, neighbor_k=args.neighbor_k)
+    if args.processes > 1 and not system.memory_mapped:
+        # Just rebuilt in-process: reopen so the big arrays are file-backed
+        system = AnimeRecommendationSystem.load(system.artifact_dir, mmap=True)
+    system.metrics.register_collector(system.metric_samples)
+
+    if args.processes > 1:
+        def ready(base_url, pids):
+            print(f"Serving on {base_url} with {args.processes} processes x {args.workers} workers "
+                  f"(pids {' '.join(map(str, pids))})", flush=True)
+
+        serve_prefork(system, args.host, args.port, args.processes, args.workers, ready=ready)
+        return
+
+    service = RecommenderService(system, args.host, args.port, args.workers)
+    print(f"Serving on {service.base_url} with {args.workers} workers", flush=True)
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Static hero background assets.
+The hero image is resized/recompressed once into per-viewport variants under
+static/hero/ and referenced by URL, instead of inlining ~600 KB of base64
+CSS into every Streamlit rerun.
+"""
+import base64
+import os
+
+HERO_WIDTHS = (480, 768, 1280)
+STATIC_URL_PREFIX = "app/static"
+
+
+def build_hero_variants(src_path, out_dir, widths=HERO_WIDTHS, quality=78):
+    """
+    Write hero_<w>.jpg for each width (never upscaled) and return a list of
+    (width, file name), smallest first. Up-to-date files are reused.
+    """
+    from PIL import Image
+
+    os.makedirs(out_dir, exist_ok=True)
+    src_mtime = os.path.getmtime(src_path)
+    variants = []
+    with Image.open(src_path) as source:
+        source = source.convert('RGB')
+        for width in sorted({min(w, source.width) for w in widths}):
+            name = f"hero_{width}.jpg"
+            path = os.path.join(out_dir, name)
+            if not os.path.exists(path) or os.path.getmtime(path) < src_mtime:
+                height = round(source.height * width / source.width)
+                image = source if width == source.width else source.resize((width, height), Image.LANCZOS)
+                tmp_path = path + '.tmp'
+                image.save(tmp_path, 'JPEG', quality=quality, optimize=True, progressive=True)
+                os.replace(tmp_path, path)
+            variants.append((width, name))
+    return variants
+
+
+def hero_css(variants, url_prefix=STATIC_URL_PREFIX + "/hero"):
+    """
+    CSS picking the smallest variant that covers the viewport width.
+    """
+    rules = []
+    for i, (width, name) in enumerate(variants):
+        rule = f'.hero-bg {{ background-image: url("{url_prefix}/{name}"); }}'
+        if i > 0:
+            # Switch up once the previous variant would be stretched
+            rule = f'@media (min-width: {variants[i - 1][0] + 1}px) {{ {rule} }}'
+        rules.append(rule)
+    rules.append('.hero-bg { background-size: cover; background-position: center; opacity: 1.0; }')
+    return "<style>\n" + "\n".join(rules) + "\n</style>"
+
+
+def inline_hero_css(src_path):
+    """
+    Fallback when variants can't be built: base64 data URI (large payload).
+    """
+    with open(src_path, 'rb') as f:
+        encoded = base64.b64encode(f.read()).decode()
+    return f'''
+    <style>
+    .hero-bg {{
+        background-image: url("data:image/jpg;base64,{encoded}");
+        background-size: cover;
+        background-position: center;
+        opacity: 1.0;
+    }}
+    </style>
+    '''
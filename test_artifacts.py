@@ -0,0 +1,170 @@
+"""
+save() / load() round trips and load_or_build() reuse of the artifact.
+"""
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from anime_upgrade import AnimeRecommendationSystem
+from conftest import synthetic_ratings
+
+N_TITLES = 200
+
+
+@pytest.fixture
+def sources(make_catalog, tmp_path):
+    """
+    (anime_path, rating_path); users have > 50 ratings so load_data keeps them.
+    """
+    anime_path = make_catalog(N_TITLES)
+    anime_ids = AnimeRecommendationSystem()
+    anime_ids.load_data(anime_path)
+    rating_path = tmp_path / 'rating.csv'
+    synthetic_ratings(anime_ids.anime_df['anime_id'].to_numpy()[:150], n_users=40, per_user=80).to_csv(
+        rating_path, index=False)
+    return anime_path, str(rating_path)
+
+
+def test_query_time_settings_apply_on_the_fast_path(sources, tmp_path):
+    artifact_dir = str(tmp_path / 'artifact')
+    built = AnimeRecommendationSystem.load_or_build(*sources, artifact_dir=artifact_dir, embedding_rank=8)
+    assert built.collaborative_engine == 'knn' and not built.memory_mapped
+
+    loaded = AnimeRecommendationSystem.load_or_build(*sources, artifact_dir=artifact_dir, embedding_rank=8,
+                                                     collaborative_engine='mf')
+    assert loaded.memory_mapped # reused, not rebuilt
+    assert loaded.collaborative_engine == 'mf'
+
+    # A build-time setting that differs from the manifest forces a rebuild
+    rebuilt = AnimeRecommendationSystem.load_or_build(*sources, artifact_dir=artifact_dir, embedding_rank=4,
+                                                      collaborative_engine='mf')
+    assert not rebuilt.memory_mapped
+    assert rebuilt.item_embeddings.vectors.shape[1] == 4
+    title = rebuilt.catalog_columns['name'][0]
+    assert rebuilt.get_recommendations(title, top_n=5) == rebuilt.get_recommendations(title, top_n=5, engine='mf')
+
+
+def test_hybrid_weights_are_not_persisted(sources, tmp_path):
+    artifact_dir = str(tmp_path / 'artifact')
+    AnimeRecommendationSystem.load_or_build(*sources, artifact_dir=artifact_dir,
+                                            hybrid_weights={'popularity': 1.0})
+    weights = {'collaborative': 0.0, 'content': 1.0, 'popularity': 0.0}
+    loaded = AnimeRecommendationSystem.load_or_build(*sources, artifact_dir=artifact_dir, hybrid_weights=weights)
+    assert loaded.memory_mapped and loaded.hybrid_weights == weights
+    assert AnimeRecommendationSystem.load(artifact_dir).hybrid_weights is None
+
+    results, _ = loaded.get_hybrid_recommendations(loaded.catalog_columns['name'][0], top_n=5)
+    assert all(r['score_breakdown']['collaborative'] == 0 for r in results)
+
+
+def test_versioned_rebuild_leaves_the_serving_version_in_place(sources, tmp_path):
+    anime_path, rating_path = sources
+    root = str(tmp_path / 'recommender')
+    first = AnimeRecommendationSystem.load_or_build(anime_path, rating_path, artifact_dir=root, versioned=True)
+    assert first.artifact_dir == str(tmp_path / 'recommender' / 'v1')
+    serving = AnimeRecommendationSystem.load_or_build(anime_path, rating_path, artifact_dir=root, versioned=True)
+    assert serving.memory_mapped and serving.artifact_dir == first.artifact_dir
+
+    # New data: the next version goes to its own directory, v1 is untouched
+    with open(rating_path, 'a') as f:
+        f.write('1,%d,7\n' % serving.catalog_columns['anime_id'][-1])
+    for number in (2, 3):
+        rebuilt = AnimeRecommendationSystem.load_or_build(anime_path, rating_path, artifact_dir=root,
+                                                          versioned=True, embedding_rank=number)
+        assert rebuilt.artifact_dir == str(tmp_path / 'recommender' / f'v{number}')
+    assert [number for number, _ in AnimeRecommendationSystem.artifact_versions(root)] == [1, 2, 3]
+    title = serving.catalog_columns['name'][0]
+    assert serving.get_recommendations(title) # still readable
+
+    # Only versions older than the previous one are deleted
+    AnimeRecommendationSystem.prune_artifacts(root, str(tmp_path / 'recommender' / 'v2'))
+    assert [number for number, _ in AnimeRecommendationSystem.artifact_versions(root)] == [2, 3]
+    newest = AnimeRecommendationSystem.load_or_build(anime_path, rating_path, artifact_dir=root,
+                                                     versioned=True, embedding_rank=3)
+    assert newest.memory_mapped and newest.artifact_dir.endswith('v3')
+
+
+def test_flat_build_never_replaces_a_versioned_root(sources, tmp_path):
+    root = str(tmp_path / 'recommender')
+    serving = AnimeRecommendationSystem.load_or_build(*sources, artifact_dir=root, versioned=True)
+    with pytest.raises(FileExistsError):
+        AnimeRecommendationSystem.load_or_build(*sources, artifact_dir=root, neighbor_k=5)
+    assert os.listdir(root) == ['v1'] # no temporary directories left either
+    assert serving.get_recommendations(serving.catalog_columns['name'][0])
+
+
+@pytest.mark.parametrize('mmap', [True, False])
+def test_save_load_round_trip(sources, tmp_path, mmap):
+    artifact_dir = str(tmp_path / 'artifact')
+    built = AnimeRecommendationSystem.load_or_build(*sources, artifact_dir=artifact_dir, neighbor_k=10,
+                                                    ann_backend='lsh', embedding_rank=8)
+    loaded = AnimeRecommendationSystem.load(artifact_dir, mmap=mmap)
+    assert loaded.memory_mapped == mmap and loaded.artifact_dir == built.artifact_dir
+    assert (loaded.neighbor_k, loaded.ann_backend, loaded.embedding_rank) == (10, 'lsh', 8)
+
+    assert loaded.anime_id_to_index == built.anime_id_to_index
+    assert loaded.user_id_to_index == built.user_id_to_index
+    assert (loaded.anime_matrix != built.anime_matrix).nnz == 0
+    for name in ('neighbor_ids', 'neighbor_scores', 'item_rows'):
+        np.testing.assert_array_equal(getattr(loaded, name), getattr(built, name))
+    np.testing.assert_array_equal(loaded.item_embeddings.vectors, built.item_embeddings.vectors)
+    assert loaded.get_categories() == built.get_categories()
+
+    titles = built.catalog_columns['name'][:200:20]
+    for engine in ('knn', 'mf', 'hybrid'):
+        for title in titles:
+            assert loaded.get_recommendations(title, engine=engine) == built.get_recommendations(title, engine=engine)
+    # top_n past the neighbor table: the ANN index answers
+    assert loaded.get_recommendations(titles[0], top_n=20) == built.get_recommendations(titles[0], top_n=20)
+    assert loaded.recommend_for_user(1) == built.recommend_for_user(1)
+
+
+def test_rebuilds_only_when_the_csvs_change(sources, tmp_path):
+    anime_path, rating_path = sources
+    artifact_dir = str(tmp_path / 'artifact')
+    built = AnimeRecommendationSystem.load_or_build(anime_path, rating_path, artifact_dir=artifact_dir)
+    assert not built.memory_mapped
+
+    # Touched but identical: reused, and the new mtime is recorded
+    stat = os.stat(rating_path)
+    os.utime(rating_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert AnimeRecommendationSystem.load_or_build(anime_path, rating_path, artifact_dir=artifact_dir).memory_mapped
+    manifest = AnimeRecommendationSystem.read_manifest(artifact_dir)
+    assert manifest['fingerprint']['rating']['mtime_ns'] == stat.st_mtime_ns + 10 ** 9
+
+    # New ratings: rebuilt from the CSV and saved over the old artifact
+    new_user = pd.DataFrame({'user_id': 99, 'anime_id': built.catalog_columns['anime_id'][:60], 'rating': 8})
+    new_user.to_csv(rating_path, mode='a', header=False, index=False)
+    rebuilt = AnimeRecommendationSystem.load_or_build(anime_path, rating_path, artifact_dir=artifact_dir)
+    assert not rebuilt.memory_mapped and 99 in rebuilt.user_id_to_index
+    assert 99 in AnimeRecommendationSystem.load(artifact_dir).user_id_to_index
+
+    # Streaming vs prefix loads are different builds
+    assert not AnimeRecommendationSystem.load_or_build(anime_path, rating_path, artifact_dir=artifact_dir,
+                                                       load_options={'streaming': True}).memory_mapped
+
+
+def test_concurrent_saves_leave_one_complete_artifact(sources, tmp_path):
+    artifact_dir = str(tmp_path / 'artifact')
+    system = AnimeRecommendationSystem.load_or_build(*sources, neighbor_k=10)
+    errors = []
+
+    def save():
+        try:
+            for _ in range(5):
+                system.save(artifact_dir)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=save) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert sorted(os.listdir(tmp_path)) == ['artifact', 'rating.csv'] # no temporary directories left
+    loaded = AnimeRecommendationSystem.load(artifact_dir)
+    np.testing.assert_array_equal(loaded.neighbor_ids, system.neighbor_ids)
@@ -0,0 +1,54 @@
+"""
+get_recommendations_batch answers each seed like get_recommendations.
+"""
+import numpy as np
+import pytest
+
+CONFIGS = {
+    'knn': dict(),
+    'neighbor_table': dict(neighbor_k=20),
+    'ann': dict(ann_backend='lsh'),
+    'mf': dict(embedding_rank=8, collaborative_engine='mf'),
+    'hybrid': dict(collaborative_engine='hybrid'),
+}
+
+
+def _seeds(system):
+    # Every 5th title, rated and content-only, that resolves back to its own row
+    names = system.catalog_columns['name']
+    rows = [row for row in range(0, len(names), 5) if system.title_index.lookup(names[row]) == row]
+    return rows, system.catalog_columns['anime_id'][rows].tolist()
+
+
+@pytest.mark.parametrize('config', sorted(CONFIGS))
+def test_batch_matches_single_queries(build_system, config):
+    system = build_system(300, **CONFIGS[config])
+    rows, anime_ids = _seeds(system)
+    batch = system.get_recommendations_batch(anime_ids, top_n=10, block_size=16)
+    models = set()
+    for row, (results, model) in zip(rows, batch):
+        expected, expected_model = system.get_recommendations(system.catalog_columns['name'][row], top_n=10)
+        models.add(model)
+        assert model == expected_model
+        if config == 'knn' and model == 'collaborative':
+            # Blocked float32 matmul vs kneighbors: equal up to near-ties
+            normed = system._normalized_items()[0]
+            idx = system.anime_id_to_index[anime_ids[rows.index(row)]]
+
+            def sims(results):
+                items = [system.anime_id_to_index[r['id']] for r in results]
+                return (normed[items] @ normed[idx].T).toarray().ravel()
+
+            np.testing.assert_allclose(sims(results), sims(expected), atol=1e-6)
+        else:
+            assert [r['id'] for r in results] == [r['id'] for r in expected]
+    assert models == ({'hybrid'} if config == 'hybrid' else {'collaborative', 'content'})
+
+
+def test_batch_engine_overrides_the_default(build_system):
+    system = build_system(300, **CONFIGS['mf'])
+    rows, anime_ids = _seeds(system)
+    batch = system.get_recommendations_batch(anime_ids, top_n=10, engine='knn')
+    for row, (results, _) in zip(rows, batch):
+        expected, _ = system.get_recommendations(system.catalog_columns['name'][row], top_n=10, engine='knn')
+        assert {r['id'] for r in results} == {r['id'] for r in expected}
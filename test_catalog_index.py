@@ -0,0 +1,31 @@
+"""
+Positional catalog index: anime_id -> row lookups and columnar packaging.
+"""
+import math
+
+import numpy as np
+
+
+def test_get_row(tiny_system):
+    assert [tiny_system.get_row(anime_id) for anime_id in (10, 3, 7, 25)] == [0, 1, 2, 4]
+    assert tiny_system.get_row(np.int32(7)) == 2
+    assert tiny_system.get_row(999) is None
+    assert tiny_system.get_row(-1) is None
+    assert tiny_system.get_row(None) is None
+
+
+def test_package_rows_matches_the_dataframe(tiny_system):
+    results = tiny_system._package_rows(np.array([2, 0, 3]))
+    df = tiny_system.anime_df
+    for result, row in zip(results, [2, 0, 3]):
+        assert result['id'] == df['anime_id'][row] and result['name'] == df['name'][row]
+        assert result['genre'] == df['genre'][row] and result['type'] == df['type'][row]
+        assert result['episodes'] == df['episodes'][row]
+        assert type(result['id']) is int and type(result['rating']) is float
+    assert math.isnan(results[0]['rating']) and results[0]['episodes'] == 'Unknown'
+    assert results[1]['rating'] == 8.5 # not 8.5000000001 from float32
+    assert tiny_system._package_rows([]) == []
+
+
+def test_top_animes_by_members(tiny_system):
+    assert [r['name'] for r in tiny_system.get_top_animes(top_n=3)] == ['Beta', 'Alpha', 'Gamma &#039;Slice&#039;']
@@ -0,0 +1,42 @@
+"""
+Matrix-factorization engine: truncated-SVD item embeddings.
+"""
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from embeddings import ItemEmbeddings
+
+
+def test_embeddings_recover_block_structure():
+    # 3 groups of 10 items, each rated only by its own 20 users
+    rng = np.random.default_rng(0)
+    dense = np.zeros((30, 60), dtype=np.float32)
+    for group in range(3):
+        dense[group * 10:(group + 1) * 10, group * 20:(group + 1) * 20] = rng.integers(1, 11, (10, 20))
+    embeddings = ItemEmbeddings(rank=3).fit(csr_matrix(dense))
+    assert embeddings.vectors.shape == (30, 3) and embeddings.components.shape == (3, 60)
+    np.testing.assert_allclose(np.linalg.norm(embeddings.vectors, axis=1), 1, rtol=1e-5)
+
+    for idx in (0, 15, 29):
+        top, scores = embeddings.similar(idx, top_n=9)
+        assert idx not in top.tolist() and np.all(np.diff(scores) <= 0)
+        assert set(top.tolist()) == set(range(idx // 10 * 10, idx // 10 * 10 + 10)) - {idx}
+
+
+def test_rank_is_capped_by_the_matrix():
+    embeddings = ItemEmbeddings(rank=64).fit(csr_matrix(np.eye(5, 8, dtype=np.float32)))
+    assert embeddings.vectors.shape == (5, 4)
+
+
+def test_mf_engine_answers_similar_queries(build_system):
+    system = build_system(300, embedding_rank=8)
+    plain = build_system(300)
+    for row in range(0, 250, 25):
+        title = system.catalog_columns['name'][row]
+        idx = system.anime_id_to_index[system.catalog_columns['anime_id'][row]]
+        results, model = system.get_recommendations(title, top_n=10, engine='mf')
+        assert model == 'collaborative'
+        assert [r['id'] for r in results] == [system.index_to_anime_id[i]
+                                              for i in system.item_embeddings.similar(idx, 10)[0]]
+        # Without embeddings, engine='mf' is the knn engine
+        assert plain.get_recommendations(title, engine='mf') == plain.get_recommendations(title, engine='knn')
@@ -0,0 +1,99 @@
+"""
+Filter pushdown: masks applied inside top-K for every query API.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+
+@pytest.fixture(scope='module')
+def system(build_system):
+    return build_system(400, neighbor_k=10)
+
+
+def _rows(system, results):
+    return [system.get_row(result['id']) for result in results]
+
+
+def _passes(system, rows, kind=None, min_rating=None, max_episodes=None):
+    cols = system.catalog_columns
+    episodes = pd.to_numeric(pd.Series(cols['episodes'][rows]), errors='coerce')
+    return all([
+        kind is None or (cols['type'][rows] == kind).all(),
+        min_rating is None or (cols['rating'][rows] >= min_rating).all(),
+        max_episodes is None or (episodes <= max_episodes).all(),
+    ])
+
+
+def test_mask_compiles_and_caches(system):
+    catalog_filter = system.catalog_filter
+    assert catalog_filter.mask(None) is None
+    assert catalog_filter.mask({'type': None}) is None
+    mask = catalog_filter.mask({'type': 'movie', 'min_rating': 7.5})
+    assert mask is catalog_filter.mask({'min_rating': 7.5, 'type': ['Movie']})
+    expected = (system.catalog_columns['type'] == 'Movie') & (system.catalog_columns['rating'] >= 7.5)
+    assert (mask == expected).all()
+    assert not catalog_filter.mask({'type': 'Unknown type'}).any()
+    with pytest.raises(ValueError):
+        catalog_filter.mask({'min_score': 1})
+
+
+@pytest.mark.parametrize('engine', ['knn', 'hybrid'])
+def test_similar_returns_full_top_n_inside_filter(system, engine):
+    filters = {'type': 'Movie', 'min_rating': 7.5}
+    title = system.catalog_columns['name'][0]
+    results, model = system.get_recommendations(title, top_n=10, engine=engine, filters=filters)
+    rows = _rows(system, results)
+    assert len(results) == 10 and 0 not in rows
+    assert _passes(system, rows, kind='Movie', min_rating=7.5)
+
+    # Same top as an exhaustive search restricted to the filter
+    if engine == 'knn' and model == "collaborative":
+        normed = system._normalized_items()[0].toarray()
+        idx = system.anime_id_to_index[system.catalog_columns['anime_id'][0]]
+        scores = normed @ normed[idx]
+        allowed = system.catalog_filter.mask(filters)[system.item_rows]
+        allowed[idx] = False
+        scores[~allowed] = -np.inf
+        np.testing.assert_allclose(np.sort(scores)[::-1][:10],
+                                   scores[[system.anime_id_to_index[r['id']] for r in results]], atol=1e-6)
+
+
+def test_similar_falls_back_to_content_when_filter_is_narrow(system):
+    # Only a handful of rated TV specials: collaborative can't fill top_n
+    filters = {'type': 'Special', 'max_episodes': 1}
+    allowed = system.catalog_filter.mask(filters)
+    results, model = system.get_recommendations(system.catalog_columns['name'][0], top_n=5, filters=filters)
+    assert len(results) == min(5, int(allowed[1:].sum()))
+    assert _passes(system, _rows(system, results), kind='Special', max_episodes=1)
+
+
+def test_user_category_and_top_filters(system):
+    filters = {'type': 'TV', 'min_rating': 8}
+    results, _ = system.recommend_for_user(1, top_n=8, filters=filters)
+    watched = set(system._user_history(1)[0].tolist())
+    assert len(results) == 8 and not {r['id'] for r in results} & watched
+    assert _passes(system, _rows(system, results), kind='TV', min_rating=8)
+
+    results = system.get_category_recommendations('Action', top_n=12, filters=filters)
+    rows = _rows(system, results)
+    assert len(results) == 12 and _passes(system, rows, kind='TV', min_rating=8)
+    assert all('Action' in system.catalog_columns['genre'][row] for row in rows)
+
+    results = system.get_top_animes(top_n=12, filters=filters)
+    order = system.catalog_orders['members']
+    expected = order[system.catalog_filter.mask(filters)[order]][:12]
+    assert _rows(system, results) == expected.tolist()
+
+
+def test_filter_allowing_every_row_matches_unfiltered(system):
+    allow_all = {'min_members': 0}
+    assert system.catalog_filter.mask(allow_all).all()
+    # Rows 350+ have no ratings, so those seeds take the filtered content path
+    for row in range(0, 400, 4):
+        title = system.catalog_columns['name'][row]
+        for engine in ('knn', 'hybrid'):
+            plain, plain_model = system.get_recommendations(title, top_n=10, engine=engine)
+            filtered, filtered_model = system.get_recommendations(title, top_n=10, engine=engine, filters=allow_all)
+            assert filtered_model == plain_model
+            assert [r['id'] for r in filtered] == [r['id'] for r in plain], title
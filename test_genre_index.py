@@ -0,0 +1,75 @@
+"""
+Genre bitsets: exact genre matching and set similarity.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from genre_index import GenreIndex, split_genres
+
+
+def test_multi_word_genres_stay_whole(tiny_system):
+    assert split_genres('Action, Sci-Fi,  Slice of Life,') == ['Action', 'Sci-Fi', 'Slice of Life']
+    assert split_genres(None) == []
+    index = tiny_system.genre_index
+    assert index.vocabulary == ['Action', 'Comedy', 'Drama', 'Sci-Fi', 'Slice of Life']
+    assert index.resolve(' slice of life ') == 'Slice of Life'
+    assert index.resolve('Slice') is None and index.resolve('Life') is None
+    assert tiny_system.get_categories() == index.vocabulary
+
+
+@pytest.mark.parametrize('metric', ['cosine', 'jaccard'])
+def test_scores_match_set_arithmetic(make_catalog, metric):
+    genres = [split_genres(g) for g in pd.read_csv(make_catalog(300))['genre'].fillna('')]
+    index = GenreIndex([', '.join(g) for g in genres])
+    rows = [0, 7, 42, 299]
+    scores = index.scores_batch(rows, metric=metric)
+    for seed, row_scores in zip(rows, scores):
+        a = set(genres[seed])
+        expected = []
+        for other in genres:
+            b, inter = set(other), len(a & set(other))
+            if metric == 'cosine':
+                expected.append(inter / np.sqrt(len(a) * len(b)) if a and b else 0)
+            else:
+                expected.append(inter / len(a | b) if a | b else 0)
+        np.testing.assert_allclose(row_scores, expected, rtol=1e-6)
+
+
+def test_similar_excludes_seed_and_breaks_ties_by_members(tiny_system):
+    index = tiny_system.genre_index
+    rows, scores = index.similar(0, top_n=4)
+    assert rows.tolist() == [4, 1, 2, 3] # 2 and 3 both score 0: more members first
+    np.testing.assert_allclose(scores, [2 / np.sqrt(6), 1 / np.sqrt(2), 0, 0], rtol=1e-6)
+    assert index.similar(0, top_n=10, metric='jaccard')[0].tolist() == [4, 1, 2, 3]
+    with pytest.raises(ValueError):
+        index.scores(0, metric='euclidean')
+
+
+def test_category_pages(tiny_system):
+    def names(*args, **kwargs):
+        return [r['name'] for r in tiny_system.get_category_recommendations(*args, **kwargs)]
+
+    assert names('action') == ['Alpha', 'Alpha', 'Beta'] # rows 4, 0, 1 by rating
+    assert [r['id'] for r in tiny_system.get_category_recommendations('Action')] == [25, 10, 3]
+    assert [r['id'] for r in tiny_system.get_category_recommendations('Action', sort_by='members')] == [3, 10, 25]
+    assert names('Slice of Life') == ["Gamma &#039;Slice&#039;"]
+    assert names('Slice') == [] and names(['Action', 'Slice']) == []
+    assert [r['id'] for r in tiny_system.get_category_recommendations(['Sci-Fi', 'action'])] == [25, 10]
+    # NaN rating sorts last
+    assert [r['id'] for r in tiny_system.get_category_recommendations(['Drama', 'Comedy'], match='any')] == [25, 3, 7]
+    assert len(tiny_system.get_category_recommendations('Action', top_n=2)) == 2
+
+
+@pytest.mark.parametrize('match', ['all', 'any'])
+@pytest.mark.parametrize('sort_by', ['rating', 'members'])
+def test_postings_match_a_catalog_scan(build_system, match, sort_by):
+    system = build_system(300)
+    genres = system.catalog_columns['genre']
+    order = system.catalog_orders[sort_by]
+    for category in (['Action'], ['Comedy', 'School'], ['Sci-Fi', 'Mecha', 'Space']):
+        has = [set(split_genres(genres[row])) for row in order]
+        test = all if match == 'all' else any
+        expected = [int(row) for row, gs in zip(order, has) if test(g in gs for g in category)][:15]
+        results = system.get_category_recommendations(category, top_n=15, sort_by=sort_by, match=match)
+        assert [system.get_row(r['id']) for r in results] == expected
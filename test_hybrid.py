@@ -0,0 +1,51 @@
+"""
+Hybrid scoring: blend of collaborative, genre and popularity in one pass.
+"""
+import numpy as np
+import pytest
+
+from anime_upgrade import HYBRID_WEIGHTS
+
+
+@pytest.fixture(scope='module')
+def system(build_system):
+    return build_system(300)
+
+
+def _reference(system, row, weights):
+    normed = system._normalized_items()[0].toarray()
+    collaborative = np.zeros(len(system.catalog_columns['anime_id']))
+    idx = system.anime_id_to_index.get(system.catalog_columns['anime_id'][row])
+    if idx is not None:
+        collaborative[system.item_rows] = normed @ normed[idx]
+    return (weights['collaborative'] * collaborative
+            + weights['content'] * system.genre_index.scores(row)
+            + weights['popularity'] * system.popularity_prior)
+
+
+@pytest.mark.parametrize('row', [0, 10, 280]) # 280 has no ratings: collaborative part is 0
+def test_hybrid_matches_reference_blend(system, row):
+    title = system.catalog_columns['name'][row]
+    results, model = system.get_recommendations(title, top_n=10, engine='hybrid')
+    assert model == "hybrid" and len(results) == 10
+
+    expected = _reference(system, row, HYBRID_WEIGHTS)
+    for result in results:
+        result_row = system.get_row(result['id'])
+        assert result_row != row
+        assert result['score'] == pytest.approx(expected[result_row], abs=1e-5)
+        assert sum(result['score_breakdown'].values()) == pytest.approx(result['score'], abs=1e-5)
+    scores = [result['score'] for result in results]
+    assert scores == sorted(scores, reverse=True)
+    expected[row] = -np.inf
+    assert scores[-1] >= np.sort(expected)[-10] - 1e-5
+
+
+def test_hybrid_weights_override(system):
+    title = system.catalog_columns['name'][0]
+    results, _ = system.get_hybrid_recommendations(
+        title, top_n=5, weights={'collaborative': 0, 'content': 0, 'popularity': 1})
+    # Popularity only: the most-watched titles, in order, minus the seed
+    order = [row for row in system.catalog_orders['members'].tolist() if row != 0][:5]
+    assert [system.get_row(result['id']) for result in results] == order
+    assert all(result['score_breakdown']['collaborative'] == 0 for result in results)
@@ -0,0 +1,131 @@
+"""
+add_ratings() against a full rebuild on the concatenated ratings.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from anime_upgrade import AnimeRecommendationSystem
+
+N_TITLES = 400
+NEIGHBOR_K = 10
+
+
+@pytest.fixture(scope='module')
+def catalog(make_catalog):
+    return make_catalog(N_TITLES)
+
+
+def _ratings(anime_ids, n_users, per_user, seed, first_user=1):
+    rng = np.random.default_rng(seed)
+    users = np.repeat(np.arange(first_user, first_user + n_users), per_user)
+    # Two taste groups so neighbors are not pure noise
+    group = users % 2
+    half = len(anime_ids) // 2
+    picks = rng.integers(0, half, len(users)) + group * half
+    return pd.DataFrame({
+        'user_id': users.astype(np.int32),
+        'anime_id': np.asarray(anime_ids)[picks].astype(np.int32),
+        'rating': rng.integers(1, 11, len(users)).astype(np.int8),
+    })
+
+
+def _system(catalog, ratings, **kwargs):
+    system = AnimeRecommendationSystem(neighbor_k=NEIGHBOR_K, **kwargs)
+    system.load_data(catalog)
+    system.preprocess_data()
+    system.rating_df = ratings
+    system.build_models()
+    return system
+
+
+@pytest.fixture(scope='module')
+def datasets(catalog):
+    anime_ids = pd.read_csv(catalog)['anime_id'].to_numpy()
+    base = _ratings(anime_ids[:300], n_users=120, per_user=40, seed=0)
+    delta = pd.concat([
+        _ratings(anime_ids[:300], n_users=20, per_user=15, seed=1, first_user=60),   # existing users
+        _ratings(anime_ids[:300], n_users=10, per_user=15, seed=2, first_user=1000), # new users
+        _ratings(anime_ids[300:], n_users=10, per_user=8, seed=3, first_user=2000),  # new anime
+        pd.DataFrame({'user_id': [5, 6], 'anime_id': [anime_ids[0], 99999999], 'rating': [-1, 7]}),
+    ], ignore_index=True)
+    delta = delta.astype({'user_id': np.int32, 'anime_id': np.int32, 'rating': np.int8})
+    return base, delta
+
+
+def _assert_neighbor_tables_match(incremental, rebuilt):
+    np.testing.assert_allclose(incremental.neighbor_scores, rebuilt.neighbor_scores, atol=1e-5)
+    # Ids must agree wherever the order is not decided by a near-tie. The
+    # last column can tie with the first item outside the table, so skip it.
+    scores = rebuilt.neighbor_scores
+    gaps = np.minimum(-np.diff(scores, axis=1, prepend=np.inf), -np.diff(scores, axis=1, append=-np.inf))
+    decided = gaps > 1e-4
+    decided[:, -1] = False
+    assert (incremental.neighbor_ids[decided] == rebuilt.neighbor_ids[decided]).all()
+
+
+def test_add_ratings_matches_full_rebuild(catalog, datasets):
+    base, delta = datasets
+    incremental = _system(catalog, base)
+    incremental._normalized_items() # cached norms must be patched, not dropped
+    applied = incremental.add_ratings(delta)
+    rebuilt = _system(catalog, pd.concat([base, delta], ignore_index=True)[lambda df: df['rating'] >= 0])
+
+    assert applied == len(delta) - 2 # the -1 rating and the unknown anime are dropped
+    assert incremental.anime_id_to_index == rebuilt.anime_id_to_index
+    assert incremental.user_id_to_index == rebuilt.user_id_to_index
+    assert (incremental.item_rows == rebuilt.item_rows).all()
+    assert (incremental.anime_matrix != rebuilt.anime_matrix).nnz == 0
+    for patched, fresh in zip(incremental._normalized_items(), rebuilt._normalized_items()):
+        assert patched.has_sorted_indices
+        np.testing.assert_allclose(patched.toarray(), fresh.toarray(), atol=1e-6)
+    _assert_neighbor_tables_match(incremental, rebuilt)
+    assert incremental.recommend_for_user(1005) == rebuilt.recommend_for_user(1005) # new user, via the transpose
+    pd.testing.assert_frame_equal(incremental.rating_df.reset_index(drop=True),
+                                  rebuilt.rating_df.reset_index(drop=True))
+
+    # The public path serves the new anime collaboratively
+    new_title = pd.read_csv(catalog)['name'].iloc[350]
+    results, model = incremental.get_recommendations(new_title, top_n=5)
+    assert model == "collaborative" and len(results) == 5
+
+
+def test_add_ratings_in_small_steps(catalog, datasets):
+    base, delta = datasets
+    incremental = _system(catalog, base)
+    for chunk in np.array_split(np.arange(len(delta)), 7):
+        incremental.add_ratings(delta.iloc[chunk])
+    rebuilt = _system(catalog, pd.concat([base, delta], ignore_index=True)[lambda df: df['rating'] >= 0])
+
+    assert (incremental.anime_matrix != rebuilt.anime_matrix).nnz == 0
+    np.testing.assert_allclose(incremental._normalized_items()[1].toarray(),
+                               rebuilt._normalized_items()[1].toarray(), atol=1e-6)
+    _assert_neighbor_tables_match(incremental, rebuilt)
+
+
+@pytest.mark.parametrize('ann_backend', ['lsh', 'ivf'])
+def test_add_ratings_refreshes_ann_and_embeddings(catalog, datasets, ann_backend):
+    base, delta = datasets
+    system = _system(catalog, base, ann_backend=ann_backend, embedding_rank=8)
+    system.add_ratings(delta)
+    n_items, n_users = system.anime_matrix.shape
+
+    assert system.item_embeddings.vectors.shape == (n_items, 8)
+    assert system.item_embeddings.components.shape[1] == n_users
+    idx = n_items - 1 # last appended anime
+    found, scores = system.ann_index.query(system._normalized_items()[0][idx], 5, exclude=idx)
+    assert len(found) > 0 and np.isfinite(scores).all()
+    rows, _ = system.item_embeddings.similar(idx, 5)
+    assert len(rows) == 5
+
+
+def test_add_ratings_on_memory_mapped_artifact(catalog, datasets, tmp_path):
+    base, delta = datasets
+    _system(catalog, base).save(str(tmp_path / 'artifact'))
+    loaded = AnimeRecommendationSystem.load(str(tmp_path / 'artifact'), mmap=True)
+    loaded.add_ratings(delta)
+    rebuilt = _system(catalog, pd.concat([base, delta], ignore_index=True)[lambda df: df['rating'] >= 0])
+
+    assert not loaded.memory_mapped
+    assert (loaded.anime_matrix != rebuilt.anime_matrix).nnz == 0
+    _assert_neighbor_tables_match(loaded, rebuilt)
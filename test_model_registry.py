@@ -0,0 +1,144 @@
+"""
+ModelRegistry hot-swap, rollback and the two-version bound.
+"""
+import threading
+
+from metrics import Metrics
+from model_registry import ModelRegistry
+
+
+class FakeModel:
+    def __init__(self, name):
+        self.name = name
+
+    def metric_samples(self):
+        return []
+
+
+class GatedBuilds:
+    """
+    build_fn whose builds block until released, to observe in-flight state.
+    """
+    def __init__(self):
+        self.count = 0
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def __call__(self, progress):
+        progress('load')
+        self.count += 1
+        name = f'model-{self.count}'
+        self.gate.wait(5)
+        return FakeModel(name)
+
+
+def _registry(builds, signature=None, on_swap=None):
+    return ModelRegistry(builds, signature_fn=signature, metrics=Metrics(), on_swap=on_swap)
+
+
+def test_swap_keeps_serving_current_during_build():
+    builds = GatedBuilds()
+    registry = _registry(builds)
+    assert registry.current() is None
+    registry.build_next().wait(5)
+    first = registry.current()
+    assert first.name == 'model-1'
+
+    builds.gate.clear()
+    build = registry.build_next()
+    assert registry.build_next() is build # one build at a time
+    assert registry.current() is first
+    # Rollback version released while building: current + building only
+    assert registry.previous_version is None
+    assert [row['role'] for row in registry.versions()] == ['current', 'building']
+
+    builds.gate.set()
+    assert build.wait(5) == 2
+    assert registry.current().name == 'model-2'
+    assert registry.previous_version.system is first
+
+
+def test_rollback_and_roll_forward():
+    registry = _registry(GatedBuilds())
+    assert not registry.rollback()
+    registry.build_next().wait(5)
+    registry.build_next().wait(5)
+
+    assert registry.rollback()
+    assert registry.current().name == 'model-1'
+    assert registry.rollback()
+    assert registry.current().name == 'model-2'
+
+
+def test_refresh_if_stale_rebuilds_on_new_signature_unless_pinned():
+    signature = ['a']
+    registry = _registry(GatedBuilds(), signature=lambda: signature[0])
+    registry.build_next().wait(5)
+    assert registry.refresh_if_stale() is None
+
+    signature[0] = 'b'
+    registry.refresh_if_stale().wait(5)
+    assert registry.current_version.number == 2
+    assert registry.refresh_if_stale() is None
+
+    registry.rollback()
+    signature[0] = 'c'
+    assert registry.refresh_if_stale() is None # pinned after rollback
+    assert registry.current_version.number == 1
+
+
+def test_failed_build_keeps_current_version():
+    calls = []
+
+    def build_fn(progress):
+        calls.append(1)
+        if len(calls) == 2:
+            raise RuntimeError("bad data")
+        return FakeModel(f'model-{len(calls)}')
+
+    registry = _registry(build_fn)
+    registry.build_next().wait(5)
+    registry.build_next()
+    assert registry.wait(5).name == 'model-1'
+    assert isinstance(registry.last_error, RuntimeError)
+    assert registry.previous_version is None
+
+
+def test_failed_first_build_is_retried_until_it_recovers():
+    data = {'ok': False}
+
+    def build_fn(progress):
+        if not data['ok']:
+            raise FileNotFoundError("rating.csv")
+        return FakeModel('fixed')
+
+    registry = _registry(build_fn)
+    registry.build_next()
+    assert registry.wait(5) is None and registry.last_error is not None
+    data['ok'] = True
+    registry.refresh_if_stale()
+    assert registry.wait(5).name == 'fixed'
+    assert registry.last_error is None and registry.current_version.number == 2
+    assert registry.refresh_if_stale() is None
+
+
+def test_first_build_without_data_retries_when_the_data_changes():
+    signature = ['none']
+    registry = _registry(lambda progress: FakeModel('m') if signature[0] == 'csv' else None,
+                         signature=lambda: signature[0])
+    registry.build_next()
+    assert registry.wait(5) is None
+    assert registry.refresh_if_stale() is None # same data, no point rebuilding
+    signature[0] = 'csv'
+    registry.refresh_if_stale()
+    assert registry.wait(5).name == 'm'
+
+
+def test_on_swap_sees_new_and_replaced_version():
+    swaps = []
+    registry = _registry(GatedBuilds(), on_swap=lambda current, previous: swaps.append(
+        (current.number, previous.number if previous else None)))
+    registry.build_next().wait(5)
+    registry.build_next().wait(5)
+    registry.rollback()
+    assert swaps == [(1, None), (2, 1)] # rollback is not a swap to a new build
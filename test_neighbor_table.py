@@ -0,0 +1,39 @@
+"""
+Precomputed top-K neighbor table vs exact kneighbors search.
+"""
+import numpy as np
+import pytest
+
+
+@pytest.fixture(scope='module')
+def system(build_system):
+    return build_system(300, neighbor_k=10)
+
+
+def test_table_holds_the_exact_top_k(system):
+    dense = system._normalized_items()[0].toarray().astype(np.float64)
+    sims = dense @ dense.T
+    np.fill_diagonal(sims, -np.inf)
+    assert system.neighbor_ids.shape == (dense.shape[0], 10)
+    assert not (system.neighbor_ids == np.arange(len(dense))[:, None]).any() # never itself
+    np.testing.assert_allclose(system.neighbor_scores, -np.sort(-sims, axis=1)[:, :10], atol=1e-5)
+    np.testing.assert_allclose(np.take_along_axis(sims, system.neighbor_ids.astype(np.intp), axis=1),
+                               system.neighbor_scores, atol=1e-5)
+
+
+def test_similar_uses_the_table_up_to_k_then_kneighbors(system):
+    normed = system._normalized_items()[0]
+    for row in range(0, 250, 10):
+        title = system.catalog_columns['name'][row]
+        idx = system.anime_id_to_index.get(system.catalog_columns['anime_id'][row])
+        if idx is None or system.title_index.lookup(title) != row:
+            continue
+        results, model = system.get_recommendations(title, top_n=10)
+        assert model == 'collaborative'
+        assert [r['id'] for r in results] == [system.index_to_anime_id[i] for i in system.neighbor_ids[idx]]
+
+        # Past K the exact search answers; its first 10 score like the table's
+        exact = system._collaborative_neighbors(idx, 15, 'knn')
+        assert len(exact) == 15
+        scores = (normed[exact[:10]] @ normed[idx].T).toarray().ravel()
+        np.testing.assert_allclose(scores, system.neighbor_scores[idx], atol=1e-5)
@@ -0,0 +1,82 @@
+"""
+PosterCache: TTLs, negative entries, batched access times and LRU eviction.
+"""
+import sqlite3
+import time
+
+import pytest
+
+from poster_cache import PosterCache
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'posters.sqlite3')
+
+
+def _last_access(path, key):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT last_access FROM posters WHERE key = ?", (key,)).fetchone()[0]
+
+
+def test_hit_miss_and_negative_entries(path):
+    cache = PosterCache(path)
+    cache.put('id:1', {'image': 'a.jpg', 'title': 'A', 'mal_id': 1})
+    cache.put_negative('id:2')
+    assert cache.get('id:1') == (True, {'image': 'a.jpg', 'title': 'A', 'mal_id': 1})
+    assert cache.get('id:2') == (True, None)
+    assert cache.get('id:3') == (False, None)
+    assert (cache.hits, cache.negative_hits, cache.misses) == (1, 1, 1)
+    cache.close()
+
+
+def test_expired_entries_are_misses(path):
+    cache = PosterCache(path, ttl=0.05, negative_ttl=0.05)
+    cache.put('id:1', {'image': 'a.jpg', 'title': 'A', 'mal_id': 1})
+    cache.put_negative('id:2')
+    time.sleep(0.1)
+    assert cache.get('id:1') == (False, None)
+    assert cache.get('id:2') == (False, None)
+    assert cache.expired == 2 and len(cache) == 0
+    cache.close()
+
+
+def test_hits_buffer_access_times_until_flushed(path):
+    cache = PosterCache(path, touch_interval=3600, max_touches=3)
+    for i in range(3):
+        cache.put(f'id:{i}', {'image': None, 'title': None, 'mal_id': i})
+    stored = _last_access(path, 'id:0')
+    time.sleep(0.01)
+
+    cache.get('id:0')
+    cache.get('id:1')
+    assert _last_access(path, 'id:0') == stored # nothing written on a hit
+    cache.get('id:2') # third pending touch fills the batch
+    assert _last_access(path, 'id:0') > stored
+
+    cache.get('id:0')
+    cache.flush()
+    assert cache._touched == {}
+    cache.close()
+
+
+def test_eviction_sees_buffered_hits(path):
+    cache = PosterCache(path, max_entries=10, touch_interval=3600)
+    for i in range(10):
+        cache.put(f'id:{i}', {'image': None, 'title': None, 'mal_id': i})
+    cache.get('id:0') # oldest insert, but most recently used
+    cache.put('id:10', {'image': None, 'title': None, 'mal_id': 10})
+    assert cache.evictions == 2 # trimmed to 90%
+    assert cache.get('id:0')[0]
+    assert not cache.get('id:1')[0] and not cache.get('id:2')[0]
+    cache.close()
+
+
+def test_close_writes_pending_access_times(path):
+    cache = PosterCache(path, touch_interval=3600)
+    cache.put('id:1', {'image': None, 'title': None, 'mal_id': 1})
+    stored = _last_access(path, 'id:1')
+    time.sleep(0.01)
+    cache.get('id:1')
+    cache.close()
+    assert _last_access(path, 'id:1') > stored
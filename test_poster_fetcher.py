@@ -0,0 +1,174 @@
+"""
+PosterFetcher against a local stub of the Jikan API.
+"""
+import os
+import tempfile
+import threading
+import time
+
+import pytest
+
+from jikan_stub import StubJikan
+from poster_cache import PosterCache
+from poster_fetcher import PLACEHOLDER_IMAGE, PosterFetcher, TokenBucket
+
+
+@pytest.fixture
+def stub():
+    server = StubJikan(missing={404}, throttle={7: 2})
+    yield server
+    server.close()
+
+
+def _fetcher(stub, **kwargs):
+    kwargs.setdefault('rate', 50.0)
+    return PosterFetcher(base_url=stub.base_url, backoff=0.05, **kwargs)
+
+
+def test_fetch_many_returns_results_in_order(stub):
+    fetcher = _fetcher(stub)
+    try:
+        results = fetcher.fetch_many([{'id': i, 'name': f'n{i}'} for i in (3, 1, 2)])
+    finally:
+        fetcher.close()
+    assert [r['mal_id'] for r in results] == [3, 1, 2]
+    assert results[0]['image'] == 'http://img/3.jpg'
+
+
+def test_missing_anime_gets_placeholder(stub):
+    fetcher = _fetcher(stub)
+    try:
+        result = fetcher.fetch({'id': 404, 'name': 'Gone'})
+    finally:
+        fetcher.close()
+    assert result == {"image": PLACEHOLDER_IMAGE, "title": "Gone", "mal_id": None}
+    assert fetcher.stats()['failures'] == 1
+    assert len(stub.paths) == 1 # 404 is final, no retries
+
+
+def test_429_is_retried_after_retry_after(stub):
+    fetcher = _fetcher(stub)
+    try:
+        start = time.monotonic()
+        result = fetcher.fetch({'id': 7, 'name': 'Busy'})
+        elapsed = time.monotonic() - start
+    finally:
+        fetcher.close()
+    assert result['mal_id'] == 7
+    assert fetcher.stats()['rate_limited'] == 2
+    assert elapsed >= 0.4 # two Retry-After pauses of 0.2s
+
+
+def test_rate_is_never_exceeded_across_threads(stub):
+    rate = 20.0
+    fetcher = _fetcher(stub, rate=rate, max_in_flight=8)
+    sessions = [[{'id': 1000 + s * 100 + i, 'name': ''} for i in range(10)] for s in range(4)]
+    try:
+        threads = [threading.Thread(target=fetcher.fetch_many, args=(ids,)) for ids in sessions]
+        start = time.monotonic()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.monotonic() - start
+    finally:
+        fetcher.close()
+    assert len(stub.arrivals) == 40
+    assert stub.max_in_window(1.0) <= rate + 1 # +1: both window endpoints inclusive
+    # Saturated: 40 requests at 20/s take ~2s, not much longer
+    assert elapsed < 40 / rate + 1.0
+
+
+def test_cache_short_circuits_repeat_lookups(stub):
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = PosterCache(os.path.join(tmp, 'posters.sqlite3'))
+        fetcher = _fetcher(stub, cache=cache)
+        try:
+            fetcher.fetch_many([{'id': 1, 'name': ''}, {'id': 404, 'name': 'Gone'}])
+            fetcher.fetch_many([{'id': 1, 'name': ''}, {'id': 404, 'name': 'Gone'}])
+        finally:
+            fetcher.close()
+            cache.close()
+    assert len(stub.paths) == 2
+    assert cache.hits == 1 and cache.negative_hits == 1
+
+
+def test_transient_failures_are_not_cached(tmp_path):
+    # 429 past max_retries, then a dead upstream: neither means "no poster"
+    server = StubJikan(throttle={7: 10})
+    cache = PosterCache(str(tmp_path / 'posters.sqlite3'))
+    fetcher = _fetcher(server, cache=cache, max_retries=1)
+    try:
+        assert fetcher.fetch({'id': 7, 'name': 'Busy'})['image'] == PLACEHOLDER_IMAGE
+        assert cache.get('id:7') == (False, None)
+        server.close()
+        assert fetcher.fetch({'id': 8, 'name': 'Down'})['image'] == PLACEHOLDER_IMAGE
+        assert cache.get('id:8') == (False, None)
+    finally:
+        fetcher.close()
+        cache.close()
+    assert fetcher.stats()['failures'] == 2
+
+
+def test_cache_io_stays_off_the_event_loop(stub, tmp_path):
+    threads = set()
+
+    class RecordingCache(PosterCache):
+        def get(self, key):
+            threads.add(threading.current_thread().name)
+            return super().get(key)
+
+        def _store(self, *args):
+            threads.add(threading.current_thread().name)
+            super()._store(*args)
+
+    cache = RecordingCache(str(tmp_path / 'posters.sqlite3'))
+    fetcher = _fetcher(stub, cache=cache)
+    try:
+        fetcher.fetch_many([{'id': 1, 'name': ''}, {'id': 404, 'name': 'Gone'}])
+        fetcher.fetch_many([{'id': 1, 'name': ''}])
+    finally:
+        fetcher.close()
+        cache.close()
+    assert threads and all(name.startswith('poster-cache') for name in threads)
+
+
+def test_token_bucket_spacing():
+    import asyncio
+
+    async def run():
+        bucket = TokenBucket(rate=100.0, capacity=1)
+        stamps = []
+        for _ in range(20):
+            await bucket.acquire()
+            stamps.append(time.monotonic())
+        return stamps
+
+    stamps = asyncio.run(run())
+    gaps = [b - a for a, b in zip(stamps, stamps[1:])]
+    assert min(gaps) >= 0.009
+
+
+def test_concurrent_sessions_share_one_upstream_call_per_anime():
+    # Slow upstream so every session overlaps with the first request
+    server = StubJikan(delay=0.2)
+    fetcher = _fetcher(server, max_in_flight=8)
+    top_watched = [{'id': i, 'name': f'n{i}'} for i in range(1, 16)]
+    results = [None] * 8
+    try:
+        def session(slot):
+            results[slot] = fetcher.fetch_many(top_watched)
+        threads = [threading.Thread(target=session, args=(slot,)) for slot in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        fetcher.close()
+        server.close()
+
+    stats = fetcher.stats()
+    assert len(server.paths) == 15
+    assert stats['lookups'] == 8 * 15
+    assert stats['coalesced'] == 8 * 15 - 15
+    assert all([r['mal_id'] for r in res] == list(range(1, 16)) for res in results)
@@ -0,0 +1,52 @@
+"""
+Streaming load: the chunked reader builds the same rating matrix as
+filtering the fully loaded file.
+"""
+import numpy as np
+import pandas as pd
+
+from anime_upgrade import AnimeRecommendationSystem
+from conftest import synthetic_ratings
+
+
+def test_streaming_matches_filtering_the_full_file(make_catalog, tmp_path):
+    anime_path = make_catalog(300)
+    catalog_ids = pd.read_csv(anime_path)['anime_id'].to_numpy()
+
+    # Several chunks' worth of rows, with everything the filters drop:
+    # unrated (-1) rows, anime missing from the catalog, users with <= 50
+    # ratings, plus duplicate (user, anime) pairs that the matrix sums
+    rng = np.random.default_rng(1)
+    ratings = synthetic_ratings(np.append(catalog_ids, [catalog_ids.max() + 1, 10 ** 6]),
+                                n_users=400, per_user=100)
+    light = synthetic_ratings(catalog_ids, n_users=20, per_user=40, seed=2)
+    light['user_id'] += 1000
+    ratings = pd.concat([ratings, light, ratings.sample(500, random_state=3)], ignore_index=True)
+    ratings.loc[rng.random(len(ratings)) < 0.1, 'rating'] = -1
+    rating_path = tmp_path / 'rating.csv'
+    ratings.sample(frac=1, random_state=4).to_csv(rating_path, index=False)
+
+    streamed = AnimeRecommendationSystem()
+    streamed.load_data(anime_path, str(rating_path), streaming=True, memory_budget_mb=0.01)
+    streamed.preprocess_data()
+    streamed.build_models()
+    assert streamed.rating_df is None
+
+    full = AnimeRecommendationSystem()
+    full.load_data(anime_path)
+    full.preprocess_data()
+    rating_df = pd.read_csv(rating_path, dtype={'user_id': 'int32', 'anime_id': 'int32', 'rating': 'int8'})
+    rating_df = rating_df[rating_df['rating'] >= 0]
+    counts = rating_df['user_id'].value_counts()
+    full.rating_df = rating_df[rating_df['user_id'].isin(counts[counts > 50].index)]
+    full.build_models()
+
+    assert list(streamed.anime_id_to_index.items()) == list(full.anime_id_to_index.items())
+    assert list(streamed.user_id_to_index.items()) == list(full.user_id_to_index.items())
+    assert streamed.anime_matrix.shape == full.anime_matrix.shape
+    for name in ('indptr', 'indices', 'data'):
+        np.testing.assert_array_equal(getattr(streamed.anime_matrix, name), getattr(full.anime_matrix, name))
+    assert streamed.anime_matrix.data.dtype == full.anime_matrix.data.dtype
+
+    title = streamed.catalog_columns['name'][0]
+    assert streamed.get_recommendations(title) == full.get_recommendations(title)
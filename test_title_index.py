@@ -0,0 +1,43 @@
+"""
+Title resolution: literal, normalized and fuzzy lookups, prefix autocomplete.
+"""
+from title_index import TitleIndex, normalize_title
+
+
+def test_normalize_title():
+    assert normalize_title('Gintama&#039;') == 'gintama'
+    assert normalize_title('  Pokémon: The Movie!! ') == 'pokemon the movie'
+    assert normalize_title(None) == '' and normalize_title(float('nan')) == ''
+
+
+def test_lookup(tiny_system):
+    index = tiny_system.title_index
+    assert index.lookup('alpha') == 0 # duplicated name: most members wins
+    assert index.lookup("Gamma 'Slice'") == 2
+    assert index.lookup('gamma slice') == 2
+    assert index.lookup('Gama Slce') == 2 # fuzzy
+    assert index.lookup('Beta Agian') == 3
+    assert index.lookup('zzzz qqqq') is None
+    assert index.lookup('') is None
+
+
+def test_literal_match_keeps_punctuation():
+    index = TitleIndex(['Gintama', 'Gintama°', 'Gintama.'], popularity=[1, 3, 2])
+    assert [index.lookup(name) for name in ('Gintama', 'Gintama°', 'Gintama.', 'GINTAMA')] == [0, 1, 2, 0]
+    assert index.lookup('Gintama!') == 1 # no literal match: the most popular normalized one
+
+
+def test_search_and_autocomplete(tiny_system):
+    index = tiny_system.title_index
+    rows = [row for row, _ in index.search('Beta', limit=5)]
+    assert rows[:2] == [1, 3] # exact, then prefix match
+    assert index.autocomplete('al') == [0, 4]
+    assert index.autocomplete('B', limit=1) == [1]
+    assert index.autocomplete('x') == []
+    assert [r['id'] for r in tiny_system.autocomplete_titles('gam')] == [7]
+
+
+def test_recommendations_resolve_titles(tiny_system):
+    results, model = tiny_system.get_recommendations('ALPHA', top_n=3)
+    assert model == 'content' and 10 not in [r['id'] for r in results]
+    assert tiny_system.get_recommendations('zzzz qqqq') == ([], 'error')
@@ -0,0 +1,52 @@
+"""
+recommend_for_user() against a dense brute-force reference.
+"""
+import numpy as np
+import pytest
+
+
+@pytest.fixture(scope='module')
+def system(build_system):
+    return build_system(300)
+
+
+def _reference(system, anime_ids, ratings, top_n):
+    normed = system._normalized_items()[0].toarray()
+    items = [system.anime_id_to_index[a] for a in anime_ids]
+    scores = (np.asarray(ratings)[:, None] * (normed[items] @ normed.T)).sum(axis=0)
+    scores[items] = -np.inf
+    top = np.argsort(-scores, kind='stable')[:top_n]
+    return system.catalog_columns['anime_id'][system.item_rows[top]].tolist()
+
+
+def test_user_id_matches_brute_force_and_masks_history(system):
+    for user_id in (1, 42, 150):
+        anime_ids, ratings = system._user_history(user_id)
+        expected = system.rating_df[system.rating_df['user_id'] == user_id]
+        assert sorted(anime_ids.tolist()) == sorted(expected['anime_id'].tolist())
+
+        results, model = system.recommend_for_user(user_id, top_n=10)
+        ids = [r['id'] for r in results]
+        assert model == "collaborative"
+        assert not set(ids) & set(anime_ids.tolist())
+        assert ids == _reference(system, anime_ids.tolist(), ratings, 10)
+
+
+def test_explicit_history(system):
+    anime_ids = system.catalog_columns['anime_id'][:3].tolist()
+    history = [(anime_ids[0], 10), (anime_ids[1], 6), (anime_ids[2], -1), (99999999, 10)]
+    results, model = system.recommend_for_user(history, top_n=10)
+    ids = [r['id'] for r in results]
+    assert model == "collaborative"
+    assert not set(ids) & set(anime_ids) # -1 (watched, unrated) is masked too
+    assert ids == _reference(system, anime_ids, [10, 6, 0], 10)
+
+
+def test_content_fallback_and_unknown_user(system):
+    # Titles past the rated range are not in the collaborative matrix
+    unrated = system.catalog_columns['anime_id'][260:262].tolist()
+    results, model = system.recommend_for_user([(a, 9) for a in unrated], top_n=5)
+    assert model == "content" and len(results) == 5
+    assert not {r['id'] for r in results} & set(unrated)
+
+    assert system.recommend_for_user(10 ** 9) == ([], "error")
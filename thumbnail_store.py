@@ -0,0 +1,191 @@
+"""
+Local poster thumbnail store.
+Each poster is downloaded once, resized to card size in a background worker
+pool and written under static/thumbs/, which Streamlit serves directly
+(server.enableStaticServing). Total size is capped with LRU eviction.
+
+Warm-up for the most popular titles:
+    python thumbnail_store.py --warm 100
+"""
+import collections
+import concurrent.futures
+import io
+import os
+import threading
+
+import requests
+
+STATIC_URL_PREFIX = "app/static"
+
+
+class ThumbnailStore:
+    def __init__(self, root, max_bytes=200 * 1024 * 1024, width=400, quality=82, workers=4,
+                 url_prefix=STATIC_URL_PREFIX + "/thumbs"):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.width = width
+        self.quality = quality
+        self.url_prefix = url_prefix.rstrip('/')
+        os.makedirs(root, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._session = requests.Session()
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='thumbnails')
+        self._pending = {} # anime_id -> Future
+
+        # LRU index (oldest first), rebuilt from file mtimes on start-up
+        entries = []
+        for name in os.listdir(root):
+            if name.endswith('.jpg'):
+                stat = os.stat(os.path.join(root, name))
+                entries.append((stat.st_mtime, name, stat.st_size))
+        self._entries = collections.OrderedDict((name, size) for _, name, size in sorted(entries))
+        self.total_bytes = sum(self._entries.values())
+
+        self.hits = 0
+        self.misses = 0
+        self.downloads = 0
+        self.failures = 0
+        self.evictions = 0
+
+    def _name(self, anime_id):
+        return f"{int(anime_id)}_{self.width}.jpg"
+
+    def url_for(self, anime_id, image_url):
+        """
+        Local URL of the thumbnail if it is on disk. Otherwise schedules a
+        background download and returns the remote image_url for now.
+        """
+        if anime_id is None or str(anime_id) == 'nan' or not image_url:
+            return image_url
+        name = self._name(anime_id)
+        with self._lock:
+            if name in self._entries:
+                self._entries.move_to_end(name)
+                self.hits += 1
+                return f"{self.url_prefix}/{name}"
+            self.misses += 1
+        self.request(anime_id, image_url)
+        return image_url
+
+    def request(self, anime_id, image_url):
+        """
+        Download + resize in the background (once per id). Returns a Future.
+        """
+        with self._lock:
+            future = self._pending.get(anime_id)
+            if future is None:
+                future = self._executor.submit(self._download, anime_id, image_url)
+                self._pending[anime_id] = future
+                future.add_done_callback(lambda _: self._pop_pending(anime_id))
+            return future
+
+    def _pop_pending(self, anime_id):
+        with self._lock:
+            self._pending.pop(anime_id, None)
+
+    def _download(self, anime_id, image_url):
+        from PIL import Image
+
+        name = self._name(anime_id)
+        path = os.path.join(self.root, name)
+        try:
+            response = self._session.get(image_url, timeout=10)
+            response.raise_for_status()
+            image = Image.open(io.BytesIO(response.content)).convert('RGB')
+            if image.width > self.width:
+                height = round(image.height * self.width / image.width)
+                image = image.resize((self.width, height), Image.LANCZOS)
+
+            tmp_path = path + '.tmp'
+            image.save(tmp_path, 'JPEG', quality=self.quality, optimize=True, progressive=True)
+            os.replace(tmp_path, path)
+        except Exception:
+            with self._lock:
+                self.failures += 1
+            return False
+
+        size = os.path.getsize(path)
+        with self._lock:
+            self.downloads += 1
+            self.total_bytes += size - self._entries.pop(name, 0)
+            self._entries[name] = size
+            self._evict()
+        return True
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            name, size = self._entries.popitem(last=False)
+            try:
+                os.remove(os.path.join(self.root, name))
+            except OSError:
+                pass
+            self.total_bytes -= size
+            self.evictions += 1
+
+    def warm_up(self, animes, fetcher, timeout=None):
+        """
+        Resolve posters for anime dicts through a PosterFetcher and download
+        their thumbnails. Blocks until done; returns the number stored.
+        """
+        posters = fetcher.fetch_many(animes, timeout=timeout)
+        futures = [self.request(anime['id'], poster['image'])
+                   for anime, poster in zip(animes, posters) if poster.get('mal_id') is not None]
+        concurrent.futures.wait(futures, timeout=timeout)
+        return sum(1 for f in futures if f.done() and f.result())
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "downloads": self.downloads,
+                "failures": self.failures,
+                "evictions": self.evictions,
+                "pending": len(self._pending),
+            }
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self._session.close()
+
+
+def main():
+    import argparse
+    import time
+
+    from anime_upgrade import AnimeRecommendationSystem
+    from poster_cache import PosterCache
+    from poster_fetcher import PosterFetcher
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Pre-download poster thumbnails for the most popular titles.")
+    parser.add_argument("--warm", type=int, default=100, help="number of top titles (by members)")
+    parser.add_argument("--anime", default=os.path.join(here, "data", "anime.csv"))
+    args = parser.parse_args()
+
+    recommender = AnimeRecommendationSystem()
+    recommender.load_data(args.anime)
+    recommender.preprocess_data()
+    top = recommender.get_top_animes(top_n=args.warm)
+
+    artifacts = os.path.join(here, "artifacts")
+    os.makedirs(artifacts, exist_ok=True)
+    cache = PosterCache(os.path.join(artifacts, "posters.sqlite3"))
+    fetcher = PosterFetcher(cache=cache)
+    store = ThumbnailStore(os.path.join(here, "static", "thumbs"))
+
+    start = time.perf_counter()
+    stored = store.warm_up(top, fetcher)
+    print(f"Stored {stored}/{len(top)} thumbnails in {time.perf_counter() - start:.1f}s: {store.stats()}")
+    store.close()
+    fetcher.close()
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Title search for the anime catalog.
+Character-trigram inverted index for fuzzy matching plus a sorted name
+array for prefix autocomplete. Everything is built once from the catalog.
+"""
+import bisect
+import html
+import re
+import unicodedata
+
+import numpy as np
+
+_SEPARATORS = re.compile(r'[\W_]+')
+
+
+def normalize_title(title):
+    """
+    Lowercase, decode HTML entities (&#039; -> '), strip accents and
+    collapse punctuation to single spaces.
+    """
+    if title is None or title != title: # None / NaN / pd.NA
+        return ''
+    title = html.unescape(str(title))
+    title = unicodedata.normalize('NFKD', title)
+    title = ''.join(c for c in title if not unicodedata.combining(c))
+    return _SEPARATORS.sub(' ', title.lower()).strip()
+
+
+def _literal_key(title):
+    if title is None or title != title:
+        return ''
+    return html.unescape(str(title)).lower().strip()
+
+
+def trigrams(normalized):
+    """
+    Distinct character trigrams, padded so word boundaries count.
+    """
+    if not normalized:
+        return set()
+    padded = '  ' + normalized + ' '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TitleIndex:
+    def __init__(self, names, popularity=None):
+        """
+        names: catalog names in row order.
+        popularity: optional per-row weight (e.g. members) used to break ties.
+        """
+        self.normalized = [normalize_title(name) for name in names]
+        n_rows = len(self.normalized)
+
+        if popularity is None:
+            popularity = np.zeros(n_rows, dtype=np.float32)
+        popularity = np.nan_to_num(np.asarray(popularity, dtype=np.float32))
+        # Scaled into [0, 1e-3) so it only reorders near-equal matches
+        top = popularity.max() if n_rows else 0
+        self.tie_break = (popularity / top * 1e-3).astype(np.float32) if top > 0 else popularity * 0
+
+        # Inverted index: trigram -> int32 row postings
+        postings = {}
+        self.gram_counts = np.zeros(n_rows, dtype=np.int32)
+        for row, name in enumerate(self.normalized):
+            grams = trigrams(name)
+            self.gram_counts[row] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(row)
+        self.postings = {gram: np.array(rows, dtype=np.int32) for gram, rows in postings.items()}
+
+        # Exact lookup, most popular row wins for duplicated names.
+        # literal keeps punctuation so "Gintama°" doesn't resolve to "Gintama".
+        self.literal = {}
+        self.exact = {}
+        for row in np.argsort(-popularity, kind='stable').tolist():
+            self.literal.setdefault(_literal_key(names[row]), row)
+            self.exact.setdefault(self.normalized[row], row)
+
+        # Prefix autocomplete over sorted names
+        order = sorted(range(n_rows), key=self.normalized.__getitem__)
+        self.sorted_names = [self.normalized[row] for row in order]
+        self.sorted_rows = np.array(order, dtype=np.int32)
+
+    @property
+    def nbytes(self):
+        # Array storage only; dict/str overhead is not counted
+        postings = sum(rows.nbytes for rows in self.postings.values())
+        return postings + self.gram_counts.nbytes + self.tie_break.nbytes + self.sorted_rows.nbytes
+
+    def search(self, query, limit=10):
+        """
+        Ranked fuzzy matches as a list of (row, score).
+        Score is trigram Jaccard similarity, +1 for an exact match and
+        +0.25 when the title starts with the query.
+        """
+        normalized = normalize_title(query)
+        grams = trigrams(normalized)
+        lists = [self.postings[g] for g in grams if g in self.postings]
+        if not lists:
+            return []
+
+        hits = np.bincount(np.concatenate(lists), minlength=len(self.normalized))
+        candidates = np.flatnonzero(hits)
+        shared = hits[candidates].astype(np.float32)
+        scores = shared / (len(grams) + self.gram_counts[candidates] - shared)
+        scores += self.tie_break[candidates]
+
+        exact_row = self.exact.get(normalized)
+        if exact_row is not None:
+            scores[np.searchsorted(candidates, exact_row)] += 1.0
+        prefix_rows = self._prefix_rows(normalized)
+        pos = np.minimum(np.searchsorted(candidates, prefix_rows), len(candidates) - 1)
+        scores[pos[candidates[pos] == prefix_rows]] += 0.25
+
+        if len(candidates) > limit:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+        else:
+            top = np.arange(len(candidates))
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return list(zip(candidates[top].tolist(), scores[top].tolist()))
+
+    def lookup(self, query, min_score=0.3):
+        """
+        Best row for a title: literal match, then exact normalized match,
+        otherwise the top fuzzy match if it is similar enough. None when
+        nothing qualifies.
+        """
+        literal = _literal_key(query)
+        if literal in self.literal:
+            return self.literal[literal]
+        normalized = normalize_title(query)
+        if normalized in self.exact:
+            return self.exact[normalized]
+        matches = self.search(query, limit=1)
+        if matches and matches[0][1] >= min_score:
+            return matches[0][0]
+        return None
+
+    def autocomplete(self, prefix, limit=10):
+        """
+        Rows whose normalized title starts with prefix, most popular first.
+        """
+        rows = self._prefix_rows(normalize_title(prefix))
+        if len(rows) > limit:
+            rows = rows[np.argpartition(-self.tie_break[rows], limit - 1)[:limit]]
+        return rows[np.argsort(-self.tie_break[rows], kind='stable')].tolist()
+
+    def _prefix_rows(self, normalized):
+        if not normalized:
+            return np.empty(0, dtype=np.int32)
+        lo = bisect.bisect_left(self.sorted_names, normalized)
+        hi = bisect.bisect_left(self.sorted_names, normalized + '\uffff', lo)
+        return self.sorted_rows[lo:hi]